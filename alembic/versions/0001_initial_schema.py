@@ -0,0 +1,103 @@
+"""initial schema with day-partitioned signals and 1-minute rollups
+
+Revision ID: 0001
+Revises:
+"""
+from datetime import datetime, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'signals',
+        sa.Column('id', sa.BigInteger, autoincrement=True, nullable=False),
+        sa.Column('ts', sa.DateTime, nullable=False),
+        sa.Column('symbol', sa.Text, nullable=False),
+        sa.Column('side', sa.Text, nullable=False),
+        sa.Column('k', sa.Float, nullable=False),
+        sa.Column('d', sa.Float, nullable=False),
+        sa.Column('note', sa.Text, nullable=True),
+        sa.PrimaryKeyConstraint('id', 'ts'),
+        postgresql_partition_by='RANGE (ts)',
+    )
+    # Index on the partitioned parent: Postgres creates it on every partition.
+    op.create_index('ix_signals_symbol_ts', 'signals', ['symbol', 'ts'])
+    today = datetime.utcnow().date()
+    for i in range(-1, 3):
+        day = today + timedelta(days=i)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS signals_p{day:%Y%m%d} PARTITION OF signals "
+            f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        )
+
+    op.create_table(
+        'signals_1m',
+        sa.Column('symbol', sa.Text, primary_key=True),
+        sa.Column('ts', sa.DateTime, primary_key=True),
+        sa.Column('n', sa.Integer, nullable=False),
+        sa.Column('k_last', sa.Float, nullable=False),
+        sa.Column('d_last', sa.Float, nullable=False),
+        sa.Column('k_min', sa.Float, nullable=False),
+        sa.Column('k_max', sa.Float, nullable=False),
+        sa.Column('k_avg', sa.Float, nullable=False),
+        sa.Column('d_avg', sa.Float, nullable=False),
+    )
+    op.create_index('ix_signals_1m_ts', 'signals_1m', ['ts'])
+
+    op.create_table(
+        'orders',
+        sa.Column('id', sa.BigInteger, primary_key=True),
+        sa.Column('ts', sa.DateTime, nullable=False),
+        sa.Column('clordid', sa.Text, nullable=False, unique=True),
+        sa.Column('symbol', sa.String, nullable=False),
+        sa.Column('side', sa.String, nullable=False),
+        sa.Column('qty', sa.Integer, nullable=False),
+        sa.Column('type', sa.String, nullable=False),
+        sa.Column('px', sa.Float, nullable=True),
+        sa.Column('status', sa.String, nullable=False),
+        sa.Column('mode', sa.String, nullable=False),
+    )
+    op.create_table(
+        'trades',
+        sa.Column('id', sa.BigInteger, primary_key=True),
+        sa.Column('order_id', sa.BigInteger, nullable=False),
+        sa.Column('ts', sa.DateTime, nullable=False),
+        sa.Column('symbol', sa.String, nullable=False),
+        sa.Column('side', sa.String, nullable=False),
+        sa.Column('qty', sa.Integer, nullable=False),
+        sa.Column('px', sa.Float, nullable=False),
+    )
+    op.create_table(
+        'positions',
+        sa.Column('symbol', sa.Text, primary_key=True),
+        sa.Column('qty', sa.Integer, nullable=False),
+        sa.Column('avg_px', sa.Float, nullable=False),
+        sa.Column('u_pnl', sa.Float, nullable=False),
+        sa.Column('r_pnl', sa.Float, nullable=False),
+        sa.Column('last_ts', sa.DateTime, nullable=True),
+    )
+    op.create_table(
+        'pnl_daily',
+        sa.Column('dt', sa.DateTime, primary_key=True),
+        sa.Column('realized', sa.Float, nullable=False),
+        sa.Column('unrealized', sa.Float, nullable=False),
+        sa.Column('max_dd', sa.Float, nullable=False),
+    )
+    op.create_table(
+        'bt_runs',
+        sa.Column('run_id', sa.Text, primary_key=True),
+        sa.Column('started', sa.DateTime, nullable=True),
+        sa.Column('finished', sa.DateTime, nullable=True),
+        sa.Column('params', sa.JSON, nullable=False),
+        sa.Column('metrics', sa.JSON, nullable=False),
+    )
+
+def downgrade():
+    for t in ('bt_runs', 'pnl_daily', 'positions', 'trades', 'orders', 'signals_1m'):
+        op.drop_table(t)
+    op.execute("DROP TABLE IF EXISTS signals CASCADE")
@@ -0,0 +1,71 @@
+from __future__ import annotations
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Peak RSS and time of chunked CSV reads vs file size")
+    p.add_argument("--rows", default="200000,1000000", help="comma-separated tick counts")
+    p.add_argument("--chunk-bytes", type=int, default=1 << 20)
+    p.add_argument("--child", nargs=4, metavar=("PATH", "FROM", "TO", "MODE"), help=argparse.SUPPRESS)
+    return p.parse_args()
+
+
+def write_ticks(path: str, n: int) -> None:
+    start = datetime(2024, 1, 2, 9, 30)
+    with open(path, "w") as f:
+        f.write("timestamp,close\n")
+        for i in range(n):
+            f.write(f"{(start + timedelta(seconds=i)).isoformat()},{100 + (i % 97) * 0.25}\n")
+
+
+def child(path: str, from_date: str, to_date: str, mode: str, chunk_bytes: int) -> None:
+    # Runs in a fresh process so ru_maxrss is this read alone.
+    from kisbot.infra.backtest import _load_prices_csv
+    from kisbot.infra.chunked import chunk_index, iter_rows
+    t0 = time.perf_counter()
+    if mode == "chunked":
+        idx = chunk_index(path, chunk_bytes=chunk_bytes)
+        n = sum(1 for _ in iter_rows(path, from_date, to_date, chunk_bytes=chunk_bytes, idx=idx))
+    else:
+        n = len(_load_prices_csv(os.path.dirname(path), Path(path).stem, from_date, to_date))
+    dt = time.perf_counter() - t0
+    print(n, dt, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def run(path, from_date, to_date, mode, chunk_bytes):
+    out = subprocess.run([sys.executable, __file__, "--chunk-bytes", str(chunk_bytes), "--child", path, from_date, to_date, mode],
+                         check=True, capture_output=True, text=True).stdout.split()
+    return int(out[0]), float(out[1]), int(out[2]) / 1024
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        child(*args.child, args.chunk_bytes)
+        return
+    with tempfile.TemporaryDirectory() as d:
+        print(f"{'rows':>10} {'MB':>7} {'mode':>8} {'range':>6} {'bars':>9} {'sec':>7} {'peak RSS MB':>12}")
+        for n in (int(x) for x in args.rows.split(",")):
+            path = os.path.join(d, "X.csv")
+            write_ticks(path, n)
+            size = os.path.getsize(path) / 1e6
+            run(path, "2024-01-01", "2030-01-01", "chunked", args.chunk_bytes)  # build the sidecar index
+            for mode in ("load", "chunked"):
+                for label, frm, to in (("all", "2024-01-01", "2030-01-01"), ("1h", "2024-01-02T12:00:00", "2024-01-02T13:00:00")):
+                    bars, sec, rss = run(path, frm, to, mode, args.chunk_bytes)
+                    print(f"{n:>10} {size:>7.1f} {mode:>8} {label:>6} {bars:>9} {sec:>7.2f} {rss:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from kisbot.infra.journal import TraderJournal
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Trader journal append and recovery benchmark")
+    p.add_argument("--entries", type=int, default=1_000_000)
+    p.add_argument("--symbols", type=int, default=200)
+    p.add_argument("--snapshot-every", type=int, default=10_000)
+    p.add_argument("--fsync-every", type=int, default=1024)
+    return p.parse_args()
+
+
+def run(entries: int, symbols: int, snapshot_every: int, fsync_every: int) -> None:
+    d = tempfile.mkdtemp(prefix="kisbot-journal-")
+    try:
+        jr = TraderJournal(d, fsync_every=fsync_every, fsync_ms=1e9, snapshot_every=snapshot_every)
+        jr.recover()
+        syms = [f"SYM{i}" for i in range(symbols)]
+        t0 = time.perf_counter()
+        for i in range(entries):
+            jr.record(syms[i % symbols], "fill", (i, 100.0 + i * 1e-3, True, False, 2, i % 60))
+        jr.close()
+        dt_w = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        states = TraderJournal(d).recover()
+        dt_r = time.perf_counter() - t0
+        assert len(states) == symbols
+        print(f"snapshot_every={snapshot_every:<9} append {entries / dt_w:>10,.0f} rec/s   recover {dt_r * 1000:8.1f} ms")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def main():
+    args = parse_args()
+    print(f"{args.entries:,} journal entries over {args.symbols} symbols")
+    run(args.entries, args.symbols, args.snapshot_every, args.fsync_every)
+    # Worst case: no snapshot taken, the whole million-entry log is replayed.
+    run(args.entries, args.symbols, args.entries + 1, args.fsync_every)
+
+
+if __name__ == "__main__":
+    main()
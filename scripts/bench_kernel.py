@@ -0,0 +1,64 @@
+from __future__ import annotations
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from kisbot.core.kernel import indicator_arrays, simulate_arrays
+from kisbot.core.slices import SliceBook
+from kisbot.infra.backtest import _Leg
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Per-bar cost: object KDTrader path vs array-native kernel")
+    p.add_argument("--bars", type=int, default=500_000)
+    p.add_argument("--seed", type=int, default=0)
+    return p.parse_args()
+
+
+CFG = {
+    "strategy": {"rsi_period": 14, "stoch_period": 14, "k_period": 3, "d_period": 3, "overbought": 80,
+                 "oversold": 20, "rsi_buy_threshold": 50, "rsi_buy_multiplier": 1.1, "stop_loss_pct": 0.1},
+    "slices": {"total": 60, "per_entry_lt20": 2, "per_entry_20_80": 2},
+    "risk": {"equity": 80000},
+}
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    px, prices = 50.0, []
+    for _ in range(args.bars):
+        px *= 1.0 + rng.gauss(0.0, 0.02)
+        prices.append(px)
+    st = CFG["strategy"]
+
+    t0 = time.perf_counter()
+    leg = _Leg("X", CFG, SliceBook(CFG["risk"]["equity"], CFG["slices"]["total"]))
+    for i, p in enumerate(prices):
+        leg.step(float(i), p)
+    t_obj = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    arrays = indicator_arrays(prices, st["rsi_period"], st["stoch_period"], st["k_period"], st["d_period"])
+    t_ind = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    m = simulate_arrays(prices, *arrays, CFG)
+    t_ker = time.perf_counter() - t0
+
+    obj = leg.metrics()
+    del obj["symbol"]
+    assert m == obj, (m, obj)
+    ns = 1e9 / args.bars
+    print(f"object path          {t_obj * ns:8.0f} ns/bar")
+    print(f"indicator precompute {t_ind * ns:8.0f} ns/bar (once per symbol/periods)")
+    print(f"kernel               {t_ker * ns:8.0f} ns/bar  speedup x{t_obj / t_ker:.1f}")
+    print(f"precompute + kernel  {(t_ind + t_ker) * ns:8.0f} ns/bar  speedup x{t_obj / (t_ind + t_ker):.1f}")
+
+
+if __name__ == "__main__":
+    main()
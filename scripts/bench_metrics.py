@@ -0,0 +1,65 @@
+from __future__ import annotations
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from kisbot.infra.metrics import Metrics
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Per-event recording overhead of kisbot.infra.metrics")
+    p.add_argument("--events", type=int, default=2_000_000)
+    p.add_argument("--budget-ns", type=float, default=1000.0)
+    return p.parse_args()
+
+
+def per_event_ns(fn, n: int) -> float:
+    t0 = time.perf_counter_ns()
+    fn(n)
+    return (time.perf_counter_ns() - t0) / n
+
+
+def main():
+    args = parse_args()
+    reg = Metrics()
+    h = reg.histogram("bench")
+    c = reg.counter("ticks", symbol="TQQQ")
+    perf_ns = time.perf_counter_ns
+
+    def empty(n):
+        for i in range(n):
+            pass
+
+    def record(n):
+        for i in range(n):
+            h.record(i & 0xFFFFF)
+
+    def timed_record(n):
+        for _ in range(n):
+            t0 = perf_ns()
+            h.record(perf_ns() - t0)
+
+    def count(n):
+        for _ in range(n):
+            c.inc()
+
+    base = per_event_ns(empty, args.events)
+    rows = [
+        ("histogram.record", per_event_ns(record, args.events) - base),
+        ("perf_counter_ns x2 + record", per_event_ns(timed_record, args.events) - base),
+        ("counter.inc", per_event_ns(count, args.events) - base),
+    ]
+    ok = True
+    for name, ns in rows:
+        flag = "ok" if ns < args.budget_ns else "OVER BUDGET"
+        ok &= ns < args.budget_ns
+        print(f"{name:<30} {ns:8.1f} ns/event  {flag}")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from kisbot.services.shards import ShardedEngine
+from kisbot.services.trader import build_symbol, process_tick, symbol_config
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="End-to-end ticks/sec of the sharded engine vs shard count")
+    p.add_argument("--symbols", type=int, default=200)
+    p.add_argument("--ticks", type=int, default=500, help="Ticks per symbol")
+    p.add_argument("--shards", default="1,2,4,8")
+    p.add_argument("--batch", type=int, default=512)
+    return p.parse_args()
+
+
+def make_cfg(symbols: list[str]) -> dict:
+    return {
+        "mode": "paper",
+        "universe": symbols,
+        "strategy": {"rsi_period": 14, "stoch_period": 14, "k_period": 3, "d_period": 3,
+                     "overbought": 80, "oversold": 20, "rsi_buy_threshold": 50, "rsi_buy_multiplier": 1.1},
+        "slices": {"total": 60, "per_entry_lt20": 2, "per_entry_20_80": 1},
+        "risk": {"equity": 100000},
+    }
+
+
+def ticks(symbols: list[str], n: int):
+    for i in range(n):
+        for j, s in enumerate(symbols):
+            yield s, 100.0 + 5.0 * math.sin(i / (3.0 + j % 17)), float(i)
+
+
+def bench_inline(cfg: dict, n: int) -> float:
+    syms = cfg["universe"]
+    state = {s: build_symbol(s, symbol_config(cfg, s)) for s in syms}
+    orders = []
+    place = lambda sy, si, q, t, px=None: orders.append(sy)
+    t0 = time.perf_counter()
+    for sym, px, now in ticks(syms, n):
+        stoch, _, trader = state[sym]
+        process_tick(stoch, trader, px, now, place)
+    return time.perf_counter() - t0
+
+
+def bench_sharded(cfg: dict, n: int, workers: int, batch: int) -> float:
+    eng = ShardedEngine(cfg, workers, batch_size=batch)
+    eng.start()
+    eng.drain()  # exclude process start-up
+    t0 = time.perf_counter()
+    for sym, px, now in ticks(cfg["universe"], n):
+        eng.submit(sym, px, now)
+    eng.drain()
+    dt = time.perf_counter() - t0
+    eng.stop()
+    return dt
+
+
+def main():
+    args = parse_args()
+    cfg = make_cfg([f"SYM{i}" for i in range(args.symbols)])
+    total = args.symbols * args.ticks
+    dt = bench_inline(cfg, args.ticks)
+    print(f"inline    ticks={total} {total / dt:>12,.0f} ticks/s")
+    for w in [int(x) for x in args.shards.split(",")]:
+        dt = bench_sharded(cfg, args.ticks, w, args.batch)
+        print(f"shards={w:<3} ticks={total} {total / dt:>12,.0f} ticks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from sqlalchemy import text
+from kisbot.db import base, crud
+from kisbot.db.partitions import drop_partitions_before, ensure_partitions, rollup
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="'Last day of K/D for a symbol' latency as signals history grows")
+    p.add_argument("--dsn", default=os.getenv("PG_DSN"), help="postgresql+asyncpg DSN of a migrated database")
+    p.add_argument("--symbols", type=int, default=20)
+    p.add_argument("--rows-per-day", type=int, default=50_000, help="Per symbol")
+    p.add_argument("--days", default="1,7,30,60")
+    p.add_argument("--repeat", type=int, default=20)
+    return p.parse_args()
+
+
+async def fill_day(conn, day, symbols: int, rows: int) -> None:
+    step = 86400.0 / rows
+    await conn.execute(text(f"""
+        INSERT INTO signals (ts, symbol, side, k, d)
+        SELECT CAST(:day AS timestamp) + make_interval(secs => g * {step}), 'SYM' || s, 'TICK',
+               random() * 100, random() * 100
+        FROM generate_series(0, {rows - 1}) g, generate_series(0, {symbols - 1}) s
+    """), {"day": datetime.combine(day, datetime.min.time())})
+
+
+async def main():
+    args = parse_args()
+    if not args.dsn:
+        raise SystemExit("set PG_DSN or --dsn to a migrated Postgres database (alembic upgrade head)")
+    await base.init_db(args.dsn)
+    now = datetime.utcnow()
+    today = now.date()
+    async with base._engine.begin() as conn:
+        await conn.execute(text("TRUNCATE signals, signals_1m"))
+        await drop_partitions_before(conn, today + timedelta(days=365))
+    filled = 0
+    for days in [int(x) for x in args.days.split(",")]:
+        async with base._engine.begin() as conn:
+            start = today - timedelta(days=days - 1)
+            await ensure_partitions(conn, start, days)
+            for i in range(filled, days):
+                await fill_day(conn, today - timedelta(days=i), args.symbols, args.rows_per_day)
+            await conn.execute(text("ANALYZE signals"))
+        filled = days
+        since = now - timedelta(days=1)
+        await crud.recent_kd("SYM1", since)
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            rows = await crud.recent_kd("SYM1", since)
+        q_ms = (time.perf_counter() - t0) / args.repeat * 1000
+        t0 = time.perf_counter()
+        async with base._engine.begin() as conn:
+            n = await rollup(conn, now - timedelta(hours=1), now)
+        r_ms = (time.perf_counter() - t0) * 1000
+        await crud.recent_kd("SYM1", since, rollup=True)
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            await crud.recent_kd("SYM1", since, rollup=True)
+        q1m_ms = (time.perf_counter() - t0) / args.repeat * 1000
+        total = days * args.rows_per_day * args.symbols
+        print(f"history={days:>3}d rows={total:>12,}  last-day query {q_ms:8.2f} ms ({len(rows)} rows)"
+              f"  1m-rollup query {q1m_ms:6.2f} ms  rollup(1h) {r_ms:7.1f} ms ({n} buckets)")
+    t0 = time.perf_counter()
+    async with base._engine.begin() as conn:
+        dropped = await drop_partitions_before(conn, today - timedelta(days=7))
+    print(f"retention: dropped {len(dropped)} partitions in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+from __future__ import annotations
+import argparse
+import multiprocessing as mp
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import numpy as np
+
+from kisbot.infra.tickring import TickRing
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Feed -> worker tick throughput: shared-memory ring vs multiprocessing.Queue")
+    p.add_argument("--ticks", type=int, default=1_000_000)
+    p.add_argument("--consumers", default="1,2,4")
+    p.add_argument("--capacity", type=int, default=1 << 20)
+    p.add_argument("--batch", type=int, default=256, help="Ticks per publish_many / queue put")
+    return p.parse_args()
+
+
+def ring_reader(name: str, slot: int, n: int, out) -> None:
+    ring = TickRing.attach(name)
+    cons = ring.consumer(slot)
+    seen, total = 0, 0.0
+    while seen < n:
+        batch = cons.poll()
+        if len(batch):
+            seen += len(batch)
+            total += float(batch["price"].sum())
+    out.put((seen, cons.gaps))
+    del batch
+    ring.close()
+
+
+def queue_reader(q, n: int, out) -> None:
+    seen = 0
+    while seen < n:
+        item = q.get()
+        seen += len(item) if isinstance(item, list) else 1
+    out.put((seen, 0))
+
+
+def bench_ring(n: int, consumers: int, capacity: int, batch: int | None) -> tuple[float, int]:
+    ring = TickRing.create(capacity, max_consumers=consumers, symbols=["TQQQ", "SOXL"])
+    out = mp.Queue()
+    procs = [mp.Process(target=ring_reader, args=(ring.name, i, n, out)) for i in range(consumers)]
+    for p in procs:
+        p.start()
+    px = 100.0 + np.arange(n) * 1e-4
+    t0 = time.perf_counter()
+    if batch:
+        ids = (np.arange(n) & 1).astype(np.int32)
+        for i in range(0, n, batch):
+            ring.publish_many(ids[i:i + batch], px[i:i + batch], px[i:i + batch])
+    else:
+        for i, p in enumerate(px.tolist()):
+            ring.publish("SOXL" if i & 1 else "TQQQ", p, p)
+    gaps = sum(out.get()[1] for _ in procs)
+    dt = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+    ring.close()
+    ring.unlink()
+    return dt, gaps
+
+
+def bench_queue(n: int, consumers: int, batch: int | None) -> float:
+    out = mp.Queue()
+    qs = [mp.Queue() for _ in range(consumers)]
+    procs = [mp.Process(target=queue_reader, args=(q, n, out)) for q in qs]
+    for p in procs:
+        p.start()
+    px = (100.0 + np.arange(n) * 1e-4).tolist()
+    t0 = time.perf_counter()
+    if batch:
+        for i in range(0, n, batch):
+            rows = [("SOXL" if j & 1 else "TQQQ", p, p) for j, p in enumerate(px[i:i + batch], i)]
+            for q in qs:
+                q.put(rows)
+    else:
+        for i, p in enumerate(px):
+            row = ("SOXL" if i & 1 else "TQQQ", p, p)
+            for q in qs:
+                q.put(row)
+    for _ in procs:
+        out.get()
+    dt = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+    return dt
+
+
+def main():
+    args = parse_args()
+    n = args.ticks
+    for c in [int(x) for x in args.consumers.split(",")]:
+        dt, gaps = bench_ring(n, c, args.capacity, None)
+        print(f"consumers={c}  ring  per-tick     {n / dt:>12,.0f} ticks/s  gaps={gaps}")
+        dt, gaps = bench_ring(n, c, args.capacity, args.batch)
+        print(f"consumers={c}  ring  batch={args.batch:<6} {n / dt:>12,.0f} ticks/s  gaps={gaps}")
+        dt = bench_queue(n, c, None)
+        print(f"consumers={c}  queue per-tick     {n / dt:>12,.0f} ticks/s")
+        dt = bench_queue(n, c, args.batch)
+        print(f"consumers={c}  queue batch={args.batch:<6} {n / dt:>12,.0f} ticks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,41 @@
 from __future__ import annotations
 import argparse
+import sys
+from datetime import date
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from kisbot.infra.fetch import YahooProvider, fetch_all
+
 
 def parse_args():
-    p = argparse.ArgumentParser(description="Fetch historical OHLCV CSVs via yfinance")
+    p = argparse.ArgumentParser(description="Fetch historical OHLCV CSVs via yfinance (incremental)")
     p.add_argument("--symbols", required=True, help="Comma-separated tickers, e.g., TQQQ,SPXL")
     p.add_argument("--from", dest="from_", required=True, help="Start date YYYY-MM-DD")
-    p.add_argument("--to", required=True, help="End date YYYY-MM-DD (exclusive or inclusive per provider)")
+    p.add_argument("--to", required=True, help="End date YYYY-MM-DD (exclusive)")
     p.add_argument("--interval", default="1d", help="Bar interval: 1d, 1h, 5m, etc.")
     p.add_argument("--out", default="data", help="Output directory for CSVs")
+    p.add_argument("--workers", type=int, default=4, help="Symbols fetched concurrently")
     return p.parse_args()
 
 
 def main():
     args = parse_args()
     syms = [s.strip() for s in args.symbols.split(",") if s.strip()]
-    out_dir = Path(args.out)
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    try:
-        import yfinance as yf
-    except ImportError as e:
-        raise SystemExit("yfinance not installed. Run: pip install -r requirements-data.txt") from e
-
-    for sym in syms:
-        print(f"[fetch] {sym} {args.from_}..{args.to} interval={args.interval}")
-        t = yf.Ticker(sym)
-        df = t.history(start=args.from_, end=args.to, interval=args.interval, auto_adjust=False)
-        if df.empty:
-            print(f"[warn] no data for {sym}")
-            continue
-        df.index.name = "Date"
-        df = df.reset_index()
-        # Ensure canonical columns
-        cols = [
-            c if c in ("Date",) else c.title().replace(" ", "")
-            for c in df.columns
-        ]
-        df.columns = cols
-        path = out_dir / f"{sym}.csv"
-        df.to_csv(path, index=False)
-        print(f"[ok] wrote {path}")
+    results = fetch_all(
+        YahooProvider(), syms, date.fromisoformat(args.from_), date.fromisoformat(args.to),
+        interval=args.interval, out_dir=args.out, max_workers=args.workers,
+    )
+    for r in results:
+        if "error" in r:
+            print(f"[error] {r['symbol']}: {r['error']}")
+        elif not r["ranges"]:
+            print(f"[ok] {r['symbol']} up to date")
+        else:
+            print(f"[ok] {r['symbol']} ranges={r['ranges']} fetched={r['fetched']} changed={r['changed']}")
 
 
 if __name__ == "__main__":
     main()
-
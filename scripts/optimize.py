@@ -11,6 +11,9 @@ ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT / "src"))
 
 from kisbot.infra.backtest import backtest
+from kisbot.infra.bt_cache import BacktestCache
+from kisbot.infra.profiling import StageProfiler, cprofile, write_reports
+from kisbot.infra.sweep import equivalence_keys, sweep
 
 
 def parse_args():
@@ -20,6 +23,12 @@ def parse_args():
     p.add_argument("--to", required=False, default=dt.date.today().isoformat())
     p.add_argument("--config", default=str(ROOT / "config.yaml"))
     p.add_argument("--top", type=int, default=10)
+    p.add_argument("--no-cache", action="store_true", help="Recompute every grid point (--engine backtest)")
+    p.add_argument("--engine", choices=("sweep", "backtest"), default="sweep",
+                   help="sweep: all grid points in one data pass; backtest: one cached backtest() per point")
+    p.add_argument("--profile", action="store_true", help="Print per-stage timings and write them to --profile-dir")
+    p.add_argument("--cprofile", action="store_true", help="Also run under cProfile (implies --profile)")
+    p.add_argument("--profile-dir", default="reports/profile")
     return p.parse_args()
 
 
@@ -81,13 +90,29 @@ async def main():
     base_cfg = yaml.safe_load(open(args.config))
     base_cfg.setdefault("bars", {}).update({"type": "csv", "data_dir": "data", "column": "close"})
 
+    updates = list(iter_params(grid("small")))
     results = []
-    for upd in iter_params(grid("small")):
-        cfg = assign(base_cfg, upd)
-        res = await backtest(cfg, args.from_, args.to, [args.symbol], quiet=True)
-        m = res["metrics"][0]
-        score = float(m.get("realized_pnl", 0.0))
-        results.append((score, upd, m))
+    prof = StageProfiler() if args.profile or args.cprofile else None
+    with cprofile(args.cprofile) as cprof:
+        cfgs = [assign(base_cfg, upd) for upd in updates]
+        if args.engine == "sweep":
+            stats = {}
+            metrics = sweep(cfgs, args.symbol, args.from_, args.to, profile=prof, stats=stats)
+            simulated = stats["simulated"]
+        else:
+            # Grid points that cannot trade differently on this data run once
+            cache = None if args.no_cache else BacktestCache.from_config(base_cfg)
+            done = {}
+            metrics = []
+            for cfg, key in zip(cfgs, equivalence_keys(cfgs, args.symbol, args.from_, args.to)):
+                if key not in done:
+                    res = await backtest(cfg, args.from_, args.to, [args.symbol], quiet=True, cache=cache, profile=prof)
+                    done[key] = res["metrics"][0]
+                metrics.append(dict(done[key]))
+            simulated = len(done)
+        for upd, m in zip(updates, metrics):
+            results.append((float(m.get("realized_pnl", 0.0)), upd, m))
+        print(f"{len(updates)} grid points, {simulated} distinct simulated")
 
     # Sort by realized PnL desc
     results.sort(key=lambda x: x[0], reverse=True)
@@ -95,6 +120,10 @@ async def main():
     print("\nTop configurations by realized PnL:")
     for rank, (score, upd, m) in enumerate(topn, 1):
         print(f"{rank:>2}. pnl={score:>10.2f} cfg={upd} metrics={m}")
+    if prof is not None:
+        paths = write_reports(prof, args.profile_dir, cprof)
+        print("\n" + prof.report(), end="")
+        print(f"profile written to {', '.join(paths.values())}")
 
 
 if __name__ == "__main__":
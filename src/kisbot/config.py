@@ -0,0 +1,24 @@
+from __future__ import annotations
+from pydantic import BaseModel
+
+class AppConfig(BaseModel):
+    mode: str = "paper"
+    universe: list[str] = []
+    ws: dict = {}
+    bars: dict = {}
+    strategy: dict = {}
+    slices: dict = {}
+    risk: dict = {}
+    execution: dict | None = None
+    postgres: dict | None = None
+    opensearch: dict | None = None
+    slack: dict | None = None
+    symbols: dict | None = None
+    shards: dict | None = None
+    metrics: dict | None = None
+    journal: dict | None = None
+    signals_store: dict | None = None
+    pnl: dict | None = None
+    orders: dict | None = None
+    equity: dict | None = None
+    backtest_cache: dict | None = None
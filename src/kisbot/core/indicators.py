@@ -53,6 +53,58 @@ class RollingSMA:
             return None
         return self.sum / self.period
 
+class RollingEMA:
+    """EMA with ``alpha = 2 / (period + 1)``, seeded with the SMA of the first `period` values."""
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.value = None
+    def update(self, x: float):
+        if self.value is None:
+            self.sum += x
+            self.count += 1
+            if self.count < self.period:
+                return None
+            self.value = self.sum / self.period
+            return self.value
+        self.value += self.alpha * (x - self.value)
+        return self.value
+
+class WilderATR:
+    """Average true range with Wilder smoothing; for close-only bars pass high = low = close."""
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = None
+        self.count = 0
+        self.sum = 0.0
+        self.value = None
+    def update(self, high: float, low: float, close: float):
+        prev = self.prev_close
+        tr = high - low if prev is None else max(high - low, abs(high - prev), abs(low - prev))
+        self.prev_close = close
+        if self.value is None:
+            self.sum += tr
+            self.count += 1
+            if self.count < self.period:
+                return None
+            self.value = self.sum / self.period
+            return self.value
+        self.value = (self.value * (self.period - 1) + tr) / self.period
+        return self.value
+
+class CooldownClock:
+    """Minimum spacing in seconds between events (e.g. one symbol's buys); 0 disables it."""
+    __slots__ = ("seconds", "last")
+    def __init__(self, seconds: float = 0.0):
+        self.seconds = float(seconds or 0.0)
+        self.last = None
+    def ready(self, now: float) -> bool:
+        return self.seconds <= 0 or self.last is None or now - self.last >= self.seconds
+    def mark(self, now: float) -> None:
+        self.last = now
+
 class StochRSI:
     def __init__(self, rsi_period=14, stoch_period=14, k_period=3, d_period=3):
         self.rsi = WilderRSI(rsi_period)
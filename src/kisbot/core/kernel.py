@@ -0,0 +1,293 @@
+"""Array-native KDTrader backtest kernel.
+
+`simulate_arrays` replays exactly what `KDTrader.on_rsi`/`on_kd` plus the
+backtest fill model (`_Leg.place`: every order fills at the bar price) do for a
+single symbol. It reads precomputed price/RSI/K/D sequences and keeps all
+trader, slice-book and fill state in locals, with no per-bar method calls.
+Indicators come from `indicator_arrays`, which reproduces `StochRSI`
+bit for bit, so every threshold comparison agrees with the object path.
+`sma_array`/`ema_array`/`atr_array` are the batch forms of `RollingSMA`,
+`RollingEMA` and `WilderATR`, with the same guarantee.
+"""
+from __future__ import annotations
+import math
+from collections import deque
+from typing import List, Optional, Sequence, Tuple
+
+Series = List[Optional[float]]
+
+
+def indicator_arrays(prices: Sequence[float], rsi_period=14, stoch_period=14, k_period=3, d_period=3) -> Tuple[Series, Series, Series]:
+    """(rsi, k, d) per bar as `StochRSI` reports them; None where not ready.
+
+    `StochRSI` inlined into one loop: the same float operations in the same
+    order as `WilderRSI`/`RollingSMA`, so the results are bit-identical.
+    """
+    rsi: Series = []
+    ks: Series = []
+    ds: Series = []
+    n = rsi_period
+    window: deque = deque(maxlen=stoch_period)
+    k_buf: deque = deque(maxlen=k_period)
+    d_buf: deque = deque(maxlen=d_period)
+    k_sum = d_sum = 0.0
+    prev = None
+    gain = loss = 0.0
+    count = 0
+    last = None
+    for price in prices:
+        k = d = None
+        if prev is None:
+            prev = price
+        else:
+            change = price - prev
+            prev = price
+            up = max(change, 0.0)
+            down = -min(change, 0.0)
+            rsi_val = None
+            if count < n:
+                gain += up
+                loss += down
+                count += 1
+            elif count == n:
+                # WilderRSI keeps smoothing from these sums, not the averages
+                avg_gain = gain / n
+                avg_loss = loss / n
+                rs = math.inf if avg_loss == 0 else (avg_gain / avg_loss)
+                last = rsi_val = 100.0 - 100.0 / (1.0 + rs)
+                count += 1
+            else:
+                gain = (gain * (n - 1) + up) / n
+                loss = (loss * (n - 1) + down) / n
+                rs = math.inf if loss == 0 else (gain / loss)
+                last = rsi_val = 100.0 - 100.0 / (1.0 + rs)
+            if rsi_val is not None:
+                window.append(rsi_val)
+                if len(window) == stoch_period:
+                    lo, hi = min(window), max(window)
+                    stoch = 50.0 if hi == lo else (rsi_val - lo) / (hi - lo) * 100.0
+                    if len(k_buf) == k_period:
+                        k_sum -= k_buf[0]
+                    k_buf.append(stoch)
+                    k_sum += stoch
+                    if len(k_buf) == k_period:
+                        k_val = k_sum / k_period
+                        if len(d_buf) == d_period:
+                            d_sum -= d_buf[0]
+                        d_buf.append(k_val)
+                        d_sum += k_val
+                        if len(d_buf) == d_period:
+                            k, d = k_val, d_sum / d_period
+        rsi.append(last)
+        ks.append(k)
+        ds.append(d)
+    return rsi, ks, ds
+
+
+def sma_array(values: Sequence[float], period: int) -> Series:
+    """`RollingSMA(period).update` over `values` (same running sum, so bit-identical)."""
+    out: Series = [None] * len(values)
+    total = 0.0
+    for i, x in enumerate(values):
+        if i >= period:
+            total -= values[i - period]
+        total += x
+        if i >= period - 1:
+            out[i] = total / period
+    return out
+
+
+def ema_array(values: Sequence[float], period: int) -> Series:
+    """`RollingEMA(period).update` over `values`."""
+    out: Series = [None] * len(values)
+    alpha = 2.0 / (period + 1)
+    total = 0.0
+    value = None
+    for i, x in enumerate(values):
+        if value is None:
+            total += x
+            if i == period - 1:
+                value = total / period
+        else:
+            value += alpha * (x - value)
+        out[i] = value
+    return out
+
+
+def atr_array(high: Sequence[float], low: Sequence[float], close: Sequence[float], period: int = 14) -> Series:
+    """`WilderATR(period).update` over the bars."""
+    out: Series = [None] * len(close)
+    total = 0.0
+    value = None
+    prev = None
+    for i, (h, lo, c) in enumerate(zip(high, low, close)):
+        tr = h - lo if prev is None else max(h - lo, abs(h - prev), abs(lo - prev))
+        prev = c
+        if value is None:
+            total += tr
+            if i == period - 1:
+                value = total / period
+        else:
+            value = (value * (period - 1) + tr) / period
+        out[i] = value
+    return out
+
+
+def simulate_arrays(prices: Sequence[float], rsi: Series, ks: Series, ds: Series, cfg: dict, trades: Optional[list] = None,
+                    ts: Optional[Sequence[float]] = None) -> dict:
+    """Run one symbol's KDTrader over the arrays; returns the `_simulate_symbol` metrics.
+
+    When `trades` is a list, each order is appended as
+    `(bar_index, side, qty, order_type, limit_price)`. `ts` (bar timestamps
+    in seconds) is required when `add_cooldown_sec` is set.
+    """
+    s = cfg["strategy"]
+    trend_period = int(s.get("trend_sma_period") or 0)
+    trend = sma_array(prices, trend_period) if trend_period > 0 else None
+    cooldown = max(0.0, float(s.get("add_cooldown_sec") or 0.0))
+    if cooldown and ts is None:
+        raise ValueError("add_cooldown_sec needs bar timestamps (ts)")
+    gated = trend is not None or cooldown > 0
+    last_buy = -math.inf
+    now = 0.0
+    mult = float(s.get("rsi_buy_multiplier", 1.1))
+    threshold = float(s.get("rsi_buy_threshold", 50.0))
+    low_band = float(s.get("rsi_low_band", 20.0))
+    mid_band = float(s.get("rsi_mid_band", 80.0))
+    batch_lt20 = int(cfg["slices"].get("per_entry_lt20", 0))
+    batch_mid = int(cfg["slices"].get("per_entry_20_80", 0))
+    sl_pct = s.get("stop_loss_pct")
+    tp_pct = s.get("take_profit_pct", 0.11)
+    enable_kd_buys = bool(s.get("enable_kd_buys", True))
+    oversold = s["oversold"]
+    overbought = s["overbought"]
+    kd_lt20 = cfg["slices"]["per_entry_lt20"] if enable_kd_buys else 0
+    kd_mid = cfg["slices"]["per_entry_20_80"] if enable_kd_buys else 0
+    total = cfg["slices"]["total"]
+    slice_value = math.floor(cfg["risk"]["equity"] / total)
+    record = trades.append if trades is not None else None
+
+    qty = 0
+    avg = 0.0
+    realized = 0.0
+    used = 0
+    active = False
+    first_done = False
+    alloc = 0
+    t_last_px = None  # KDTrader.last_px (None until the first RSI)
+    prev_k = prev_d = None
+    px = 0.0
+
+    for i, px, r, k, d in zip(range(len(prices)), prices, rsi, ks, ds):
+        if r is None:
+            continue
+        if gated:
+            # KDTrader._buy_allowed: price above a ready trend SMA, cooldown elapsed
+            up = trend is None or (trend[i] is not None and px > trend[i])
+            if cooldown:
+                now = ts[i]
+
+        # on_rsi --------------------------------------------------------
+        prev_px = t_last_px
+        t_last_px = px
+        if px > 0 and (not gated or (up and now - last_buy >= cooldown)):
+            go = active
+            if not active and qty == 0 and prev_px is not None and px < prev_px and r < threshold:
+                per = batch_lt20 if r < low_band else (batch_mid if r < mid_band else 0)
+                if per > 0 and used + per <= total:
+                    active = True
+                    first_done = False
+                    alloc = per
+                    go = True
+            if go:
+                per = alloc
+                if per <= 0 or used + per > total:
+                    active = first_done = False
+                    alloc = 0
+                else:
+                    used += per
+                    notional = slice_value * per
+                    if notional <= 0:
+                        active = first_done = False
+                        alloc = 0
+                    else:
+                        order_px = avg * mult if first_done else px
+                        if order_px <= 0:
+                            used -= per
+                            active = first_done = False
+                            alloc = 0
+                        else:
+                            q = max(1, int(notional // max(order_px, 1e-9)))
+                            if record is not None:
+                                if first_done:
+                                    record((i, "BUY", q, "LOC", order_px))
+                                else:
+                                    record((i, "BUY", q, "MKT", None))
+                            avg = (avg * qty + px * q) / max(qty + q, 1)
+                            qty += q
+                            first_done = True
+                            last_buy = now
+
+        if d is None:  # K is only reported together with D
+            continue
+
+        # on_kd ---------------------------------------------------------
+        pk, pd = prev_k, prev_d
+        prev_k, prev_d = k, d
+        if qty > 0 and avg > 0 and sl_pct and px <= avg * (1.0 - sl_pct):
+            if record is not None:
+                record((i, "SELL", qty, "MKT", None))
+            realized += (px - avg) * qty
+            qty = 0
+            avg = 0.0
+            used = 0
+            active = first_done = False
+            alloc = 0
+            continue
+
+        if enable_kd_buys and px > 0 and (not gated or (up and now - last_buy >= cooldown)):
+            per = None
+            if k < oversold:
+                per = kd_lt20
+            elif oversold <= k < overbought and pk is not None and pd is not None and pk <= pd and k > d:
+                per = kd_mid
+            if per is not None and used + per <= total:
+                used += per
+                notional = slice_value * per
+                if notional > 0:
+                    q = max(1, int(notional // px))
+                    if record is not None:
+                        record((i, "BUY", q, "MKT", None))
+                    avg = (avg * qty + px * q) / max(qty + q, 1)
+                    qty += q
+                    last_buy = now
+
+        # last_rsi == r: on_rsi always runs first on bars where K/D exist
+        if (pk is not None and pd is not None and pk > pd and k <= d
+                and k > overbought and qty > 0 and r > 80.0):
+            if record is not None:
+                record((i, "SELL", qty, "MKT", None))
+            realized += (px - avg) * qty
+            qty = 0
+            avg = 0.0
+            used = 0
+            active = first_done = False
+            alloc = 0
+
+        if qty > 0 and avg > 0 and px >= avg * (1.0 + tp_pct):
+            if record is not None:
+                record((i, "SELL", qty, "MKT", None))
+            realized += (px - avg) * qty
+            qty = 0
+            avg = 0.0
+            used = 0
+            active = first_done = False
+            alloc = 0
+
+    unrealized = (px - avg) * qty if qty > 0 else 0.0
+    return {
+        "realized_pnl": round(realized, 2),
+        "unrealized_pnl": round(unrealized, 2),
+        "position_qty_end": qty,
+        "slices_in_use_end": used,
+    }
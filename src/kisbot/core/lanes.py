@@ -0,0 +1,255 @@
+"""KDTrader over many independent lanes at once (numpy).
+
+A lane is one trader with its own SliceBook, fill state and parameters. All
+lanes advance together one bar per iteration; every branch of
+`KDTrader.on_rsi`/`on_kd` is a boolean lane mask. Prices and indicators are
+either shared by all lanes (1-D, a parameter sweep) or per lane (2-D
+``(lanes, bars)``, Monte Carlo paths). Indicator periods are shared, so
+RSI/K/D readiness is the same bar for every lane.
+
+The float operations are the ones `KDTrader` and the backtest fill model
+perform, in the same order, so with indicators from
+`kisbot.core.kernel.indicator_arrays` the results equal `backtest()` exactly.
+The trend-SMA and cooldown buy gates are per lane as well (`trend_gate`).
+"""
+from __future__ import annotations
+import math
+from typing import Optional, Sequence
+import numpy as np
+from kisbot.core.kernel import sma_array
+
+# Per-lane parameter arrays built by `lane_params`.
+PARAM_KEYS = (
+    "take_profit_pct", "stop_loss_pct", "rsi_buy_threshold", "rsi_buy_multiplier",
+    "oversold", "overbought", "rsi_low_band", "rsi_mid_band", "enable_kd_buys",
+    "batch_lt20", "batch_20_80", "kd_lt20", "kd_20_80", "slices_total", "slice_value",
+    "trend_sma_period", "add_cooldown_sec",
+)
+
+
+def as_array(series: Sequence) -> np.ndarray:
+    """Indicator list (None where not ready) -> float array with NaN."""
+    return np.array([np.nan if v is None else v for v in series], dtype=np.float64)
+
+
+def lane_params(cfgs: Sequence[dict]) -> dict:
+    """Per-lane parameter arrays from (symbol-merged) configs, with KDTrader's defaults."""
+    rows = []
+    for cfg in cfgs:
+        s, sl = cfg["strategy"], cfg["slices"]
+        enable = bool(s.get("enable_kd_buys", True))
+        rows.append((
+            s.get("take_profit_pct", 0.11),
+            s.get("stop_loss_pct") or 0.0,  # None/0 disables the stop
+            float(s.get("rsi_buy_threshold", 50.0)),
+            float(s.get("rsi_buy_multiplier", 1.1)),
+            s["oversold"],
+            s["overbought"],
+            float(s.get("rsi_low_band", 20.0)),
+            float(s.get("rsi_mid_band", 80.0)),
+            enable,
+            int(sl.get("per_entry_lt20", 0)),
+            int(sl.get("per_entry_20_80", 0)),
+            sl["per_entry_lt20"] if enable else 0,
+            sl["per_entry_20_80"] if enable else 0,
+            sl["total"],
+            math.floor(cfg["risk"]["equity"] / sl["total"]),
+            max(0, int(s.get("trend_sma_period") or 0)),
+            max(0.0, float(s.get("add_cooldown_sec") or 0.0)),  # <= 0 is off
+        ))
+    cols = list(zip(*rows)) if rows else [()] * len(PARAM_KEYS)
+    out = {key: np.array(col, dtype=np.float64) for key, col in zip(PARAM_KEYS, cols)}
+    out["enable_kd_buys"] = out["enable_kd_buys"].astype(bool)
+    return out
+
+
+def trend_gate(prices: np.ndarray, periods: np.ndarray) -> Optional[np.ndarray]:
+    """``(bars, lanes)`` mask of price > its trend SMA (`RollingSMA` over every bar).
+
+    Lanes without a trend period are always True; None when no lane has one.
+    The running sums are the ones `RollingSMA` keeps, so the comparisons agree
+    with `KDTrader` bit for bit.
+    """
+    periods = np.asarray(periods).astype(np.int64)
+    if not (periods > 0).any():
+        return None
+    n = prices.shape[-1]
+    gate = np.ones((n, len(periods)), dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for period in np.unique(periods[periods > 0]).tolist():
+            lanes = periods == period
+            if prices.ndim == 1:
+                sma = as_array(sma_array(prices.tolist(), period))
+                gate[:, lanes] = (prices > sma)[:, None]
+                continue
+            sub = prices[lanes]
+            up = np.zeros((n, len(sub)), dtype=bool)
+            total = np.zeros(len(sub))
+            for t in range(n):
+                if t >= period:
+                    total -= sub[:, t - period]
+                total += sub[:, t]
+                if t >= period - 1:
+                    up[t] = sub[:, t] > total / period
+            gate[:, lanes] = up
+    return gate
+
+
+def simulate_lanes(prices, rsi, k, d, params: dict, track_drawdown: bool = True, ts=None) -> dict:
+    """Run every lane over the bars; returns per-lane arrays.
+
+    Keys: realized, unrealized, pnl, max_drawdown (of realized + mark-to-market
+    PnL; zeros unless `track_drawdown`), qty, slices. `ts` (bar timestamps in
+    seconds, shared by all lanes) is required when a lane has a cooldown.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    rsi, k, d = (np.asarray(a, dtype=np.float64) for a in (rsi, k, d))
+    shared = prices.ndim == 1
+    n_lanes = len(params["slices_total"])
+    n = prices.shape[-1]
+    p = params
+    tp, sl, thr, mult = p["take_profit_pct"], p["stop_loss_pct"], p["rsi_buy_threshold"], p["rsi_buy_multiplier"]
+    oversold, overbought = p["oversold"], p["overbought"]
+    low_band, mid_band, enable = p["rsi_low_band"], p["rsi_mid_band"], p["enable_kd_buys"]
+    batch_lt20, batch_mid = p["batch_lt20"], p["batch_20_80"]
+    kd_lt20, kd_mid = p["kd_lt20"], p["kd_20_80"]
+    total, slice_value = p["slices_total"], p["slice_value"]
+    cooldown = p["add_cooldown_sec"]
+    if cooldown.any() and ts is None:
+        raise ValueError("add_cooldown_sec needs bar timestamps (ts)")
+    trend = trend_gate(prices, p["trend_sma_period"])
+    gated = trend is not None or bool(cooldown.any())
+    times = np.asarray(ts, dtype=np.float64).tolist() if cooldown.any() else [0.0] * n
+    last_buy = np.full(n_lanes, -np.inf)
+
+    qty = np.zeros(n_lanes)
+    avg = np.zeros(n_lanes)
+    used = np.zeros(n_lanes)
+    realized = np.zeros(n_lanes)
+    active = np.zeros(n_lanes, dtype=bool)
+    first_done = np.zeros(n_lanes, dtype=bool)
+    alloc = np.zeros(n_lanes)
+    peak = np.zeros(n_lanes)
+    max_dd = np.zeros(n_lanes)
+    # KDTrader.last_px / prev_k / prev_d. With shared prices they are the same
+    # for every lane, so they stay scalars and the cross tests are scalar too.
+    nan = float("nan") if shared else np.full(n_lanes, np.nan)
+    last_px = prev_k = prev_d = nan
+    if shared:
+        columns = zip(prices.tolist(), rsi.tolist(), k.tolist(), d.tolist())
+    else:
+        columns = ((prices[:, t], rsi[:, t], k[:, t], d[:, t]) for t in range(n))
+
+    def reset(mask):
+        active[mask] = False
+        first_done[mask] = False
+        alloc[mask] = 0
+
+    def buy(mask, q, px):
+        new_qty = qty + q
+        avg[:] = np.where(mask, (avg * qty + px * q) / np.maximum(new_qty, 1), avg)
+        qty[:] = np.where(mask, new_qty, qty)
+
+    def sell_all(mask, px):
+        mask = mask & (qty > 0)
+        if mask.any():
+            realized[:] = np.where(mask, realized + (px - avg) * qty, realized)
+            qty[mask] = 0
+            avg[mask] = 0.0
+            used[mask] = 0
+            reset(mask)
+
+    px = nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for t, (px, r, kt, dt) in enumerate(columns):
+            r0 = r if shared else r[0]
+            if gated:
+                # KDTrader._buy_allowed, per lane
+                now = times[t]
+                up = trend[t] if trend is not None else True
+                ok = up & (now - last_buy >= cooldown)
+            else:
+                ok = True
+            if r0 == r0:  # RSI ready
+                # on_rsi
+                prev_px = last_px
+                last_px = px
+                down = (px < prev_px) & (r < thr) & (px > 0) & ok
+                if np.any(down):
+                    per = np.where(r < low_band, batch_lt20, np.where(r < mid_band, batch_mid, 0))
+                    start = down & ~active & (qty == 0) & (per > 0) & (used + per <= total)
+                    if start.any():
+                        active |= start
+                        first_done[start] = False
+                        alloc[start] = per[start]
+                go = active & (px > 0) & ok
+                if go.any():
+                    bad = go & ((alloc <= 0) | (used + alloc > total))
+                    reset(bad)
+                    go &= ~bad
+                    used += np.where(go, alloc, 0)
+                    notional = slice_value * alloc
+                    # reserve() already counted the slices; KDTrader only resets the batch
+                    bad = go & (notional <= 0)
+                    reset(bad)
+                    go &= ~bad
+                    order_px = np.where(first_done, avg * mult, px)
+                    bad = go & (order_px <= 0)
+                    used -= np.where(bad, alloc, 0)
+                    reset(bad)
+                    go &= ~bad
+                    q = np.maximum(1, np.floor_divide(notional, np.maximum(order_px, 1e-9)))
+                    buy(go, q, px)
+                    first_done |= go
+                    if gated:
+                        last_buy[go] = now
+                        ok = up & (now - last_buy >= cooldown)
+
+            d0 = dt if shared else dt[0]
+            if d0 == d0:  # K/D ready
+                # on_kd (last_rsi == r: on_rsi always runs first on these bars)
+                pk, pd = prev_k, prev_d
+                prev_k, prev_d = kt, dt
+                last_px = px
+                alive = True
+                if qty.any():
+                    hit = (qty > 0) & (avg > 0) & (sl > 0) & (px <= avg * (1.0 - sl))
+                    sell_all(hit, px)
+                    alive = ~hit
+                buyable = alive & ok
+                low = buyable & enable & (px > 0) & (kt < oversold)
+                bull = (pk <= pd) & (kt > dt) & (px > 0)
+                if np.any(bull):
+                    mid = buyable & enable & bull & ~low & (kt >= oversold) & (kt < overbought)
+                    cand = low | mid
+                else:
+                    cand = low
+                if np.any(cand):
+                    per = np.where(low, kd_lt20, kd_mid)
+                    cand = cand & (used + per <= total)
+                    used += np.where(cand, per, 0)
+                    notional = slice_value * per
+                    cand &= notional > 0
+                    buy(cand, np.maximum(1, np.floor_divide(notional, px)), px)
+                    if gated:
+                        last_buy[cand] = now
+                if qty.any():
+                    bear = (pk > pd) & (kt <= dt) & (r > 80.0)
+                    if np.any(bear):
+                        sell_all(alive & bear & (kt > overbought), px)
+                    sell_all(alive & (avg > 0) & (px >= avg * (1.0 + tp)), px)
+
+            if track_drawdown:
+                equity = realized + np.where(qty > 0, (px - avg) * qty, 0.0)
+                np.maximum(peak, equity, out=peak)
+                np.maximum(max_dd, peak - equity, out=max_dd)
+
+    unrealized = np.where(qty > 0, (px - avg) * qty, 0.0) if n else np.zeros(n_lanes)
+    return {
+        "realized": realized,
+        "unrealized": unrealized,
+        "pnl": realized + unrealized,
+        "max_drawdown": max_dd,
+        "qty": qty.astype(np.int64),
+        "slices": used.astype(np.int64),
+    }
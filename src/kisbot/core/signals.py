@@ -1,4 +1,5 @@
 from __future__ import annotations
+from kisbot.core.indicators import CooldownClock, RollingSMA
 
 
 class KDTrader:
@@ -16,6 +17,35 @@ class KDTrader:
         self.batch_active = False
         self.batch_first_order_done = False
         self.batch_slice_allocation = 0
+        # Buy gates: price above its trend SMA (trend_sma_period > 0, fed by
+        # on_price) and add_cooldown_sec since the previous buy.
+        self.trend = None
+        self.trend_sma = None
+        self.cooldown = CooldownClock()
+        self._configure_gates()
+
+    def apply_config(self, cfg) -> None:
+        """Switch to `cfg`, keeping position/batch state; the trend SMA re-warms only if its period changed."""
+        self.cfg = cfg
+        self._configure_gates()
+
+    def _configure_gates(self) -> None:
+        s = self.cfg["strategy"]
+        period = int(s.get("trend_sma_period") or 0)
+        if period != (self.trend.period if self.trend is not None else 0):
+            self.trend = RollingSMA(period) if period > 0 else None
+            self.trend_sma = None
+        self.cooldown.seconds = float(s.get("add_cooldown_sec") or 0.0)
+
+    # Buy gates ---------------------------------------------------------
+    def on_price(self, last_px: float) -> None:
+        """Feed every tick's price to the trend SMA; call before on_rsi/on_kd (only needed with a trend filter)."""
+        self.trend_sma = self.trend.update(last_px)
+
+    def _buy_allowed(self, last_px: float, now: float) -> bool:
+        if self.trend is not None and (self.trend_sma is None or last_px <= self.trend_sma):
+            return False
+        return self.cooldown.ready(now)
 
     # Batch helpers -----------------------------------------------------
     def _reset_batch(self) -> None:
@@ -48,6 +78,8 @@ class KDTrader:
 
         if rsi is None or last_px <= 0:
             return
+        if (self.trend is not None or self.cooldown.seconds) and not self._buy_allowed(last_px, now):
+            return
         if equity_fetch:
             self.book.equity = equity_fetch()
 
@@ -97,6 +129,7 @@ class KDTrader:
             place_order(self.symbol, "BUY", qty, "LOC", order_price)
         else:
             place_order(self.symbol, "BUY", qty, "MKT")
+        self.cooldown.mark(now)
 
         prev_qty = self.position_qty
         self.position_qty += qty
@@ -132,7 +165,8 @@ class KDTrader:
                 return
 
         enable_kd_buys = bool(self.cfg["strategy"].get("enable_kd_buys", True))
-        if enable_kd_buys and last_px > 0:
+        ungated = self.trend is None and not self.cooldown.seconds
+        if enable_kd_buys and last_px > 0 and (ungated or self._buy_allowed(last_px, now)):
             if k < self.cfg["strategy"]["oversold"]:
                 per_entry = self.cfg["slices"]["per_entry_lt20"]
                 notional = self.book.reserve(per_entry)
@@ -140,6 +174,7 @@ class KDTrader:
                     qty = max(min_lot, int(notional // last_px))
                     if qty > 0:
                         place_order(self.symbol, "BUY", qty, "MKT")
+                        self.cooldown.mark(now)
                         self.position_qty += qty
                         self.avg_px = (
                             (self.avg_px * (self.position_qty - qty)) + last_px * qty
@@ -158,6 +193,7 @@ class KDTrader:
                         qty = max(min_lot, int(notional // last_px))
                         if qty > 0:
                             place_order(self.symbol, "BUY", qty, "MKT")
+                            self.cooldown.mark(now)
                             self.position_qty += qty
                             self.avg_px = (
                                 (self.avg_px * (self.position_qty - qty)) + last_px * qty
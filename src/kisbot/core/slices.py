@@ -17,3 +17,57 @@ class SliceBook:
         return self.slice_value * per_entry
     def free_all(self):
         self.slices_in_use = 0
+
+
+class SharedSliceBook:
+    """One capital pool shared by several traders; hand each trader `view(symbol)`."""
+    def __init__(self, equity: float, slices_total=60):
+        self.equity = equity
+        self.slices_total = slices_total
+        self.slices_in_use = 0
+        self.by_symbol: dict[str, int] = {}
+    @property
+    def slice_value(self) -> float:
+        return math.floor(self.equity / self.slices_total)
+    def can_add(self, per_entry: int) -> bool:
+        return self.slices_in_use + per_entry <= self.slices_total
+    def view(self, symbol: str) -> "SliceView":
+        self.by_symbol.setdefault(symbol, 0)
+        return SliceView(self, symbol)
+
+
+class SliceView:
+    """SliceBook interface over a SharedSliceBook; `free_all` frees only this symbol's slices."""
+    __slots__ = ("shared", "symbol")
+    def __init__(self, shared: SharedSliceBook, symbol: str):
+        self.shared = shared
+        self.symbol = symbol
+    @property
+    def equity(self) -> float:
+        return self.shared.equity
+    @equity.setter
+    def equity(self, value: float) -> None:
+        self.shared.equity = value
+    @property
+    def slices_total(self) -> int:
+        return self.shared.slices_total
+    @property
+    def slices_in_use(self) -> int:
+        return self.shared.by_symbol[self.symbol]
+    @slices_in_use.setter
+    def slices_in_use(self, value: int) -> None:
+        # Traders adjust usage directly (e.g. `-= per_entry` on a rejected order).
+        self.shared.slices_in_use += value - self.shared.by_symbol[self.symbol]
+        self.shared.by_symbol[self.symbol] = value
+    @property
+    def slice_value(self) -> float:
+        return self.shared.slice_value
+    def can_add(self, per_entry: int) -> bool:
+        return self.shared.can_add(per_entry)
+    def reserve(self, per_entry: int) -> float:
+        if not self.can_add(per_entry):
+            return 0.0
+        self.slices_in_use += per_entry
+        return self.slice_value * per_entry
+    def free_all(self):
+        self.slices_in_use = 0
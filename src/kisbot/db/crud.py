@@ -1,18 +1,97 @@
 from __future__ import annotations
 from datetime import datetime
-from .base import Session
+from sqlalchemy import select
+from . import base
 from . import models as M
 
 async def insert_signal(symbol: str, side: str, k: float, d: float, note: str | None = None):
-    if Session is None:
+    if base.Session is None:
         return
-    async with Session() as s:
+    async with base.Session() as s:
         s.add(M.Signal(ts=datetime.utcnow(), symbol=symbol, side=side, k=k, d=d, note=note))
         await s.commit()
 
 async def insert_order(clordid: str, symbol: str, side: str, qty: int, type_: str, px: float | None, status: str, mode: str):
-    if Session is None:
+    if base.Session is None:
         return
-    async with Session() as s:
+    async with base.Session() as s:
         s.add(M.Order(ts=datetime.utcnow(), clordid=clordid, symbol=symbol, side=side, qty=qty, type=type_, px=px, status=status, mode=mode))
         await s.commit()
+
+# Rows per multi-row statement: at ~9 bind parameters per order row this stays
+# well under asyncpg's 32767-parameter limit however many orders changed.
+WRITE_CHUNK = 1000
+
+async def write_orders(orders: list[dict], trades: list[dict]):
+    """Upsert order rows by clordid (new orders and status changes), then insert their trades."""
+    if base.Session is None or not (orders or trades):
+        return
+    from sqlalchemy.dialects.postgresql import insert
+    async with base.Session() as s:
+        ids = {}
+        for i in range(0, len(orders), WRITE_CHUNK):
+            stmt = insert(M.Order).values(orders[i:i + WRITE_CHUNK])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[M.Order.clordid],
+                set_={"status": stmt.excluded.status},
+            ).returning(M.Order.clordid, M.Order.id)
+            ids.update((await s.execute(stmt)).all())
+        missing = list({t["clordid"] for t in trades} - ids.keys())
+        for i in range(0, len(missing), WRITE_CHUNK):
+            q = select(M.Order.clordid, M.Order.id).where(M.Order.clordid.in_(missing[i:i + WRITE_CHUNK]))
+            ids.update((await s.execute(q)).all())
+        if trades:
+            await s.execute(insert(M.Trade), [
+                {"order_id": ids[t["clordid"]], **{k: t[k] for k in ("ts", "symbol", "side", "qty", "px")}}
+                for t in trades
+            ])
+        await s.commit()
+
+async def recent_kd(symbol: str, since: datetime, rollup: bool = False):
+    """(ts, k, d) for `symbol` since `since`; served by the (symbol, ts) index / partition pruning."""
+    if base.Session is None:
+        return []
+    if rollup:
+        q = select(M.SignalMinute.ts, M.SignalMinute.k_last, M.SignalMinute.d_last).where(
+            M.SignalMinute.symbol == symbol, M.SignalMinute.ts >= since).order_by(M.SignalMinute.ts)
+    else:
+        q = select(M.Signal.ts, M.Signal.k, M.Signal.d).where(
+            M.Signal.symbol == symbol, M.Signal.ts >= since).order_by(M.Signal.ts)
+    async with base.Session() as s:
+        return (await s.execute(q)).all()
+
+async def upsert_positions(rows: list[dict]):
+    if base.Session is None or not rows:
+        return
+    from sqlalchemy.dialects.postgresql import insert
+    stmt = insert(M.Position)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[M.Position.symbol],
+        set_={c: stmt.excluded[c] for c in ("qty", "avg_px", "u_pnl", "r_pnl", "last_ts")},
+    )
+    async with base.Session() as s:
+        await s.execute(stmt, rows)
+        await s.commit()
+
+async def upsert_pnl_daily(rows: list[dict]):
+    if base.Session is None or not rows:
+        return
+    from sqlalchemy.dialects.postgresql import insert
+    stmt = insert(M.PnLDaily)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[M.PnLDaily.dt],
+        set_={c: stmt.excluded[c] for c in ("realized", "unrealized", "max_dd")},
+    )
+    async with base.Session() as s:
+        await s.execute(stmt, rows)
+        await s.commit()
+
+async def write_pnl(positions: list[dict], daily: list[dict]):
+    await upsert_positions(positions)
+    await upsert_pnl_daily(daily)
+
+async def load_positions():
+    if base.Session is None:
+        return []
+    async with base.Session() as s:
+        return (await s.execute(select(M.Position))).scalars().all()
@@ -1,19 +1,39 @@
 from __future__ import annotations
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import BigInteger, Float, Text, DateTime, Integer, JSON
+from sqlalchemy import BigInteger, Float, Text, DateTime, Integer, JSON, Index
 from datetime import datetime
 from .base import Base
 
 class Signal(Base):
+    # Range-partitioned by day on ts (see db/partitions.py); the partition key must be
+    # part of the primary key.
     __tablename__ = 'signals'
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
-    ts: Mapped[datetime]
+    __table_args__ = (
+        Index('ix_signals_symbol_ts', 'symbol', 'ts'),
+        {'postgresql_partition_by': 'RANGE (ts)'},
+    )
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    ts: Mapped[datetime] = mapped_column(primary_key=True)
     symbol: Mapped[str] = mapped_column(Text)
     side: Mapped[str] = mapped_column(Text)
     k: Mapped[float] = mapped_column(Float)
     d: Mapped[float] = mapped_column(Float)
     note: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+class SignalMinute(Base):
+    """1-minute K/D rollup of raw `signals` rows."""
+    __tablename__ = 'signals_1m'
+    __table_args__ = (Index('ix_signals_1m_ts', 'ts'),)
+    symbol: Mapped[str] = mapped_column(Text, primary_key=True)
+    ts: Mapped[datetime] = mapped_column(primary_key=True)
+    n: Mapped[int] = mapped_column(Integer)
+    k_last: Mapped[float] = mapped_column(Float)
+    d_last: Mapped[float] = mapped_column(Float)
+    k_min: Mapped[float] = mapped_column(Float)
+    k_max: Mapped[float] = mapped_column(Float)
+    k_avg: Mapped[float] = mapped_column(Float)
+    d_avg: Mapped[float] = mapped_column(Float)
+
 class Order(Base):
     __tablename__ = 'orders'
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
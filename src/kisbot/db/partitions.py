@@ -0,0 +1,131 @@
+"""Daily range partitions, 1-minute rollups and retention for `signals`.
+
+Raw tick signals go to `signals_pYYYYMMDD` children of the partitioned `signals`
+table. Retention drops whole partitions (a catalog operation, independent of row
+count) instead of deleting rows, and the (symbol, ts) index is created per
+partition so a "last day for one symbol" query touches one or two small indexes.
+"""
+from __future__ import annotations
+import asyncio
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from kisbot.infra.logger import log
+from . import base
+
+PARENT = "signals"
+ROLLUP = "signals_1m"
+
+
+def partition_name(day: date) -> str:
+    return f"{PARENT}_p{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> date | None:
+    prefix = f"{PARENT}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+async def ensure_partitions(conn, start: date, days: int) -> list[str]:
+    """Create daily partitions for [start, start + days] if missing."""
+    created = []
+    for i in range(days + 1):
+        day = start + timedelta(days=i)
+        name = partition_name(day)
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT} "
+            f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        ))
+        created.append(name)
+    return created
+
+
+async def list_partitions(conn) -> list[str]:
+    res = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :parent ORDER BY c.relname"
+    ), {"parent": PARENT})
+    return [r[0] for r in res]
+
+
+async def drop_partitions_before(conn, cutoff: date) -> list[str]:
+    """Drop every daily partition whose whole range is older than `cutoff`."""
+    dropped = []
+    for name in await list_partitions(conn):
+        day = partition_day(name)
+        if day is not None and day < cutoff:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    return dropped
+
+
+async def rollup(conn, since: datetime, until: datetime) -> int:
+    """Condense raw signals in [since, until) into 1-minute K/D rows (idempotent upsert)."""
+    res = await conn.execute(text(f"""
+        INSERT INTO {ROLLUP} (symbol, ts, n, k_last, d_last, k_min, k_max, k_avg, d_avg)
+        SELECT symbol,
+               date_trunc('minute', ts) AS bucket,
+               count(*),
+               (array_agg(k ORDER BY ts DESC))[1],
+               (array_agg(d ORDER BY ts DESC))[1],
+               min(k), max(k), avg(k), avg(d)
+        FROM {PARENT}
+        WHERE ts >= :since AND ts < :until
+        GROUP BY symbol, bucket
+        ON CONFLICT (symbol, ts) DO UPDATE SET
+            n = EXCLUDED.n, k_last = EXCLUDED.k_last, d_last = EXCLUDED.d_last,
+            k_min = EXCLUDED.k_min, k_max = EXCLUDED.k_max,
+            k_avg = EXCLUDED.k_avg, d_avg = EXCLUDED.d_avg
+    """), {"since": since, "until": until})
+    return res.rowcount or 0
+
+
+async def prepare(cfg: dict, now=datetime.utcnow) -> list[str]:
+    """Create today's partition and `partition_days_ahead` more, once, before the first insert.
+
+    Migrations have no DEFAULT partition, so after downtime inserts would fail
+    until the first `run_maintenance` pass; callers await this before the feed.
+    """
+    async with base._engine.begin() as conn:
+        return await ensure_partitions(conn, now().date(), int(cfg.get("partition_days_ahead", 2)))
+
+
+async def run_maintenance(cfg: dict, now=datetime.utcnow) -> None:
+    """Background job: keep partitions ahead, roll up closed minutes, apply retention.
+
+    cfg keys (all optional): partition_days_ahead (2), retention_days (7),
+    rollup_retention_days (365), interval_sec (60).
+    """
+    ahead = int(cfg.get("partition_days_ahead", 2))
+    retention = int(cfg.get("retention_days", 7))
+    rollup_retention = int(cfg.get("rollup_retention_days", 365))
+    interval = float(cfg.get("interval_sec", 60))
+    watermark: datetime | None = None
+    while True:
+        if base._engine is not None:
+            t = now()
+            minute = t.replace(second=0, microsecond=0)
+            since = watermark or (minute - timedelta(minutes=10))
+            try:
+                async with base._engine.begin() as conn:
+                    await ensure_partitions(conn, t.date(), ahead)
+                    # Re-roll the previous minute too: late ticks for it may have landed.
+                    n = await rollup(conn, since - timedelta(minutes=1), minute)
+                    dropped = await drop_partitions_before(conn, t.date() - timedelta(days=retention))
+                    await conn.execute(
+                        text(f"DELETE FROM {ROLLUP} WHERE ts < :cutoff"),
+                        {"cutoff": minute - timedelta(days=rollup_retention)},
+                    )
+            except Exception as e:
+                # Keep the job alive: the next pass retries from the same watermark.
+                log("signals.maintenance_error", error=str(e))
+            else:
+                watermark = minute
+                log("signals.maintenance", rolled_up=n, dropped=dropped)
+        await asyncio.sleep(interval)
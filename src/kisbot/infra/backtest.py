@@ -1,28 +1,32 @@
 from __future__ import annotations
-import asyncio, uuid
+import asyncio, heapq, uuid
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import Iterable, Tuple, Optional
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Tuple, Optional
 from kisbot.core.indicators import StochRSI
-from kisbot.core.slices import SliceBook
+from kisbot.core.slices import SharedSliceBook, SliceBook
 from kisbot.core.signals import KDTrader
 
 
-def _load_prices_csv(data_dir: str, symbol: str, from_date: str, to_date: str, column: str = "close") -> Iterable[Tuple[float, float]]:
-    """Yield (ts, price) from CSV at `{data_dir}/{symbol}.csv`.
+def _no_stage(name: str):
+    return nullcontext()
 
-    Accepted columns (case-insensitive):
-    - Generic: `timestamp` or `datetime` and `<column>` (default: close)
-    - Yahoo format: `Date`, `Close` (or `Adj Close` if column == 'adj_close')
-    Returns timestamps as float seconds since epoch for simplicity.
-    """
-    import os
-    import pandas as pd
 
-    path = os.path.join(data_dir, f"{symbol}.csv")
-    if not os.path.exists(path):
-        return []
-    df = pd.read_csv(path)
-    cols = {c.lower().strip(): c for c in df.columns}
+def _parse_ts(value: str) -> float:
+    """ISO date/datetime string -> float seconds since epoch (naive values are UTC)."""
+    value = value.strip()
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _csv_columns(header, column: str, path: str) -> Tuple[int, int]:
+    """(datetime column, price column) indices of a price CSV header."""
+    cols = {c.lower().strip(): i for i, c in enumerate(header)}
 
     # Determine datetime column
     dt_col = None
@@ -30,7 +34,7 @@ def _load_prices_csv(data_dir: str, symbol: str, from_date: str, to_date: str, c
         if candidate in cols:
             dt_col = cols[candidate]
             break
-    if not dt_col:
+    if dt_col is None:
         raise ValueError(f"No datetime column found in {path}")
 
     # Determine price column
@@ -43,16 +47,52 @@ def _load_prices_csv(data_dir: str, symbol: str, from_date: str, to_date: str, c
         px_col = cols["close"]
     else:
         raise ValueError(f"Price column '{column}' not found in {path}")
+    return dt_col, px_col
 
-    df[dt_col] = pd.to_datetime(df[dt_col], utc=True)
-    from_ts = pd.Timestamp(from_date, tz='UTC')
-    to_ts = pd.Timestamp(to_date, tz='UTC')
-    mask = (df[dt_col] >= from_ts) & (df[dt_col] <= to_ts)
-    df = df.loc[mask].sort_values(dt_col)
 
-    for _, row in df.iterrows():
-        ts = pd.Timestamp(row[dt_col]).timestamp()
-        yield ts, float(row[px_col])
+def _iter_prices_csv(data_dir: str, symbol: str, from_date: str, to_date: str, column: str = "close",
+                     ordered: bool = False) -> Iterator[Tuple[float, float]]:
+    """Yield (ts, price) rows of `{data_dir}/{symbol}.csv` in [from_date, to_date], in file order.
+
+    Accepted columns (case-insensitive):
+    - Generic: `timestamp` or `datetime` and `<column>` (default: close)
+    - Yahoo format: `Date`, `Close` (or `Adj Close` if column == 'adj_close')
+    Returns timestamps as float seconds since epoch for simplicity.
+    Parsed with the stdlib `csv` module so backtests do not pay the pandas import.
+    With `ordered=True` the file must be sorted by time (ValueError otherwise) and
+    reading stops at the first row past `to_date`, so only one row is held at a time.
+    """
+    import csv
+    import os
+
+    path = os.path.join(data_dir, f"{symbol}.csv")
+    if not os.path.exists(path):
+        return
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        dt_col, px_col = _csv_columns(next(reader, None) or [], column, path)
+        from_ts = _parse_ts(from_date)
+        to_ts = _parse_ts(to_date)
+        prev = float("-inf")
+        for row in reader:
+            if len(row) <= max(dt_col, px_col) or not row[px_col].strip():
+                continue
+            ts = _parse_ts(row[dt_col])
+            if ordered:
+                if ts < prev:
+                    raise ValueError(f"{path} is not sorted by time")
+                prev = ts
+                if ts > to_ts:
+                    return
+            if from_ts <= ts <= to_ts:
+                yield ts, float(row[px_col])
+
+
+def _load_prices_csv(data_dir: str, symbol: str, from_date: str, to_date: str, column: str = "close") -> Iterable[Tuple[float, float]]:
+    """All (ts, price) rows of `{data_dir}/{symbol}.csv` in range, sorted by time."""
+    rows = list(_iter_prices_csv(data_dir, symbol, from_date, to_date, column))
+    rows.sort(key=lambda r: r[0])
+    return rows
 
 
 @dataclass
@@ -84,73 +124,215 @@ def _merge_dicts(base: dict, overlay: dict) -> dict:
     return out
 
 
-async def backtest(cfg, from_date: str, to_date: str, symbols: list[str], quiet: bool = False):
-    bars_cfg = cfg.get("bars", {})
-    mode = bars_cfg.get("type", "tick")
+def _price_stream(scfg: dict, sym: str, from_date: str, to_date: str, streaming: bool = False):
+    """(ts, price) rows for `sym`, in time order.
+
+    Time-ordered CSVs are read block by block through `kisbot.infra.chunked`
+    (bounded memory, out-of-range blocks skipped). Unsorted files are loaded
+    and sorted in memory, or rejected when `streaming`.
+    """
+    bars_cfg = scfg.get("bars", {})
     data_dir = bars_cfg.get("data_dir")
-    price_col = bars_cfg.get("column", "close")
+    if bars_cfg.get("type", "tick") == "csv" and data_dir:
+        import os
+        from kisbot.infra.chunked import CHUNK_BYTES, chunk_index, iter_rows
+        column = bars_cfg.get("column", "close")
+        path = os.path.join(data_dir, f"{sym}.csv")
+        if os.path.exists(path):
+            chunk_bytes = int(bars_cfg.get("chunk_bytes", CHUNK_BYTES))
+            idx = chunk_index(path, column, chunk_bytes)
+            if idx["sorted"]:
+                return iter_rows(path, from_date, to_date, column, chunk_bytes, idx)
+        if streaming:
+            return _iter_prices_csv(data_dir, sym, from_date, to_date, column=column, ordered=True)
+        return _load_prices_csv(data_dir, sym, from_date, to_date, column=column)
 
-    results = []
-    for sym in symbols:
-        scfg = _merge_dicts(cfg, (cfg.get('symbols') or {}).get(sym, {}))
-        stoch = StochRSI(scfg['strategy']['rsi_period'], scfg['strategy']['stoch_period'], scfg['strategy']['k_period'], scfg['strategy']['d_period'])
-        book = SliceBook(scfg['risk']['equity'], scfg['slices']['total'])
-        trader = KDTrader(sym, book, scfg)
-        sim = SimState()
-
-        def place(symbol: str, side: str, qty: int, type_: str):
-            nonlocal sim, last_px
-            if side == "BUY":
-                sim.buy(qty, last_px)
-            else:
-                sim.sell_all(last_px)
-        def place_rsi(symbol: str, side: str, qty: int, type_: str, price: Optional[float] = None):
-            # Ignore price in backtest fill; use last_px for execution
-            nonlocal sim, last_px
-            if side == "BUY":
-                sim.buy(qty, last_px)
-            else:
-                sim.sell_all(last_px)
-
-        last_px: float = 0.0
-
-        if mode == "csv" and data_dir:
-            stream = _load_prices_csv(data_dir, sym, from_date, to_date, column=price_col)
+    # Synthetic fallback generator
+    def _synthetic():
+        px = 100.0
+        now = 0.0
+        for i in range(5000):
+            px += (0.05 if i % 2 == 0 else -0.03)
+            now += 1.0
+            yield now, px
+    return _synthetic()
+
+
+def _data_path(scfg: dict, sym: str) -> str | None:
+    bars_cfg = scfg.get("bars", {})
+    if bars_cfg.get("type", "tick") == "csv" and bars_cfg.get("data_dir"):
+        import os
+        return os.path.join(bars_cfg["data_dir"], f"{sym}.csv")
+    return None
+
+
+class _Leg:
+    """One symbol's indicator, trader and simulated fills."""
+    __slots__ = ("symbol", "stoch", "trader", "sim", "last_px", "fill")
+
+    def __init__(self, sym: str, scfg: dict, book, prof=None):
+        self.symbol = sym
+        self.stoch = StochRSI(scfg['strategy']['rsi_period'], scfg['strategy']['stoch_period'], scfg['strategy']['k_period'], scfg['strategy']['d_period'])
+        self.trader = KDTrader(sym, book, scfg)
+        self.sim = SimState()
+        self.last_px = 0.0
+        self.fill = self.place
+        if prof is not None:
+            self.stoch.update = prof.wrap("indicators", self.stoch.update)
+            self.trader.on_rsi = prof.wrap("signals", self.trader.on_rsi)
+            self.trader.on_kd = prof.wrap("signals", self.trader.on_kd)
+            self.fill = prof.wrap("fills", self.place)
+
+    def __getstate__(self):
+        # `fill` (and any profiler wrappers) are rebuilt, not pickled.
+        return self.symbol, self.stoch, self.trader, self.sim, self.last_px
+
+    def __setstate__(self, state):
+        self.symbol, self.stoch, self.trader, self.sim, self.last_px = state
+        self.fill = self.place
+
+    def place(self, symbol: str, side: str, qty: int, type_: str, price: Optional[float] = None):
+        # Ignore price in backtest fill; use last_px for execution
+        if side == "BUY":
+            self.sim.buy(qty, self.last_px)
         else:
-            # Synthetic fallback generator
-            def _synthetic():
-                px = 100.0
-                import time
-                now = 0.0
-                for i in range(5000):
-                    px += (0.05 if i % 2 == 0 else -0.03)
-                    now += 1.0
-                    yield now, px
-            stream = _synthetic()
-
-        for ts, px in stream:
-            last_px = px
-            k, d = stoch.update(px)
-            if k is None or d is None:
-                # Even if K/D not ready, RSI might be
-                rsi_val = stoch.rsi.last
-                if rsi_val is not None:
-                    trader.on_rsi(rsi_val, px, ts, place_order=place_rsi)
-                continue
-            # RSI-based buy path
-            rsi_val = stoch.rsi.last
-            if rsi_val is not None:
-                trader.on_rsi(rsi_val, px, ts, place_order=place_rsi)
-            trader.on_kd(k, d, px, ts, place_order=place)
-
-        unrealized = (last_px - sim.avg_px) * sim.qty if sim.qty > 0 else 0.0
-        results.append({
-            "symbol": sym,
+            self.sim.sell_all(self.last_px)
+
+    def step(self, ts: float, px: float) -> None:
+        self.last_px = px
+        k, d = self.stoch.update(px)
+        if self.trader.trend is not None:
+            self.trader.on_price(px)
+        # RSI-based buy path (RSI may be ready before K/D)
+        rsi_val = self.stoch.rsi.last
+        if rsi_val is not None:
+            self.trader.on_rsi(rsi_val, px, ts, place_order=self.fill)
+        if k is None or d is None:
+            return
+        self.trader.on_kd(k, d, px, ts, place_order=self.fill)
+
+    def value(self) -> float:
+        """Realized plus mark-to-market PnL."""
+        sim = self.sim
+        return sim.realized + ((self.last_px - sim.avg_px) * sim.qty if sim.qty > 0 else 0.0)
+
+    def metrics(self) -> dict:
+        sim = self.sim
+        unrealized = (self.last_px - sim.avg_px) * sim.qty if sim.qty > 0 else 0.0
+        return {
+            "symbol": self.symbol,
             "realized_pnl": round(sim.realized, 2),
             "unrealized_pnl": round(unrealized, 2),
             "position_qty_end": sim.qty,
-            "slices_in_use_end": book.slices_in_use,
-        })
+            "slices_in_use_end": self.trader.book.slices_in_use,
+        }
+
+
+def _simulate_symbol(sym: str, scfg: dict, from_date: str, to_date: str, engine: str = "object", prof=None) -> dict:
+    """One symbol's metrics; `prof` (a `StageProfiler`) times load/indicators/signals/fills."""
+    stage = prof.stage if prof is not None else _no_stage
+    if engine == "kernel":
+        from kisbot.core.kernel import indicator_arrays, simulate_arrays
+        st = scfg['strategy']
+        with stage("load"):
+            rows = list(_price_stream(scfg, sym, from_date, to_date))
+            ts = [t for t, _ in rows]
+            prices = [px for _, px in rows]
+        with stage("indicators"):
+            rsi, k, d = indicator_arrays(prices, st['rsi_period'], st['stoch_period'], st['k_period'], st['d_period'])
+        with stage("signals"):
+            return {"symbol": sym, **simulate_arrays(prices, rsi, k, d, scfg, ts=ts)}
+    if engine != "object":
+        raise ValueError(f"Unknown backtest engine '{engine}' (expected 'object' or 'kernel')")
+    leg = _Leg(sym, scfg, SliceBook(scfg['risk']['equity'], scfg['slices']['total']), prof)
+    with stage("load"):
+        stream = _price_stream(scfg, sym, from_date, to_date)
+    if prof is not None:
+        stream = prof.iter("load", stream)
+    for ts, px in stream:
+        leg.step(ts, px)
+    return leg.metrics()
+
+
+def _resume_symbol(sym: str, scfg: dict, from_date: str, to_date: str, cache) -> Tuple[dict, bool]:
+    """Object-engine run continued from `cache`'s checkpoint when the data was only appended to.
+
+    Returns (metrics, resumed) and checkpoints the end state for the next run.
+    Only time-ordered CSVs are checkpointed: with them the bars after the
+    checkpoint are exactly the new ones, so the result equals a full run.
+    """
+    import os, pickle
+    from kisbot.infra.bt_cache import tail_hash
+    from kisbot.infra.chunked import CHUNK_BYTES, chunk_index
+    path = _data_path(scfg, sym)
+    if path is None or not os.path.exists(path):
+        return _simulate_symbol(sym, scfg, from_date, to_date), False
+    bars_cfg = scfg["bars"]
+    size = os.path.getsize(path)
+    if not chunk_index(path, bars_cfg.get("column", "close"), int(bars_cfg.get("chunk_bytes", CHUNK_BYTES)))["sorted"]:
+        return _simulate_symbol(sym, scfg, from_date, to_date), False
+    key = cache.checkpoint_key(scfg, sym, from_date)
+    ck = cache.get_checkpoint(key)
+    leg = None
+    last_ts = None
+    if (ck is not None and ck["data_size"] <= size and ck["last_ts"] <= _parse_ts(to_date)
+            and tail_hash(path, ck["data_size"]) == ck["tail_hash"]):
+        leg = pickle.loads(ck["state"])
+        last_ts = ck["last_ts"]
+        resume_from = datetime.fromtimestamp(last_ts, tz=timezone.utc).isoformat()
+        stream = (r for r in _price_stream(scfg, sym, resume_from, to_date) if r[0] > last_ts)
+    else:
+        leg = _Leg(sym, scfg, SliceBook(scfg['risk']['equity'], scfg['slices']['total']))
+        stream = _price_stream(scfg, sym, from_date, to_date)
+    resumed = last_ts is not None
+    for ts, px in stream:
+        leg.step(ts, px)
+        last_ts = ts
+    if last_ts is not None:
+        cache.put_checkpoint(key, size, tail_hash(path, size), last_ts, pickle.dumps(leg, pickle.HIGHEST_PROTOCOL))
+    return leg.metrics(), resumed
+
+
+async def backtest(cfg, from_date: str, to_date: str, symbols: list[str], quiet: bool = False, cache=None,
+                   engine: str = "object", profile=None, resume: bool = False):
+    """Simulate each symbol; with a `BacktestCache`, unchanged symbols are served from it.
+
+    `engine="kernel"` runs the array-native `kisbot.core.kernel` simulation,
+    which produces the same metrics as the object-based `KDTrader` path.
+    With a `StageProfiler` as `profile`, stage timings are added under "profile".
+    With `resume` (object engine and a cache), each symbol continues from its
+    checkpoint from the previous run and only simulates bars appended since.
+    """
+    stage = profile.stage if profile is not None else _no_stage
+    resume = resume and cache is not None and engine == "object" and profile is None
+    results = []
+    hits = 0
+    resumed = 0
+    for sym in symbols:
+        scfg = _merge_dicts(cfg, (cfg.get('symbols') or {}).get(sym, {}))
+        key = None
+        if cache is not None:
+            with stage("cache"):
+                path = _data_path(scfg, sym)
+                key = cache.key(scfg, sym, from_date, to_date, cache.data_fingerprint(path) if path else "synthetic")
+                hit = cache.get(key)
+            if hit is not None:
+                results.append(hit)
+                hits += 1
+                continue
+        started = datetime.utcnow()
+        if resume:
+            m, was_resumed = _resume_symbol(sym, scfg, from_date, to_date, cache)
+            resumed += was_resumed
+        else:
+            with stage("simulate"):
+                m = _simulate_symbol(sym, scfg, from_date, to_date, engine, profile)
+        if cache is not None:
+            from kisbot.infra.bt_cache import KEY_SECTIONS
+            params = {"symbol": sym, "from": from_date, "to": to_date, **{k: scfg.get(k) for k in KEY_SECTIONS}}
+            with stage("cache"):
+                cache.put(key, str(uuid.uuid4()), params, m, started, datetime.utcnow())
+        results.append(m)
 
     agg_realized = round(sum(m.get("realized_pnl", 0.0) for m in results), 2)
     agg_unrealized = round(sum(m.get("unrealized_pnl", 0.0) for m in results), 2)
@@ -163,6 +345,87 @@ async def backtest(cfg, from_date: str, to_date: str, symbols: list[str], quiet:
             "total_unrealized_pnl": agg_unrealized,
         },
     }
+    if cache is not None:
+        out["cache"] = {"hits": hits, "misses": len(symbols) - hits}
+        if resume:
+            out["cache"]["resumed"] = resumed
+    if profile is not None:
+        out["profile"] = profile.summary()
+    if not quiet:
+        print(out)
+    return out
+
+
+def _tagged(stream, i: int) -> Iterator[Tuple[float, int, float]]:
+    for ts, px in stream:
+        yield ts, i, px
+
+
+async def backtest_portfolio(cfg, from_date: str, to_date: str, symbols: list[str], quiet: bool = False, profile=None):
+    """Event-driven backtest of all symbols against one shared slice book.
+
+    Bars from every symbol are k-way merged by timestamp (ties in `symbols`
+    order), so capital used by one trader is unavailable to the others until it
+    is freed. CSV inputs are streamed row by row and must be time-ordered; memory
+    is one pending bar per symbol. Equity is `risk.equity` plus realized and
+    mark-to-market PnL, updated in O(1) per bar.
+    """
+    shared = SharedSliceBook(cfg['risk']['equity'], cfg['slices']['total'])
+    legs = []
+    streams = []
+    for i, sym in enumerate(symbols):
+        scfg = _merge_dicts(cfg, (cfg.get('symbols') or {}).get(sym, {}))
+        legs.append(_Leg(sym, scfg, shared.view(sym), profile))
+        stream = _price_stream(scfg, sym, from_date, to_date, streaming=True)
+        if profile is not None:
+            stream = profile.iter("load", stream)
+        streams.append(_tagged(stream, i))
+
+    start_equity = float(cfg['risk']['equity'])
+    pnl = 0.0
+    peak = start_equity
+    max_dd = 0.0
+    max_dd_pct = 0.0
+    peak_slices = 0
+    bars = 0
+    merged = heapq.merge(*streams)
+    if profile is not None:
+        merged = profile.iter("merge", merged)
+    for ts, i, px in merged:
+        leg = legs[i]
+        before = leg.value()
+        leg.step(ts, px)
+        pnl += leg.value() - before
+        bars += 1
+        equity = start_equity + pnl
+        if equity > peak:
+            peak = equity
+        elif peak - equity > max_dd:
+            max_dd = peak - equity
+            max_dd_pct = max_dd / peak if peak > 0 else 0.0
+        if shared.slices_in_use > peak_slices:
+            peak_slices = shared.slices_in_use
+
+    results = [leg.metrics() for leg in legs]
+    out = {
+        "run_id": str(uuid.uuid4()),
+        "mode": "portfolio",
+        "metrics": results,
+        "aggregate": {
+            "symbols": len(results),
+            "total_realized_pnl": round(sum(m["realized_pnl"] for m in results), 2),
+            "total_unrealized_pnl": round(sum(m["unrealized_pnl"] for m in results), 2),
+            "bars": bars,
+            "start_equity": round(start_equity, 2),
+            "end_equity": round(start_equity + sum(leg.value() for leg in legs), 2),
+            "max_drawdown": round(max_dd, 2),
+            "max_drawdown_pct": round(max_dd_pct, 6),
+            "slices_in_use_end": shared.slices_in_use,
+            "slices_in_use_peak": peak_slices,
+        },
+    }
+    if profile is not None:
+        out["profile"] = profile.summary()
     if not quiet:
         print(out)
     return out
@@ -0,0 +1,196 @@
+"""Content-addressed cache of per-symbol backtest results.
+
+A result is keyed by the merged per-symbol config (the sections that affect a
+simulation), a hash of the simulation source code, the requested date range and
+a fingerprint of the input CSV. Entries live in a local SQLite file whose
+`bt_runs` table mirrors `kisbot.db.models.BacktestRun` plus the cache key, so a
+repeated `kisbot backtest` or optimizer grid point is a single indexed lookup.
+Uses the stdlib `sqlite3` module to keep SQLAlchemy out of backtest start-up.
+
+The same file also keeps one simulation checkpoint per (symbol, config,
+start date): the pickled end-of-run state plus the size of the data file and a
+hash of its last bytes at that point, so `backtest(resume=True)` can continue
+from it when bars have only been appended.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Config sections that change simulation output.
+KEY_SECTIONS = ("strategy", "slices", "risk", "bars")
+# Modules a cached backtest runs through (relative to the kisbot package).
+CODE_SOURCES = ("core/indicators.py", "core/signals.py", "core/slices.py", "core/kernel.py",
+                "infra/backtest.py", "infra/chunked.py")
+_CODE_VERSION: str | None = None
+
+
+def default_path() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "kisbot", "backtests.sqlite")
+
+
+def code_version() -> str:
+    """Hash of the modules a simulation runs through; any edit invalidates the cache."""
+    global _CODE_VERSION
+    if _CODE_VERSION is None:
+        root = Path(__file__).resolve().parents[1]
+        h = hashlib.sha256()
+        for rel in CODE_SOURCES:
+            h.update((root / rel).read_bytes())
+        _CODE_VERSION = h.hexdigest()[:16]
+    return _CODE_VERSION
+
+
+class BacktestCache:
+    def __init__(self, path: str | None = None, max_age_days: float | None = None, max_bytes: int | None = None):
+        self.path = path or default_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS bt_runs (
+                run_id TEXT PRIMARY KEY,
+                cache_key TEXT UNIQUE NOT NULL,
+                started TEXT,
+                finished TEXT,
+                params TEXT NOT NULL,
+                metrics TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_bt_runs_last_used ON bt_runs (last_used);
+            CREATE TABLE IF NOT EXISTS data_fp (
+                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT
+            );
+            CREATE TABLE IF NOT EXISTS bt_checkpoints (
+                ckpt_key TEXT PRIMARY KEY,
+                data_size INTEGER NOT NULL,
+                tail_hash TEXT NOT NULL,
+                last_ts REAL NOT NULL,
+                state BLOB NOT NULL,
+                last_used REAL NOT NULL
+            );
+        """)
+        self.evict()
+
+    @classmethod
+    def from_config(cls, cfg: dict, path: str | None = None) -> "BacktestCache":
+        c = cfg.get("backtest_cache") or {}
+        return cls(path or c.get("path"), c.get("max_age_days"), c.get("max_bytes"))
+
+    # Keys ---------------------------------------------------------------
+    def data_fingerprint(self, path: str) -> str:
+        """sha256 of the data file, memoized on (size, mtime_ns)."""
+        if not os.path.exists(path):
+            return "missing"
+        st = os.stat(path)
+        row = self.db.execute("SELECT size, mtime_ns, digest FROM data_fp WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO data_fp VALUES (?, ?, ?, ?)", (path, st.st_size, st.st_mtime_ns, digest))
+        return digest
+
+    def key(self, scfg: dict, symbol: str, from_date: str, to_date: str, data_fp: str) -> str:
+        params = {k: scfg.get(k) for k in KEY_SECTIONS}
+        blob = json.dumps([symbol, from_date, to_date, data_fp, code_version(), params], sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def checkpoint_key(self, scfg: dict, symbol: str, from_date: str) -> str:
+        """Like `key`, without the end date and data fingerprint (checkpoints are validated by `tail_hash`)."""
+        params = {k: scfg.get(k) for k in KEY_SECTIONS}
+        blob = json.dumps([symbol, from_date, code_version(), params], sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    # Store --------------------------------------------------------------
+    def get(self, key: str) -> dict | None:
+        row = self.db.execute("SELECT run_id, metrics FROM bt_runs WHERE cache_key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self.db:
+            self.db.execute("UPDATE bt_runs SET last_used = ? WHERE run_id = ?", (time.time(), row[0]))
+        return json.loads(row[1])
+
+    def put(self, key: str, run_id: str, params: dict, metrics: dict, started: datetime, finished: datetime) -> None:
+        p = json.dumps(params, sort_keys=True, default=str)
+        m = json.dumps(metrics)
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO bt_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, key, started.isoformat(), finished.isoformat(), p, m, len(p) + len(m), time.time()),
+            )
+        self.evict()
+
+    def get_checkpoint(self, key: str) -> dict | None:
+        row = self.db.execute(
+            "SELECT data_size, tail_hash, last_ts, state FROM bt_checkpoints WHERE ckpt_key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self.db:
+            self.db.execute("UPDATE bt_checkpoints SET last_used = ? WHERE ckpt_key = ?", (time.time(), key))
+        return {"data_size": row[0], "tail_hash": row[1], "last_ts": row[2], "state": row[3]}
+
+    def put_checkpoint(self, key: str, data_size: int, tail_hash: str, last_ts: float, state: bytes) -> None:
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO bt_checkpoints VALUES (?, ?, ?, ?, ?, ?)",
+                (key, data_size, tail_hash, last_ts, state, time.time()),
+            )
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop entries older than max_age_days, then least-recently-used beyond max_bytes.
+
+        The size budget covers results and checkpoints (their pickled state
+        dominates). Runs on open and after every write.
+        """
+        if not (self.max_age_days or self.max_bytes):
+            return 0
+        n = 0
+        with self.db:
+            if self.max_age_days:
+                cutoff = datetime.utcfromtimestamp(time.time() - float(self.max_age_days) * 86400).isoformat()
+                n += self.db.execute("DELETE FROM bt_runs WHERE finished < ?", (cutoff,)).rowcount
+                n += self.db.execute("DELETE FROM bt_checkpoints WHERE last_used < ?",
+                                     (time.time() - float(self.max_age_days) * 86400,)).rowcount
+            if self.max_bytes:
+                total = self.db.execute(
+                    "SELECT (SELECT COALESCE(SUM(size), 0) FROM bt_runs)"
+                    " + (SELECT COALESCE(SUM(LENGTH(state)), 0) FROM bt_checkpoints)").fetchone()[0]
+                if total > int(self.max_bytes):
+                    rows = self.db.execute(
+                        "SELECT 'run', run_id, size, last_used FROM bt_runs"
+                        " UNION ALL SELECT 'ckpt', ckpt_key, LENGTH(state), last_used FROM bt_checkpoints"
+                        " ORDER BY last_used").fetchall()
+                    runs, ckpts = [], []
+                    for kind, key, size, _ in rows:
+                        if total <= int(self.max_bytes):
+                            break
+                        (runs if kind == "run" else ckpts).append((key,))
+                        total -= size
+                    self.db.executemany("DELETE FROM bt_runs WHERE run_id = ?", runs)
+                    self.db.executemany("DELETE FROM bt_checkpoints WHERE ckpt_key = ?", ckpts)
+                    n += len(runs) + len(ckpts)
+        return n
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def tail_hash(path: str, size: int, n: int = 4096) -> str:
+    """sha256 of the `n` bytes of `path` before offset `size`."""
+    with open(path, "rb") as f:
+        f.seek(max(0, size - n))
+        return hashlib.sha256(f.read(min(n, size))).hexdigest()
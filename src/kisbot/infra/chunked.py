@@ -0,0 +1,187 @@
+"""Chunked reads of price CSVs that are larger than memory.
+
+A sidecar index (``{file}.idx``) records, for every block of about
+`chunk_bytes` of whole lines, its byte range, time bounds and row count.
+`iter_batches` reads only the blocks that overlap ``[from_date, to_date]`` and
+yields each one as numpy ``(ts, price)`` arrays, so memory is bounded by the
+block size instead of the file size. On a time-ordered file, reading stops
+at the first block past `to_date`.
+
+The index is reused while the file's size and mtime are unchanged. When the
+file has only grown (bars appended), every block except the last is kept and
+only the tail is rescanned.
+"""
+from __future__ import annotations
+import csv
+import json
+import os
+import tempfile
+import zlib
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+from kisbot.infra.backtest import _csv_columns, _parse_ts
+
+INDEX_VERSION = 2  # 2: quoted fields are split like csv
+CHUNK_BYTES = 1 << 20
+# Per-block record in the index: [offset, length, ts_min, ts_max, rows, ordered]
+# where `ordered` means sorted within the block and not before the previous one.
+OFFSET, LENGTH, TS_MIN, TS_MAX, ROWS, ORDERED = range(6)
+
+
+def index_path(path: str) -> str:
+    return path + ".idx"
+
+
+def _scan(f, offset: int, chunk_bytes: int, dt_col: int, prev_ts: float) -> Tuple[List[list], int]:
+    """Index blocks from `offset` to EOF; returns (blocks, end offset)."""
+    blocks: List[list] = []
+    f.seek(offset)
+    start = pos = offset
+    lo = hi = None
+    rows = 0
+    ordered = True
+    for line in f:
+        pos += len(line)
+        if b'"' in line:
+            # A quoted field may hold commas: split this line like `csv` does.
+            fields = next(csv.reader([line.decode()]), [])
+        else:
+            fields = line.split(b",", dt_col + 1)
+        if len(fields) > dt_col:
+            raw = fields[dt_col].strip()
+            if raw:
+                ts = _parse_ts(raw if isinstance(raw, str) else raw.decode())
+                if ts < prev_ts:
+                    ordered = False
+                prev_ts = ts
+                if lo is None:
+                    lo = hi = ts
+                else:
+                    lo, hi = min(lo, ts), max(hi, ts)
+                rows += 1
+        if pos - start >= chunk_bytes:
+            if rows:
+                blocks.append([start, pos - start, lo, hi, rows, ordered])
+            start, lo, hi, rows, ordered = pos, None, None, 0, True
+    if rows:
+        blocks.append([start, pos - start, lo, hi, rows, ordered])
+    return blocks, pos
+
+
+def _crc(f, block: list) -> int:
+    f.seek(block[OFFSET])
+    return zlib.crc32(f.read(block[LENGTH]))
+
+
+def _load(path: str) -> Optional[dict]:
+    try:
+        with open(index_path(path)) as f:
+            idx = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return idx if isinstance(idx, dict) and idx.get("version") == INDEX_VERSION else None
+
+
+def _save(path: str, idx: dict) -> None:
+    """Best effort: a read-only data dir just means the index is rebuilt next time."""
+    target = index_path(path)
+    try:
+        fd, tmp = tempfile.mkstemp(prefix=".idx-", dir=os.path.dirname(os.path.abspath(target)))
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(idx, f, separators=(",", ":"))
+        os.replace(tmp, target)
+    except OSError:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def chunk_index(path: str, column: str = "close", chunk_bytes: int = CHUNK_BYTES) -> dict:
+    """The block index of the CSV at `path`, refreshed if the file changed.
+
+    Keys: header, dt_col, px_col, size, mtime_ns, chunk_bytes, blocks, sorted
+    (the whole file is time-ordered) and tail_crc (of the last block).
+    """
+    st = os.stat(path)
+    idx = _load(path)
+    if idx is not None and idx["chunk_bytes"] == chunk_bytes:
+        if idx["size"] == st.st_size and idx["mtime_ns"] == st.st_mtime_ns:
+            idx["dt_col"], idx["px_col"] = _csv_columns(idx["header"], column, path)
+            return idx
+    with open(path, "rb") as f:
+        head = f.readline()
+        header = next(csv.reader([head.decode()]), [])
+        dt_col, px_col = _csv_columns(header, column, path)
+        blocks: List[list] = []
+        offset, prev_ts = len(head), float("-inf")
+        if (idx is not None and idx["chunk_bytes"] == chunk_bytes and idx["header"] == header
+                and idx["blocks"] and st.st_size > idx["size"]
+                and _crc(f, idx["blocks"][-1]) == idx["tail_crc"]):
+            # Appended to: rescan from the old last block, which may have been partial.
+            blocks = idx["blocks"][:-1]
+            offset = idx["blocks"][-1][OFFSET]
+            if blocks:
+                prev_ts = blocks[-1][TS_MAX]
+        tail, _ = _scan(f, offset, chunk_bytes, dt_col, prev_ts)
+        blocks += tail
+        tail_crc = _crc(f, blocks[-1]) if blocks else 0
+    idx = {
+        "version": INDEX_VERSION,
+        "header": header,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "chunk_bytes": chunk_bytes,
+        "blocks": blocks,
+        "sorted": all(b[ORDERED] for b in blocks),
+        "tail_crc": tail_crc,
+    }
+    _save(path, idx)
+    idx["dt_col"], idx["px_col"] = dt_col, px_col
+    return idx
+
+
+def iter_batches(path: str, from_date: str, to_date: str, column: str = "close", chunk_bytes: int = CHUNK_BYTES,
+                 idx: Optional[dict] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield ``(ts, price)`` float64 arrays per block of rows in [from_date, to_date], in file order.
+
+    Rows with an empty price are skipped, as in `_iter_prices_csv`.
+    """
+    if idx is None:
+        idx = chunk_index(path, column, chunk_bytes)
+    from_ts, to_ts = _parse_ts(from_date), _parse_ts(to_date)
+    dt_col, px_col = idx["dt_col"], idx["px_col"]
+    need = max(dt_col, px_col)
+    with open(path, "rb") as f:
+        for block in idx["blocks"]:
+            if block[TS_MIN] > to_ts:
+                if idx["sorted"]:
+                    return
+                continue
+            if block[TS_MAX] < from_ts:
+                continue
+            f.seek(block[OFFSET])
+            lines = f.read(block[LENGTH]).decode().splitlines()
+            ts = np.empty(block[ROWS])
+            px = np.empty(block[ROWS])
+            n = 0
+            for row in csv.reader(lines):
+                if len(row) <= need or not row[px_col].strip():
+                    continue
+                ts[n] = _parse_ts(row[dt_col])
+                px[n] = float(row[px_col])
+                n += 1
+            ts, px = ts[:n], px[:n]
+            if block[TS_MIN] < from_ts or block[TS_MAX] > to_ts:
+                keep = (ts >= from_ts) & (ts <= to_ts)
+                ts, px = ts[keep], px[keep]
+            if len(ts):
+                yield ts, px
+
+
+def iter_rows(path: str, from_date: str, to_date: str, column: str = "close", chunk_bytes: int = CHUNK_BYTES,
+              idx: Optional[dict] = None) -> Iterator[Tuple[float, float]]:
+    """`iter_batches` flattened into ``(ts, price)`` rows."""
+    for ts, px in iter_batches(path, from_date, to_date, column, chunk_bytes, idx):
+        yield from zip(ts.tolist(), px.tolist())
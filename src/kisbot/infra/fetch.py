@@ -0,0 +1,217 @@
+"""Incremental historical bar fetcher with atomic merge-append.
+
+For each symbol the existing `{out_dir}/{symbol}.csv` is inspected for its first
+and last timestamp, only the missing head/tail ranges are requested from a
+pluggable `Provider`, and the new bars are merged (deduplicated on timestamp,
+newer values win) into a temp file that atomically replaces the original.
+Symbols run concurrently on a bounded thread pool.
+"""
+from __future__ import annotations
+import csv
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Protocol, Tuple
+from kisbot.infra.backtest import _parse_ts
+
+Row = Dict[str, str]
+
+
+class Provider(Protocol):
+    def history(self, symbol: str, start: date, end: date, interval: str) -> List[Row]:
+        """Bars in [start, end) as dicts keyed by column name, with a `Date` (ISO) column."""
+        ...
+
+
+def bar_time(ts: datetime, interval: str) -> str:
+    """Provider bar time in the stored convention: daily+ bars by trading date, intraday bars as naive UTC.
+
+    Yahoo stamps daily bars at exchange-local midnight (e.g. ``-05:00``); the
+    CSVs store the date alone, which `_parse_ts` reads as UTC midnight, so a
+    re-fetched day dedups against the stored one.
+    """
+    if interval.endswith(("d", "wk", "mo")):
+        return ts.date().isoformat()
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts.isoformat(sep=" ")
+
+
+class YahooProvider:
+    def history(self, symbol: str, start: date, end: date, interval: str) -> List[Row]:
+        try:
+            import yfinance as yf
+        except ImportError as e:
+            raise SystemExit("yfinance not installed. Run: pip install -r requirements-data.txt") from e
+        df = yf.Ticker(symbol).history(start=start.isoformat(), end=end.isoformat(), interval=interval, auto_adjust=False)
+        if df.empty:
+            return []
+        df.index.name = "Date"
+        df = df.reset_index()
+        # Ensure canonical columns
+        df.columns = [c if c in ("Date",) else c.title().replace(" ", "") for c in df.columns]
+        rows = []
+        for rec in df.to_dict("records"):
+            rec["Date"] = bar_time(rec["Date"].to_pydatetime(), interval)
+            rows.append({k: ("" if v is None else str(v)) for k, v in rec.items()})
+        return rows
+
+
+def _ts_col(header: List[str]) -> int:
+    cols = {c.lower().strip(): i for i, c in enumerate(header)}
+    for candidate in ("timestamp", "datetime", "date"):
+        if candidate in cols:
+            return cols[candidate]
+    raise ValueError(f"No datetime column in header {header}")
+
+
+def _row_ts(row: Row) -> float:
+    for key, v in row.items():
+        if key.lower().strip() in ("timestamp", "datetime", "date"):
+            return _parse_ts(v)
+    raise ValueError(f"No datetime field in {row}")
+
+
+def _bounds(path: str) -> Optional[Tuple[List[str], float, float]]:
+    """(header, first_ts, last_ts) of an existing time-ordered CSV, reading only its ends."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb") as f:
+        header_line = f.readline().decode()
+        first_line = f.readline().decode()
+        if not first_line.strip():
+            return None
+        size = os.path.getsize(path)
+        f.seek(max(0, size - 4096))
+        tail = f.read().decode(errors="replace").rstrip("\r\n").rsplit("\n", 1)[-1]
+    header = next(csv.reader([header_line]))
+    i = _ts_col(header)
+    first = _parse_ts(next(csv.reader([first_line]))[i])
+    last = _parse_ts(next(csv.reader([tail]))[i])
+    return header, first, last
+
+
+def missing_ranges(bounds, start: date, end: date) -> List[Tuple[date, date]]:
+    """[start, end) ranges not covered by the file; the last stored day is re-fetched."""
+    if bounds is None:
+        return [(start, end)] if start < end else []
+    _, first, last = bounds
+    first_day = datetime.fromtimestamp(first, tz=timezone.utc).date()
+    last_day = datetime.fromtimestamp(last, tz=timezone.utc).date()
+    out = []
+    if start < first_day:
+        out.append((start, min(first_day, end)))
+    if end > last_day:
+        out.append((max(start, last_day), end))
+    return [(a, b) for a, b in out if a < b]
+
+
+def _atomic_write(path: str, write) -> None:
+    d = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".fetch-", suffix=".csv", dir=d)
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def merge_bars(path: str, rows: List[Row], bounds=None) -> int:
+    """Merge `rows` into the CSV at `path`; returns the number of bars added or changed."""
+    if not rows:
+        return 0
+    new = sorted(((_row_ts(r), r) for r in rows), key=lambda x: x[0])
+    if bounds is None:
+        header = list(rows[0].keys())
+
+        def write_all(f):
+            w = csv.writer(f)
+            w.writerow(header)
+            seen = {}
+            for ts, r in new:
+                seen[ts] = r
+            for ts in sorted(seen):
+                w.writerow([seen[ts].get(c, "") for c in header])
+        _atomic_write(path, write_all)
+        return len({ts for ts, _ in new})
+
+    header, _, last = bounds
+    ts_i = _ts_col(header)
+
+    def cells(r: Row) -> List[str]:
+        by_lower = {k.lower().strip(): v for k, v in r.items()}
+        out = [by_lower.get(c.lower().strip(), "") for c in header]
+        # The provider's time column may be named differently (`Date` vs `datetime`)
+        out[ts_i] = next(by_lower[k] for k in ("timestamp", "datetime", "date") if k in by_lower)
+        return out
+
+    if new[0][0] > last:
+        # Fast path: pure append. Copy the existing bytes, then append the new bars.
+        dedup = {}
+        for ts, r in new:
+            dedup[ts] = r
+
+        def write_append(f):
+            with open(path, newline="") as src:
+                data = src.read()
+            f.write(data if data.endswith("\n") else data + "\n")
+            w = csv.writer(f)
+            for ts in sorted(dedup):
+                w.writerow(cells(dedup[ts]))
+        _atomic_write(path, write_append)
+        return len(dedup)
+
+    # General path: overlap or head insert; rewrite with timestamp dedup.
+    merged: Dict[float, List[str]] = {}
+    with open(path, newline="") as src:
+        reader = csv.reader(src)
+        next(reader, None)
+        for row in reader:
+            if row:
+                merged[_parse_ts(row[ts_i])] = row
+    changed = 0
+    for ts, r in new:
+        c = cells(r)
+        if merged.get(ts) != c:
+            changed += 1
+        merged[ts] = c
+
+    def write_merged(f):
+        w = csv.writer(f)
+        w.writerow(header)
+        for ts in sorted(merged):
+            w.writerow(merged[ts])
+    _atomic_write(path, write_merged)
+    return changed
+
+
+def fetch_symbol(provider: Provider, symbol: str, start: date, end: date, interval: str, out_dir: str) -> dict:
+    path = os.path.join(out_dir, f"{symbol}.csv")
+    bounds = _bounds(path)
+    ranges = missing_ranges(bounds, start, end)
+    rows: List[Row] = []
+    for a, b in ranges:
+        rows.extend(provider.history(symbol, a, b, interval))
+    changed = merge_bars(path, rows, bounds)
+    return {"symbol": symbol, "ranges": [(a.isoformat(), b.isoformat()) for a, b in ranges],
+            "fetched": len(rows), "changed": changed}
+
+
+def fetch_all(provider: Provider, symbols: List[str], start: date, end: date, interval: str = "1d",
+              out_dir: str = "data", max_workers: int = 4) -> List[dict]:
+    os.makedirs(out_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {s: pool.submit(fetch_symbol, provider, s, start, end, interval, out_dir) for s in symbols}
+        out = []
+        for s, fut in futures.items():
+            try:
+                out.append(fut.result())
+            except Exception as e:
+                out.append({"symbol": s, "error": str(e)})
+        return out
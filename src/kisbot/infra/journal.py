@@ -0,0 +1,157 @@
+"""Append-only journal of trader state transitions with compact snapshots.
+
+Each record carries the full journaled state of one symbol, so replay is
+last-write-wins per symbol: recovery keeps the newest line per symbol with plain
+string splits and decodes only those. Lines are ``crc\\tseq\\tsymbol\\tevents\\tstate``;
+the first torn or corrupt line ends the log (everything after it is dropped),
+as with any write-ahead log. Appends are fsync'ed in batches; every
+`snapshot_every` records the states are written to ``snapshot.json``
+(tmp + fsync + rename) and the log restarts empty.
+"""
+from __future__ import annotations
+import json
+import os
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+# (position_qty, avg_px, batch_active, batch_first_order_done, batch_slice_allocation, slices_in_use)
+State = Tuple[int, float, bool, bool, int, int]
+
+
+def trader_state(trader) -> State:
+    return (
+        trader.position_qty,
+        trader.avg_px,
+        trader.batch_active,
+        trader.batch_first_order_done,
+        trader.batch_slice_allocation,
+        trader.book.slices_in_use,
+    )
+
+
+def restore_trader(trader, state: State) -> None:
+    (trader.position_qty, trader.avg_px, trader.batch_active,
+     trader.batch_first_order_done, trader.batch_slice_allocation,
+     trader.book.slices_in_use) = state
+
+
+def state_events(old: Optional[State], new: State) -> str:
+    """Comma-separated transition kinds between two states (for audit only)."""
+    if old is None:
+        return "init"
+    ev = []
+    if new[0] != old[0]:
+        ev.append("fill")
+    if new[2] and not old[2]:
+        ev.append("batch_start")
+    elif old[2] and not new[2]:
+        ev.append("batch_reset")
+    if new[5] == 0 and old[5] > 0:
+        ev.append("free_all")
+    return ",".join(ev) or "update"
+
+
+def _coerce(values) -> State:
+    q, avg, active, first, alloc, used = values
+    return int(q), float(avg), bool(active), bool(first), int(alloc), int(used)
+
+
+class TraderJournal:
+    def __init__(self, path: str, fsync_every: int = 64, fsync_ms: float = 50.0, snapshot_every: int = 10000):
+        self.path = path
+        self.log_path = os.path.join(path, "journal.log")
+        self.snap_path = os.path.join(path, "snapshot.json")
+        self.fsync_every = fsync_every
+        self.fsync_s = fsync_ms / 1000.0
+        self.snapshot_every = snapshot_every
+        self.states: Dict[str, State] = {}
+        self.seq = 0
+        self._since_snapshot = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._f = None
+
+    # Recovery ---------------------------------------------------------
+    def recover(self) -> Dict[str, State]:
+        """Load snapshot + journal tail, truncate any torn tail, open for append."""
+        os.makedirs(self.path, exist_ok=True)
+        snap_seq = 0
+        if os.path.exists(self.snap_path):
+            with open(self.snap_path) as f:
+                snap = json.load(f)
+            snap_seq = int(snap["seq"])
+            self.states = {s: _coerce(v) for s, v in snap["states"].items()}
+        self.seq = snap_seq
+
+        latest: Dict[bytes, bytes] = {}
+        tail = 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as f:
+                data = f.read()
+            lines = data.split(b"\n")
+            lines.pop()  # b"" after the final newline, or a torn final write
+            crc32 = zlib.crc32
+            pos = 0
+            for line in lines:
+                crc, _, body = line.partition(b"\t")
+                if not crc.isdigit() or int(crc) != crc32(body):
+                    break
+                # Lines already covered by the snapshot (crash between rename and
+                # log reset) end in the same per-symbol state, so no seq filter.
+                _, sym, _, raw = body.split(b"\t", 3)
+                latest[sym] = raw
+                pos += len(line) + 1
+                tail += 1
+            if pos < len(data):
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(pos)
+                    os.fsync(f.fileno())
+            if tail:
+                self.seq = max(self.seq, int(lines[tail - 1].split(b"\t", 2)[1]))
+        for sym, raw in latest.items():
+            self.states[sym.decode()] = _coerce(json.loads(raw))
+        self._since_snapshot = tail
+        self._f = open(self.log_path, "ab")
+        return dict(self.states)
+
+    # Append path ------------------------------------------------------
+    def record(self, symbol: str, events: str, state: State) -> None:
+        self.seq += 1
+        self.states[symbol] = state
+        body = f"{self.seq}\t{symbol}\t{events}\t{json.dumps(state)}".encode()
+        self._f.write(b"%d\t%s\n" % (zlib.crc32(body), body))
+        self._unsynced += 1
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        elif self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_s:
+            self.sync()
+
+    def sync(self) -> None:
+        if self._f is None or not self._unsynced:
+            return
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def snapshot(self) -> None:
+        self.sync()
+        tmp = self.snap_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"seq": self.seq, "states": self.states}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snap_path)
+        # Records <= seq are now covered by the snapshot; start an empty log.
+        self._f.close()
+        self._f = open(self.log_path, "wb")
+        os.fsync(self._f.fileno())
+        self._since_snapshot = 0
+
+    def close(self) -> None:
+        if self._f is not None:
+            self.sync()
+            self._f.close()
+            self._f = None
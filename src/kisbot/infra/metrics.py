@@ -0,0 +1,238 @@
+"""In-process latency histograms, counters and gauges with a Prometheus text endpoint.
+
+Histograms are HDR-style: values (nanoseconds) land in log-linear buckets with
+2**SUB_BITS linear sub-buckets per power of two, so recording is a bit_length,
+a shift and a list increment, and relative error stays under ~6%.
+
+Worker processes record into their own `Metrics` and ship `take()` deltas to
+the coordinator, which `merge`s them into the exported registry.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+SUB_BITS = 4
+_SUB = 1 << SUB_BITS
+_HALF = _SUB >> 1
+_NBUCKETS = 64 * _HALF + _SUB
+
+# Coarse `le` bounds (seconds) used when exporting to Prometheus
+EXPORT_BOUNDS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0)
+
+
+def _bucket(v: int) -> int:
+    if v < _SUB:
+        return v if v > 0 else 0
+    shift = v.bit_length() - SUB_BITS
+    return shift * _HALF + (v >> shift)
+
+
+def _bucket_high(idx: int) -> int:
+    """Exclusive upper bound (ns) of bucket `idx`."""
+    if idx < _SUB:
+        return idx + 1
+    shift = idx // _HALF - 1
+    return (idx - shift * _HALF + 1) << shift
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "sum_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * _NBUCKETS
+        self.total = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns: int) -> None:
+        if ns < _SUB:
+            self.counts[ns if ns > 0 else 0] += 1
+        else:
+            shift = ns.bit_length() - SUB_BITS
+            self.counts[shift * _HALF + (ns >> shift)] += 1
+        self.total += 1
+        self.sum_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def quantile(self, q: float) -> int:
+        """Upper bound (ns) of the bucket holding the q-th quantile."""
+        if self.total == 0:
+            return 0
+        rank = q * self.total
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            seen += c
+            if c and seen >= rank:
+                return min(_bucket_high(idx), self.max_ns)
+        return self.max_ns
+
+    def cumulative(self, bounds_ns) -> list[int]:
+        out = []
+        idx = 0
+        seen = 0
+        for b in bounds_ns:
+            while idx < _NBUCKETS and _bucket_high(idx) <= b:
+                seen += self.counts[idx]
+                idx += 1
+            out.append(seen)
+        return out
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n: int = 1) -> None:
+        self.value += n
+
+
+class Gauge:
+    """Last `set` value, or `fn()` evaluated at scrape time."""
+    __slots__ = ("value", "fn")
+
+    def __init__(self, fn: Optional[Callable[[], float]] = None):
+        self.value = 0.0
+        self.fn = fn
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def read(self) -> float:
+        return self.fn() if self.fn is not None else self.value
+
+
+class Metrics:
+    def __init__(self, prefix: str = "kisbot"):
+        self.prefix = prefix
+        self.hists: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters: Dict[str, Dict[Labels, Counter]] = {}
+        self.gauges: Dict[str, Dict[Labels, Gauge]] = {}
+
+    def histogram(self, stage: str, **labels: str) -> Histogram:
+        key = (stage, tuple(sorted(labels.items())))
+        h = self.hists.get(key)
+        if h is None:
+            h = self.hists[key] = Histogram()
+        return h
+
+    def counter(self, name: str, **labels: str) -> Counter:
+        """Resolve a labelled counter once; hot paths keep the handle and call `inc`."""
+        series = self.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        c = series.get(key)
+        if c is None:
+            c = series[key] = Counter()
+        return c
+
+    def inc(self, name: str, n: int = 1, **labels: str) -> None:
+        self.counter(name, **labels).inc(n)
+
+    def gauge(self, name: str, fn: Optional[Callable[[], float]] = None, **labels: str) -> Gauge:
+        """Resolve a labelled gauge; a given `fn` replaces the previous one."""
+        series = self.gauges.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        g = series.get(key)
+        if g is None:
+            g = series[key] = Gauge(fn)
+        elif fn is not None:
+            g.fn = fn
+        return g
+
+    def take(self) -> dict:
+        """Histograms and counters recorded since the last `take`, zeroed in place.
+
+        Handles held by hot paths stay valid. The result is small and
+        picklable (sparse bucket counts) for `merge` in another process.
+        """
+        hists = {}
+        for key, h in self.hists.items():
+            if h.total:
+                counts = h.counts
+                hists[key] = ({i: c for i, c in enumerate(counts) if c}, h.total, h.sum_ns, h.max_ns)
+                counts[:] = [0] * _NBUCKETS
+                h.total = h.sum_ns = h.max_ns = 0
+        counters = {}
+        for name, series in self.counters.items():
+            for key, c in series.items():
+                if c.value:
+                    counters[(name, key)] = c.value
+                    c.value = 0
+        return {"hists": hists, "counters": counters}
+
+    def merge(self, delta: dict) -> None:
+        """Add a `take()` result (e.g. from a shard worker) to this registry."""
+        for (stage, labels), (counts, total, sum_ns, max_ns) in delta["hists"].items():
+            h = self.histogram(stage, **dict(labels))
+            for i, c in counts.items():
+                h.counts[i] += c
+            h.total += total
+            h.sum_ns += sum_ns
+            if max_ns > h.max_ns:
+                h.max_ns = max_ns
+        for (name, labels), n in delta["counters"].items():
+            self.counter(name, **dict(labels)).inc(n)
+
+    def render(self) -> str:
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_stage_latency_seconds Per-stage latency",
+            f"# TYPE {p}_stage_latency_seconds histogram",
+        ]
+        bounds_ns = [int(b * 1e9) for b in EXPORT_BOUNDS]
+        for (stage, labels), h in sorted(self.hists.items()):
+            lbl = f'stage="{stage}"' + "".join(f',{k}="{val}"' for k, val in labels)
+            for b, c in zip(EXPORT_BOUNDS, h.cumulative(bounds_ns)):
+                lines.append(f'{p}_stage_latency_seconds_bucket{{{lbl},le="{b:g}"}} {c}')
+            lines.append(f'{p}_stage_latency_seconds_bucket{{{lbl},le="+Inf"}} {h.total}')
+            lines.append(f'{p}_stage_latency_seconds_sum{{{lbl}}} {h.sum_ns / 1e9:.9f}')
+            lines.append(f'{p}_stage_latency_seconds_count{{{lbl}}} {h.total}')
+        for name, series in sorted(self.counters.items()):
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            for key, c in sorted(series.items()):
+                lbl = ",".join(f'{k}="{val}"' for k, val in key)
+                lines.append(f"{p}_{name}_total{{{lbl}}} {c.value}")
+        for name, series in sorted(self.gauges.items()):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            for key, g in sorted(series.items()):
+                lbl = ",".join(f'{k}="{val}"' for k, val in key)
+                lines.append(f"{p}_{name}{{{lbl}}} {float(g.read())}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Metrics()
+
+
+async def timed(hist: Histogram, coro):
+    t0 = time.perf_counter_ns()
+    try:
+        return await coro
+    finally:
+        hist.record(time.perf_counter_ns() - t0)
+
+
+async def start_metrics_server(host: str = "127.0.0.1", port: int = 9108, registry: Metrics = REGISTRY):
+    """Serve `registry.render()` over plain HTTP/1.0 for any GET path."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        body = registry.render().encode()
+        writer.write(
+            b"HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,187 @@
+"""Monte Carlo / block-bootstrap robustness runs of the KDTrader strategy.
+
+Resampled price paths are laid out as a (paths, time) array and simulated
+together: StochRSI is vectorized across paths and the KDTrader rules run on
+all lanes at once (`kisbot.core.lanes`). Each lane has its own SliceBook (like
+`_simulate_symbol`) and may carry its own jittered strategy thresholds.
+Indicator periods and slice sizes are shared by all lanes. Bootstrapped paths
+are timed at the history's median bar spacing, for the buy cooldown.
+"""
+from __future__ import annotations
+import numpy as np
+from kisbot.core.lanes import lane_params, simulate_lanes
+from kisbot.infra.backtest import _merge_dicts, _price_stream
+
+# Strategy keys jittered per lane, with their KDTrader defaults.
+JITTER_KEYS = {
+    "take_profit_pct": 0.11,
+    "stop_loss_pct": None,
+    "rsi_buy_threshold": 50.0,
+    "rsi_buy_multiplier": 1.1,
+    "oversold": None,
+    "overbought": None,
+}
+
+
+def block_bootstrap(prices, n_paths: int, horizon: int, block: int = 10, seed=None) -> np.ndarray:
+    """(n_paths, horizon + 1) price paths from circular block-resampled log returns."""
+    p = np.asarray(prices, dtype=np.float64)
+    r = np.diff(np.log(p))
+    if len(r) == 0:
+        raise ValueError("need at least two prices to bootstrap")
+    block = max(1, min(int(block), len(r)))
+    rng = np.random.default_rng(seed)
+    n_blocks = -(-horizon // block)
+    starts = rng.integers(0, len(r), size=(n_paths, n_blocks))
+    idx = ((starts[:, :, None] + np.arange(block)) % len(r)).reshape(n_paths, -1)[:, :horizon]
+    paths = np.empty((n_paths, horizon + 1))
+    paths[:, 0] = p[0]
+    paths[:, 1:] = p[0] * np.exp(np.cumsum(r[idx], axis=1))
+    return paths
+
+
+def jitter_params(strategy: dict, n_paths: int, scale: float = 0.0, seed=None) -> dict:
+    """Per-lane arrays of the JITTER_KEYS, each scaled by U(1 - scale, 1 + scale).
+
+    `rsi_buy_multiplier` is jittered on its excess over 1. A disabled stop loss
+    (None/0) stays disabled.
+    """
+    rng = np.random.default_rng(seed)
+    out = {}
+    for key, default in JITTER_KEYS.items():
+        base = strategy.get(key, default)
+        base = 0.0 if base is None else float(base)
+        u = 1.0 + scale * rng.uniform(-1.0, 1.0, size=n_paths) if scale else np.ones(n_paths)
+        if key == "rsi_buy_multiplier":
+            out[key] = 1.0 + (base - 1.0) * u
+        else:
+            out[key] = base * u
+    return out
+
+
+def _running_mean(x: np.ndarray, period: int) -> np.ndarray:
+    """Per-row `RollingSMA(period)` over the columns of `x`, from its first full window.
+
+    Same running sum (subtract the oldest, add the newest) as `RollingSMA` and
+    `kernel.indicator_arrays`, so the values are bit-identical, not just close.
+    """
+    n_paths, n = x.shape
+    out = np.empty((n_paths, n - period + 1))
+    total = np.zeros(n_paths)
+    for t in range(n):
+        if t >= period:
+            total -= x[:, t - period]
+        total += x[:, t]
+        if t >= period - 1:
+            out[:, t - period + 1] = total / period
+    return out
+
+
+def stoch_rsi_lanes(prices: np.ndarray, rsi_period=14, stoch_period=14, k_period=3, d_period=3):
+    """(rsi, k, d) arrays shaped like `prices`, NaN where `StochRSI` returns None."""
+    n_paths, n = prices.shape
+    rsi = np.full((n_paths, n), np.nan)
+    k = np.full((n_paths, n), np.nan)
+    d = np.full((n_paths, n), np.nan)
+    # Replicates WilderRSI exactly: it seeds from the first `rsi_period` changes,
+    # reports its first value one bar later without folding in that bar's
+    # change, and keeps smoothing from the seed *sums* (not averages).
+    r0 = rsi_period + 1
+    if n <= r0:
+        return rsi, k, d
+    change = np.diff(prices, axis=1)
+    up = np.maximum(change, 0.0)
+    down = np.maximum(-change, 0.0)
+    gain = np.zeros(n_paths)
+    loss = np.zeros(n_paths)
+    for j in range(rsi_period):  # sequential sums, as WilderRSI accumulates them
+        gain += up[:, j]
+        loss += down[:, j]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_gain, avg_loss = gain / rsi_period, loss / rsi_period
+        rsi[:, r0] = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+        for t in range(r0 + 1, n):
+            gain = (gain * (rsi_period - 1) + up[:, t - 1]) / rsi_period
+            loss = (loss * (rsi_period - 1) + down[:, t - 1]) / rsi_period
+            rsi[:, t] = np.where(loss == 0, 100.0, 100.0 - 100.0 / (1.0 + gain / loss))
+
+    s0 = r0 + stoch_period - 1
+    if n <= s0:
+        return rsi, k, d
+    win = np.lib.stride_tricks.sliding_window_view(rsi[:, r0:], stoch_period, axis=1)
+    lo, hi = win.min(axis=2), win.max(axis=2)
+    cur = rsi[:, s0:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stoch = np.where(hi == lo, 50.0, (cur - lo) / (hi - lo) * 100.0)
+
+    k0 = s0 + k_period - 1
+    if n <= k0:
+        return rsi, k, d
+    k_vals = _running_mean(stoch, k_period)
+    k[:, k0:] = k_vals
+    d0 = k0 + d_period - 1
+    if n > d0:
+        d[:, d0:] = _running_mean(k_vals, d_period)
+    k[:, :d0] = np.nan  # StochRSI reports K only once D is ready
+    return rsi, k, d
+
+
+def simulate_paths(paths: np.ndarray, cfg: dict, params: dict | None = None, ts=None) -> dict:
+    """KDTrader + backtest fills over every row of `paths` (see `kisbot.core.lanes`).
+
+    `params` overrides per-lane parameters, e.g. from `jitter_params`. `ts`
+    (one timestamp per column) is needed with ``add_cooldown_sec``.
+    """
+    paths = np.atleast_2d(np.asarray(paths, dtype=np.float64))
+    s = cfg["strategy"]
+    rsi, k, d = stoch_rsi_lanes(paths, s["rsi_period"], s["stoch_period"], s["k_period"], s["d_period"])
+    lp = {key: np.repeat(v, len(paths)) for key, v in lane_params([cfg]).items()}
+    lp.update(params or {})
+    return simulate_lanes(paths, rsi, k, d, lp, ts=ts)
+
+
+def _summary(x: np.ndarray) -> dict:
+    q = np.percentile(x, [5, 25, 50, 75, 95])
+    return {
+        "mean": round(float(x.mean()), 2),
+        "std": round(float(x.std()), 2),
+        "min": round(float(x.min()), 2),
+        "p5": round(float(q[0]), 2),
+        "p25": round(float(q[1]), 2),
+        "p50": round(float(q[2]), 2),
+        "p75": round(float(q[3]), 2),
+        "p95": round(float(q[4]), 2),
+        "max": round(float(x.max()), 2),
+    }
+
+
+def robustness(cfg: dict, symbol: str, from_date: str, to_date: str, paths: int = 1000,
+               horizon: int | None = None, block: int = 10, jitter: float = 0.0, seed=None) -> dict:
+    """PnL and max-drawdown distributions over bootstrapped paths (and jittered params)."""
+    scfg = _merge_dicts(cfg, (cfg.get("symbols") or {}).get(symbol, {}))
+    rows = list(_price_stream(scfg, symbol, from_date, to_date))
+    hist = np.array([px for _, px in rows])
+    if len(hist) < 2:
+        raise ValueError(f"no price history for {symbol} in {from_date}..{to_date}")
+    hist_ts = np.array([t for t, _ in rows], dtype=np.float64)
+    horizon = int(horizon or len(hist) - 1)
+    rng = np.random.default_rng(seed)
+    sim = simulate_paths(
+        block_bootstrap(hist, paths, horizon, block, seed=rng),
+        scfg,
+        jitter_params(scfg["strategy"], paths, jitter, seed=rng),
+        ts=hist_ts[0] + np.arange(horizon + 1) * float(np.median(np.diff(hist_ts))),
+    )
+    base = simulate_paths(hist[None, :], scfg, ts=hist_ts)
+    return {
+        "symbol": symbol,
+        "paths": paths,
+        "horizon": horizon,
+        "block": block,
+        "jitter": jitter,
+        "seed": seed,
+        "historical": {"pnl": round(float(base["pnl"][0]), 2), "max_drawdown": round(float(base["max_drawdown"][0]), 2)},
+        "pnl": _summary(sim["pnl"]),
+        "max_drawdown": _summary(sim["max_drawdown"]),
+        "p_loss": round(float((sim["pnl"] < 0).mean()), 4),
+    }
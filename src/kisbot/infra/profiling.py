@@ -0,0 +1,145 @@
+"""Opt-in stage profiling for backtests and the optimizer.
+
+`StageProfiler.wrap(name, fn)` returns `fn` timed with `perf_counter_ns`; the
+simulation code only wraps its stages when a profiler is passed, so the normal
+path has no timing overhead. Stages nest: time is attributed to the full
+stage path (e.g. ``simulate;signals;fills`` for fills placed from signals in
+`kisbot backtest --profile`, ``signals;fills`` with ``--portfolio``), which
+yields both a per-stage summary (self/total time, calls) and a collapsed-stack
+file for flamegraph tools. `cprofile()` optionally records a cProfile of the same run.
+"""
+from __future__ import annotations
+import cProfile
+import io
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class StageProfiler:
+    def __init__(self):
+        # stage path -> [self_ns, total_ns, calls]
+        self.stats: Dict[Tuple[str, ...], List[int]] = {}
+        self._stack: List[str] = []
+        self._child: List[int] = []
+        self._t0 = time.perf_counter_ns()
+
+    def _enter(self, name: str) -> None:
+        self._stack.append(name)
+        self._child.append(0)
+
+    def _exit(self, dt: int) -> None:
+        key = tuple(self._stack)
+        self._stack.pop()
+        sub = self._child.pop()
+        if self._child:
+            self._child[-1] += dt
+        rec = self.stats.get(key)
+        if rec is None:
+            rec = self.stats[key] = [0, 0, 0]
+        rec[0] += dt - sub
+        rec[1] += dt
+        rec[2] += 1
+
+    def wrap(self, name: str, fn):
+        perf_ns = time.perf_counter_ns
+        enter, exit_ = self._enter, self._exit
+
+        def timed(*args, **kwargs):
+            enter(name)
+            t0 = perf_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                exit_(perf_ns() - t0)
+        return timed
+
+    @contextmanager
+    def stage(self, name: str):
+        self._enter(name)
+        t0 = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self._exit(time.perf_counter_ns() - t0)
+
+    def iter(self, name: str, iterable: Iterable) -> Iterator:
+        """Yield from `iterable`, timing each `next()` as stage `name`."""
+        nxt = self.wrap(name, iter(iterable).__next__)
+        while True:
+            try:
+                item = nxt()
+            except StopIteration:
+                return
+            yield item
+
+    # Reports ------------------------------------------------------------
+    def summary(self) -> dict:
+        """Per stage name: calls, total_ms (outermost occurrences only), self_ms, share of wall time."""
+        wall = time.perf_counter_ns() - self._t0
+        stages: Dict[str, List[int]] = {}
+        for path, (self_ns, total_ns, calls) in self.stats.items():
+            agg = stages.setdefault(path[-1], [0, 0, 0])
+            agg[0] += self_ns
+            if path[-1] not in path[:-1]:  # do not double count recursive stages
+                agg[1] += total_ns
+            agg[2] += calls
+        return {
+            "wall_ms": round(wall / 1e6, 3),
+            "stages": {
+                name: {
+                    "calls": calls,
+                    "total_ms": round(total / 1e6, 3),
+                    "self_ms": round(self_ns / 1e6, 3),
+                    "self_pct": round(100.0 * self_ns / wall, 2) if wall else 0.0,
+                }
+                for name, (self_ns, total, calls) in sorted(stages.items(), key=lambda kv: -kv[1][0])
+            },
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg collapsed stacks: ``a;b;c <self microseconds>`` per line."""
+        lines = [f"{';'.join(path)} {self_ns // 1000}" for path, (self_ns, _, _) in sorted(self.stats.items())
+                 if self_ns >= 1000]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def report(self) -> str:
+        s = self.summary()
+        out = [f"wall {s['wall_ms']:.1f} ms", f"{'stage':<16}{'calls':>10}{'total ms':>12}{'self ms':>12}{'self %':>8}"]
+        for name, st in s["stages"].items():
+            out.append(f"{name:<16}{st['calls']:>10}{st['total_ms']:>12.1f}{st['self_ms']:>12.1f}{st['self_pct']:>8.1f}")
+        return "\n".join(out) + "\n"
+
+
+@contextmanager
+def cprofile(enabled: bool = True):
+    """Yield a running `cProfile.Profile` (or None when disabled)."""
+    if not enabled:
+        yield None
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield prof
+    finally:
+        prof.disable()
+
+
+def write_reports(stages: StageProfiler, out_dir: str, cprof: Optional[cProfile.Profile] = None, top: int = 30) -> dict:
+    """Write report.txt and stages.collapsed (plus cprofile.prof); returns the paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {"report": os.path.join(out_dir, "report.txt"), "collapsed": os.path.join(out_dir, "stages.collapsed")}
+    text = stages.report()
+    if cprof is not None:
+        paths["cprofile"] = os.path.join(out_dir, "cprofile.prof")
+        cprof.dump_stats(paths["cprofile"])
+        buf = io.StringIO()
+        pstats.Stats(cprof, stream=buf).sort_stats("cumulative").print_stats(top)
+        text += "\n" + buf.getvalue()
+    with open(paths["report"], "w") as f:
+        f.write(text)
+    with open(paths["collapsed"], "w") as f:
+        f.write(stages.collapsed())
+    return paths
@@ -6,3 +6,13 @@ class OrderRouter:
     async def place(self, symbol: str, side: str, qty: int, type_: str = "MKT", price: float | None = None):
         # TODO: implement KIS REST order call for overseas symbols
         return {"ok": True, "paper": self.mode == "paper"}
+
+class AccountClient:
+    def __init__(self, mode: str, paper_equity: float = 0.0):
+        self.mode = mode
+        self.paper_equity = paper_equity
+    async def equity(self) -> float:
+        if self.mode != "paper":
+            # TODO: implement KIS overseas balance inquiry (total account value in USD)
+            raise NotImplementedError(f"KIS balance inquiry is not implemented (mode={self.mode!r})")
+        return self.paper_equity
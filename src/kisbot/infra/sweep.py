@@ -0,0 +1,121 @@
+"""Parameter-axis sweep: many configs of one symbol in a single pass over the bars.
+
+Configs are grouped by data source and indicator periods. Each group loads its
+prices and computes RSI/K/D once (`indicator_arrays`, bit-identical to
+`StochRSI`), then advances one `kisbot.core.lanes` lane per config. Every
+config's metrics equal what `backtest()` reports for it.
+
+Grid points that cannot trade differently on the loaded bars share a lane
+(`equivalence_keys`): e.g. a cooldown no longer than the bar spacing, or a
+trend SMA longer than the data (it never becomes ready, so nothing is bought).
+"""
+from __future__ import annotations
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from kisbot.core.kernel import indicator_arrays
+from kisbot.core.lanes import PARAM_KEYS, as_array, lane_params, simulate_lanes
+from kisbot.infra.backtest import _merge_dicts, _no_stage, _price_stream
+
+# Lane key of every config that never buys (all its metrics are zero).
+NEVER_BUYS = ("never_buys",)
+
+
+def _groups(scfgs: Sequence[dict]) -> Dict[tuple, List[int]]:
+    groups: Dict[tuple, List[int]] = {}
+    for i, scfg in enumerate(scfgs):
+        st = scfg["strategy"]
+        bars = json.dumps(scfg.get("bars", {}), sort_keys=True, default=str)
+        key = (bars, st["rsi_period"], st["stoch_period"], st["k_period"], st["d_period"])
+        groups.setdefault(key, []).append(i)
+    return groups
+
+
+def lane_keys(params: dict, ts: Sequence[float]) -> List[tuple]:
+    """One hashable key per lane of `params`; lanes with equal keys have equal metrics over bars at `ts`.
+
+    Beyond identical parameters: `oversold` only matters with KD buys; any
+    cooldown in (0, smallest bar gap] only stops a second buy on the same bar;
+    any cooldown longer than the whole span allows a single buy; a trend period
+    of 1 (price > itself) or longer than the data never buys.
+    """
+    cols = {key: params[key].copy() for key in PARAM_KEYS}
+    cols["oversold"][~params["enable_kd_buys"]] = 0.0
+    cd = cols["add_cooldown_sec"]
+    if len(ts):
+        t = np.asarray(ts, dtype=np.float64)
+        gap = float(np.diff(t).min()) if len(t) > 1 else 0.0
+        if gap > 0:
+            cd[(cd > 0) & (cd <= gap)] = gap
+        cd[cd > float(t.max() - t.min())] = np.inf
+    period = cols["trend_sma_period"]
+    never = (period == 1) | (period > len(ts))
+    rows = zip(*(cols[key].tolist() for key in PARAM_KEYS))
+    return [NEVER_BUYS if nb else row for row, nb in zip(rows, never.tolist())]
+
+
+def _load(scfg: dict, symbol: str, from_date: str, to_date: str) -> Tuple[list, list]:
+    rows = list(_price_stream(scfg, symbol, from_date, to_date))
+    return [t for t, _ in rows], [px for _, px in rows]
+
+
+def equivalence_keys(cfgs: Sequence[dict], symbol: str, from_date: str, to_date: str) -> List[tuple]:
+    """Per-config keys (see `lane_keys`); configs with equal keys get equal `backtest()` metrics for `symbol`."""
+    scfgs = [_merge_dicts(cfg, (cfg.get("symbols") or {}).get(symbol, {})) for cfg in cfgs]
+    out: List[tuple] = [()] * len(scfgs)
+    ts_by_bars: Dict[str, list] = {}
+    for gkey, idx in _groups(scfgs).items():
+        bars = gkey[0]
+        if bars not in ts_by_bars:
+            ts_by_bars[bars] = _load(scfgs[idx[0]], symbol, from_date, to_date)[0]
+        for i, key in zip(idx, lane_keys(lane_params([scfgs[i] for i in idx]), ts_by_bars[bars])):
+            out[i] = (bars,) + (key if key == NEVER_BUYS else gkey[1:] + key)
+    return out
+
+
+def sweep(cfgs: Sequence[dict], symbol: str, from_date: str, to_date: str, profile=None,
+          stats: Optional[dict] = None) -> List[dict]:
+    """Per-config `backtest()` metrics for `symbol`, in the order of `cfgs`.
+
+    With a `StageProfiler` as `profile`, load/indicators/lanes are timed. A
+    dict passed as `stats` receives ``configs`` and ``simulated`` (lanes
+    actually run after merging equivalent configs).
+    """
+    stage = profile.stage if profile is not None else _no_stage
+    scfgs = [_merge_dicts(cfg, (cfg.get("symbols") or {}).get(symbol, {})) for cfg in cfgs]
+    loaded: Dict[str, Tuple[list, list]] = {}
+    out: List[dict] = [{}] * len(scfgs)
+    simulated = 0
+    for (bars, *periods), idx in _groups(scfgs).items():
+        first = scfgs[idx[0]]
+        if bars not in loaded:
+            with stage("load"):
+                loaded[bars] = _load(first, symbol, from_date, to_date)
+        ts, prices = loaded[bars]
+        params = lane_params([scfgs[i] for i in idx])
+        lanes: Dict[tuple, int] = {}
+        rows: List[int] = []
+        lane_of: List[int] = []
+        for row, key in enumerate(lane_keys(params, ts)):
+            if key not in lanes:
+                lanes[key] = len(rows)
+                rows.append(row)
+            lane_of.append(lanes[key])
+        params = {key: v[rows] for key, v in params.items()}
+        simulated += len(rows)
+        with stage("indicators"):
+            rsi, k, d = indicator_arrays(prices, *periods)
+        with stage("lanes"):
+            res = simulate_lanes(np.array(prices, dtype=np.float64), as_array(rsi), as_array(k), as_array(d),
+                                 params, track_drawdown=False, ts=ts)
+        for i, j in zip(idx, lane_of):
+            out[i] = {
+                "symbol": symbol,
+                "realized_pnl": round(float(res["realized"][j]), 2),
+                "unrealized_pnl": round(float(res["unrealized"][j]), 2),
+                "position_qty_end": int(res["qty"][j]),
+                "slices_in_use_end": int(res["slices"][j]),
+            }
+    if stats is not None:
+        stats.update(configs=len(scfgs), simulated=simulated)
+    return out
@@ -0,0 +1,234 @@
+"""Single-producer / multi-consumer tick ring in `multiprocessing.shared_memory`.
+
+Layout of the shared block::
+
+    header   8 x int64: magic, capacity, write_seq, max_consumers, symbol table word
+    cursors  max_consumers x int64 (next sequence each consumer will read)
+    symbols  2 x SYMBOL_BYTES / 2 of JSON (symbol id -> name), double-buffered
+    records  capacity x RECORD (seq, ts, price, symbol id)
+
+The producer writes record ``seq`` into slot ``seq % capacity`` and then
+publishes it by storing ``write_seq = seq + 1``. It never waits for
+consumers. A consumer that falls more than `capacity` records behind loses
+the oldest ones: `RingConsumer.poll` skips to the oldest record still in the
+ring and counts the skipped records in `gaps`.
+
+`poll` returns a zero-copy numpy view into the shared block. The view stays
+valid until the producer laps it, so size `capacity` for the consumer's
+processing delay, or `.copy()` the batch. Symbols are interned to int32 ids.
+The table can grow while consumers run: they reload it when they see an id
+they do not know. The producer writes each new table into the half not
+currently published and then switches the header word (``version << 20 |
+length``, half = version parity) in one store; a reader retries if the
+version moved by two or more while it copied, i.e. its half was rewritten.
+"""
+from __future__ import annotations
+import json
+import struct
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+MAGIC = 0x6B69735469636B31  # "kisTick1"
+RECORD = np.dtype([("seq", "<i8"), ("ts", "<f8"), ("price", "<f8"), ("sym", "<i4"), ("_pad", "<i4")])
+SYMBOL_BYTES = 1 << 16
+_HEADER = 64
+_PACK = struct.Struct("<qddi4x")  # one RECORD
+_SEQ = struct.Struct("<q")
+_WRITE_SEQ_OFF = 16
+_TABLE_BITS = 20  # low bits of the symbol table word: JSON length
+
+
+class TickRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+        self.hdr = np.ndarray((8,), dtype="<i8", buffer=buf)
+        if int(self.hdr[0]) != MAGIC:
+            raise ValueError(f"shared memory block {shm.name!r} is not a tick ring")
+        self.capacity = int(self.hdr[1])
+        self.mask = self.capacity - 1
+        self.max_consumers = int(self.hdr[3])
+        self._sym_off = _HEADER + 8 * self.max_consumers
+        self._rec_off = self._sym_off + SYMBOL_BYTES
+        self.cursors = np.ndarray((self.max_consumers,), dtype="<i8", buffer=buf, offset=_HEADER)
+        self.records = np.ndarray((self.capacity,), dtype=RECORD, buffer=buf, offset=self._rec_off)
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._seq = int(self.hdr[2])
+        self.load_symbols()
+
+    @classmethod
+    def create(cls, capacity: int = 1 << 20, max_consumers: int = 16, symbols: Sequence[str] = (),
+               name: Optional[str] = None) -> "TickRing":
+        """New ring; `capacity` is rounded up to a power of two. All cursors start at sequence 0."""
+        capacity = 1 << max(0, int(capacity) - 1).bit_length()
+        size = _HEADER + 8 * max_consumers + SYMBOL_BYTES + capacity * RECORD.itemsize
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        hdr = np.ndarray((8,), dtype="<i8", buffer=shm.buf)
+        hdr[:] = 0
+        hdr[1], hdr[3] = capacity, max_consumers
+        np.ndarray((max_consumers,), dtype="<i8", buffer=shm.buf, offset=_HEADER)[:] = 0
+        hdr[0] = MAGIC
+        del hdr
+        ring = cls(shm, owner=True)
+        for s in symbols:
+            ring.symbol_id(s)
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> "TickRing":
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def write_seq(self) -> int:
+        return int(self.hdr[2])
+
+    # Symbol table --------------------------------------------------------
+    def _table_off(self, version: int) -> int:
+        return self._sym_off + (version & 1) * (SYMBOL_BYTES // 2)
+
+    def load_symbols(self) -> List[str]:
+        while True:
+            word = int(self.hdr[4])
+            if not word:
+                return self._names
+            version, n = word >> _TABLE_BITS, word & ((1 << _TABLE_BITS) - 1)
+            off = self._table_off(version)
+            blob = bytes(self.shm.buf[off:off + n])
+            if (int(self.hdr[4]) >> _TABLE_BITS) - version < 2:
+                break
+        self._names = json.loads(blob)
+        self._ids = {s: i for i, s in enumerate(self._names)}
+        return self._names
+
+    def symbols(self) -> List[str]:
+        return self._names
+
+    def symbol_id(self, symbol: str) -> int:
+        """Id of `symbol`, adding it to the shared table (producer side)."""
+        sid = self._ids.get(symbol)
+        if sid is None:
+            names = self._names + [symbol]
+            blob = json.dumps(names).encode()
+            if len(blob) > SYMBOL_BYTES // 2:
+                raise ValueError("tick ring symbol table is full")
+            version = (int(self.hdr[4]) >> _TABLE_BITS) + 1
+            off = self._table_off(version)
+            self.shm.buf[off:off + len(blob)] = blob
+            self.hdr[4] = version << _TABLE_BITS | len(blob)
+            self._names = names
+            sid = self._ids[symbol] = len(names) - 1
+        return sid
+
+    # Producer ------------------------------------------------------------
+    def publish(self, symbol: str, price: float, ts: float) -> int:
+        """Append one tick; returns its sequence number."""
+        sid = self._ids.get(symbol)
+        if sid is None:
+            sid = self.symbol_id(symbol)
+        seq = self._seq
+        buf = self.shm.buf
+        _PACK.pack_into(buf, self._rec_off + (seq & self.mask) * _PACK.size, seq, ts, price, sid)
+        self._seq = seq + 1
+        _SEQ.pack_into(buf, _WRITE_SEQ_OFF, seq + 1)
+        return seq
+
+    def mark(self, slot: int) -> int:
+        """Publish a control marker for consumer `slot` (symbol id ``-(slot + 1)``).
+
+        Lets a producer order an out-of-band message (e.g. on a queue) relative
+        to the ticks around it.
+        """
+        seq = self._seq
+        _PACK.pack_into(self.shm.buf, self._rec_off + (seq & self.mask) * _PACK.size, seq, 0.0, 0.0, -(slot + 1))
+        self._seq = seq + 1
+        _SEQ.pack_into(self.shm.buf, _WRITE_SEQ_OFF, seq + 1)
+        return seq
+
+    def publish_many(self, sym_ids, prices, ts) -> int:
+        """Append a batch given as arrays of symbol ids, prices and timestamps; returns the next sequence."""
+        n = len(prices)
+        start = 0
+        while start < n:
+            seq = self._seq
+            slot = seq & self.mask
+            m = min(n - start, self.capacity - slot)
+            out = self.records[slot:slot + m]
+            out["seq"] = np.arange(seq, seq + m)
+            out["ts"] = ts[start:start + m]
+            out["price"] = prices[start:start + m]
+            out["sym"] = sym_ids[start:start + m]
+            self._seq = seq + m
+            self.hdr[2] = self._seq
+            start += m
+        return self._seq
+
+    # Consumers -----------------------------------------------------------
+    def consumer(self, slot: int, start: Optional[str] = None) -> "RingConsumer":
+        """Reader for cursor `slot`: resumes from the slot's shared cursor, or from the
+        ``"latest"`` / ``"oldest"`` record still in the ring."""
+        if not 0 <= slot < self.max_consumers:
+            raise ValueError(f"consumer slot {slot} out of range (max_consumers={self.max_consumers})")
+        return RingConsumer(self, slot, start)
+
+    def lag(self, slot: int) -> int:
+        return self.write_seq - int(self.cursors[slot])
+
+    def close(self) -> None:
+        # Drop our numpy views first; batches still held by callers keep the
+        # mapping alive until they are released.
+        self.hdr = self.cursors = self.records = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self) -> None:
+        self.shm.unlink()
+
+
+class RingConsumer:
+    def __init__(self, ring: TickRing, slot: int, start: Optional[str] = None):
+        self.ring = ring
+        self.slot = slot
+        self.gaps = 0
+        head = ring.write_seq
+        if start == "latest":
+            self.cursor = head
+        elif start == "oldest":
+            self.cursor = max(0, head - ring.capacity)
+        else:
+            self.cursor = int(ring.cursors[slot])
+        ring.cursors[slot] = self.cursor
+
+    def poll(self, max_n: int = 4096) -> np.ndarray:
+        """Next contiguous batch of up to `max_n` records (a view; may be empty)."""
+        ring = self.ring
+        cap = ring.capacity
+        cur = self.cursor
+        head = int(ring.hdr[2])
+        if head - cur > cap:
+            self.gaps += head - cap - cur
+            cur = head - cap
+        slot = cur & ring.mask
+        n = min(head - cur, max_n, cap - slot)
+        view = ring.records[slot:slot + n]
+        # Records the producer overwrote while we were slicing are lost as well.
+        over = int(ring.hdr[2]) - cap - cur
+        if over > 0:
+            over = min(over, n)
+            self.gaps += over
+            view = view[over:]
+        self.cursor = cur + n
+        ring.cursors[self.slot] = self.cursor
+        return view
+
+    @property
+    def lag(self) -> int:
+        return self.ring.write_seq - self.cursor
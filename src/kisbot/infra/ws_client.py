@@ -1,16 +1,23 @@
 from __future__ import annotations
 import asyncio
-from typing import Callable, List
+from typing import Callable, List, Optional
 
 class WSClient:
-    def __init__(self, symbols: List[str], on_tick: Callable[[str, float, float], None]):
+    """Tick feed. Each tick goes to `on_tick` and/or is published to `ring`
+    (a `kisbot.infra.tickring.TickRing`) for consumers in other processes."""
+    def __init__(self, symbols: List[str], on_tick: Optional[Callable[[str, float, float], None]] = None, ring=None):
         self.symbols = symbols
         self.on_tick = on_tick
+        self.ring = ring
     async def run(self):
         import random, time
+        publish = self.ring.publish if self.ring is not None else None
         while True:
             for s in self.symbols:
                 price = 100 + random.random() * 2
                 now = time.time()
-                self.on_tick(s, price, now)
+                if publish is not None:
+                    publish(s, price, now)
+                if self.on_tick is not None:
+                    self.on_tick(s, price, now)
             await asyncio.sleep(1)
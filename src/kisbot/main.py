@@ -1,51 +1,88 @@
 from __future__ import annotations
-import asyncio
 from pathlib import Path
-import typer, yaml
-from pydantic import BaseModel
-from kisbot.services.trader import run_bot
-from kisbot.infra import logger as logmod
-from kisbot.db.base import init_db
-from kisbot.infra.backtest import backtest
-import json, csv
+import typer
+
+# Keep module import limited to typer: each command imports what it needs so that
+# `kisbot --help` and backtest/optimizer workers do not load the DB/async stack.
 
 app = typer.Typer(help="KIS 3x ETF bot")
 
-class AppConfig(BaseModel):
-    mode: str = "paper"
-    universe: list[str] = []
-    ws: dict = {}
-    bars: dict = {}
-    strategy: dict = {}
-    slices: dict = {}
-    risk: dict = {}
-    execution: dict | None = None
-    postgres: dict | None = None
-    opensearch: dict | None = None
-    slack: dict | None = None
-    symbols: dict | None = None
 
-@app.command()
-def run(config: Path = typer.Option(..., exists=True, readable=True)):
+def __getattr__(name: str):
+    if name == "AppConfig":
+        from kisbot.config import AppConfig
+        return AppConfig
+    raise AttributeError(name)
+
+
+def _load_config(config: Path):
+    import yaml
+    from kisbot.config import AppConfig
+    from kisbot.infra import logger as logmod
     cfg = AppConfig.model_validate(yaml.safe_load(config.read_text()))
     if cfg.opensearch:
         logmod.configure_json_logging(cfg.opensearch.get("index_prefix", "bot-logs"))
+    return cfg
+
+def _maybe_cprofile(enabled: bool):
+    if not enabled:
+        from contextlib import nullcontext
+        return nullcontext()
+    from kisbot.infra.profiling import cprofile
+    return cprofile()
+
+@app.command()
+def run(config: Path = typer.Option(..., exists=True, readable=True),
+        watch: bool = typer.Option(False, "--watch", help="Reload the config file when it changes, keeping indicator and position state."),
+        watch_interval: float = typer.Option(1.0, help="Seconds between --watch checks.")):
+    import asyncio
+    from kisbot.services.trader import run_bot
+    from kisbot.db.base import init_db
+    cfg = _load_config(config)
     cfg_dict = cfg.model_dump()
     if cfg.postgres and cfg.postgres.get("dsn"):
         asyncio.run(init_db(cfg.postgres["dsn"]))
-    asyncio.run(run_bot(cfg_dict))
+    asyncio.run(run_bot(cfg_dict, watch=str(config) if watch else None, watch_interval=watch_interval))
 
-@app.command()
-def backtest(config: Path,
-             from_: str,
-             to: str,
-             symbols: str = "TQQQ",
-             out_json: Path | None = None,
-             out_csv: Path | None = None):
-    cfg = AppConfig.model_validate(yaml.safe_load(config.read_text()))
-    if cfg.opensearch:
-        logmod.configure_json_logging(cfg.opensearch.get("index_prefix", "bot-logs"))
-    res = asyncio.run(backtest(cfg.model_dump(), from_, to, symbols.split(",")))
+@app.command("backtest")
+def backtest_cmd(config: Path = typer.Option(..., exists=True, readable=True),
+                 from_: str = typer.Option(..., "--from"),
+                 to: str = typer.Option(..., "--to"),
+                 symbols: str = "TQQQ",
+                 out_json: Path | None = None,
+                 out_csv: Path | None = None,
+                 no_cache: bool = typer.Option(False, "--no-cache", help="Always recompute; do not read or write the result cache."),
+                 resume: bool = typer.Option(False, "--resume", help="Continue each symbol from its checkpoint and simulate only newly appended bars (object engine)."),
+                 cache_path: Path | None = None,
+                 portfolio: bool = typer.Option(False, "--portfolio", help="Simulate all symbols together on one shared slice book."),
+                 engine: str = typer.Option("object", help="Per-symbol simulation: 'object' (KDTrader) or 'kernel' (array-native, same results)."),
+                 profile: bool = typer.Option(False, "--profile", help="Time load/indicator/signal/fill stages; adds 'profile' to the output."),
+                 cprofile: bool = typer.Option(False, "--cprofile", help="Also run under cProfile (implies --profile)."),
+                 profile_dir: Path = typer.Option(Path("reports/profile"), help="Where --profile writes report.txt and stages.collapsed.")):
+    import asyncio, csv, json
+    from kisbot.infra.backtest import backtest, backtest_portfolio
+    if resume and (no_cache or portfolio):
+        raise typer.BadParameter("--resume keeps checkpoints in the backtest cache; it cannot be combined with --no-cache or --portfolio")
+    cfg = _load_config(config)
+    cfg_dict = cfg.model_dump()
+    prof = None
+    if profile or cprofile:
+        from kisbot.infra.profiling import StageProfiler
+        prof = StageProfiler()
+    with _maybe_cprofile(cprofile) as cprof:
+        if portfolio:
+            res = asyncio.run(backtest_portfolio(cfg_dict, from_, to, symbols.split(","), profile=prof))
+        else:
+            cache = None
+            if not no_cache:
+                from kisbot.infra.bt_cache import BacktestCache
+                cache = BacktestCache.from_config(cfg_dict, str(cache_path) if cache_path else None)
+            res = asyncio.run(backtest(cfg_dict, from_, to, symbols.split(","), cache=cache, engine=engine, profile=prof,
+                                       resume=resume))
+    if prof is not None:
+        from kisbot.infra.profiling import write_reports
+        res["profile"]["files"] = write_reports(prof, str(profile_dir), cprof)
+        print(prof.report(), end="")
     if out_json is not None:
         out_json.write_text(json.dumps(res, indent=2))
     if out_csv is not None:
@@ -71,5 +108,27 @@ def backtest(config: Path,
                     "",
                 ])
 
+@app.command("robustness")
+def robustness_cmd(config: Path = typer.Option(..., exists=True, readable=True),
+                   from_: str = typer.Option(..., "--from"),
+                   to: str = typer.Option(..., "--to"),
+                   symbol: str = "TQQQ",
+                   paths: int = typer.Option(10000, help="Bootstrapped paths simulated together."),
+                   horizon: int | None = typer.Option(None, help="Bars per path (default: history length)."),
+                   block: int = typer.Option(10, help="Bootstrap block length in bars."),
+                   jitter: float = typer.Option(0.0, help="Relative +/- jitter of strategy thresholds per path."),
+                   seed: int | None = None,
+                   out_json: Path | None = None):
+    import json, time
+    from kisbot.infra.montecarlo import robustness
+    cfg = _load_config(config)
+    t0 = time.perf_counter()
+    res = robustness(cfg.model_dump(), symbol, from_, to, paths=paths, horizon=horizon,
+                     block=block, jitter=jitter, seed=seed)
+    res["elapsed_sec"] = round(time.perf_counter() - t0, 3)
+    print(json.dumps(res, indent=2))
+    if out_json is not None:
+        out_json.write_text(json.dumps(res, indent=2))
+
 if __name__ == "__main__":
     app()
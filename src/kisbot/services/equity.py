@@ -0,0 +1,97 @@
+"""Cached account equity for `KDTrader`'s `equity_fetch`.
+
+Traders read equity on every tick, so `EquityService` itself is the
+`equity_fetch` callable: calling it returns the last fetched value in O(1)
+and never touches the network. The balance API is called from the event loop
+only:
+
+- `run()` refreshes every `ttl` seconds;
+- `invalidate()` (called after fills) asks for a refresh because the
+  balance has changed.
+
+Fetches are single-flight: however many symbols fill at once, at most one
+request is in flight. If an invalidation arrives while a request is running,
+one more fetch follows it, because the running one may predate the fill. A
+failed fetch keeps the previous value; its age shows up in the
+``equity_age_seconds`` gauge.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional
+from kisbot.infra import metrics
+from kisbot.infra.logger import log
+
+
+class EquityService:
+    def __init__(self, fetch: Callable[[], Awaitable[float]], initial: float, ttl: float = 30.0,
+                 registry: metrics.Metrics = metrics.REGISTRY):
+        self.fetch = fetch
+        self.value = float(initial)
+        self.ttl = ttl
+        self.updated: Optional[float] = None  # monotonic time of the last successful fetch
+        self.attempted = float("-inf")  # monotonic start of the last fetch
+        self.listeners: List[Callable[[float], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._again = False
+        self.h_fetch = registry.histogram("equity_fetch")
+        self.c_ok = registry.counter("equity_fetches", result="ok")
+        self.c_err = registry.counter("equity_fetches", result="error")
+        registry.gauge("account_equity", lambda: self.value)
+        registry.gauge("equity_age_seconds", lambda: self.age)
+
+    def __call__(self) -> float:
+        return self.value
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last successful fetch (inf before the first)."""
+        return float("inf") if self.updated is None else time.monotonic() - self.updated
+
+    async def refresh(self) -> float:
+        """Fetch now, or join the fetch already in flight; returns the (possibly unchanged) value."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run_fetches())
+        return await asyncio.shield(self._task)
+
+    def invalidate(self) -> None:
+        """The balance changed (e.g. a fill): schedule a fetch that starts after this call."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run_fetches())
+        else:
+            self._again = True
+
+    async def _run_fetches(self) -> float:
+        try:
+            while True:
+                self._again = False
+                await self._fetch_once()
+                if not self._again:
+                    return self.value
+        finally:
+            self._task = None
+
+    async def _fetch_once(self) -> None:
+        self.attempted = time.monotonic()
+        t0 = time.perf_counter_ns()
+        try:
+            value = float(await self.fetch())
+        except Exception as e:
+            self.c_err.inc()
+            log("equity.fetch_error", error=str(e), age=round(self.age, 3))
+            return
+        finally:
+            self.h_fetch.record(time.perf_counter_ns() - t0)
+        self.c_ok.inc()
+        self.updated = time.monotonic()
+        if value != self.value:
+            self.value = value
+            for fn in self.listeners:
+                fn(value)
+
+    async def run(self) -> None:
+        """Fetch whenever `ttl` seconds have passed since the last attempt (fills reset the clock)."""
+        while True:
+            await asyncio.sleep(max(0.0, self.attempted + self.ttl - time.monotonic()))
+            if time.monotonic() - self.attempted >= self.ttl:
+                await self.refresh()
@@ -1,15 +1,27 @@
 from __future__ import annotations
-import uuid
+import time, uuid
 from kisbot.infra.logger import log
 from kisbot.infra.slack import notify
 from kisbot.infra.rest_client import OrderRouter
 from kisbot.db import crud
+from kisbot.infra.metrics import REGISTRY
 
 class Executor:
-    def __init__(self, cfg):
+    def __init__(self, cfg, orders=None):
         self.cfg = cfg
         self.mode = cfg.get('mode', 'paper')
         self.router = OrderRouter(self.mode)
+        # With an OrderManager, order rows are written in its batches and paper
+        # orders fill through PaperExecutions instead of being assumed filled.
+        self.orders = orders
+        self.paper = None
+        if orders is not None and self.mode == 'paper':
+            from kisbot.services.orders import PaperExecutions
+            self.paper = PaperExecutions(orders)
+        self.h_tick_to_order = REGISTRY.histogram("tick_to_order")
+        self.h_submit = REGISTRY.histogram("order_submit")
+        self.h_db = REGISTRY.histogram("db_write", table="orders")
+        self.h_slack = REGISTRY.histogram("slack")
 
     async def place(
         self,
@@ -18,21 +30,44 @@ class Executor:
         qty: int,
         type_: str = "MKT",
         price: float | None = None,
+        tick_ns: int | None = None,
+        clordid: str | None = None,
     ):
-        clordid = str(uuid.uuid4())
-        await self.router.place(symbol, side, qty, type_, price)
-        await crud.insert_order(
-            clordid,
-            symbol,
-            side,
-            qty,
-            type_,
-            price,
-            status="SUBMITTED",
-            mode=self.mode,
-        )
+        if clordid is None:
+            if self.orders is not None:
+                clordid = self.orders.submit(symbol, side, qty, type_, price, ts=time.time(), ref_px=price or 0.0)
+            else:
+                clordid = str(uuid.uuid4())
+        t0 = time.perf_counter_ns()
+        if tick_ns is not None:
+            self.h_tick_to_order.record(t0 - tick_ns)
+        try:
+            await self.router.place(symbol, side, qty, type_, price)
+        except Exception:
+            if self.orders is not None:
+                self.orders.on_cancel(clordid, time.time(), status="REJECTED")
+            raise
+        t1 = time.perf_counter_ns()
+        self.h_submit.record(t1 - t0)
+        REGISTRY.inc("orders", symbol=symbol, side=side)
+        if self.orders is None:
+            await crud.insert_order(
+                clordid,
+                symbol,
+                side,
+                qty,
+                type_,
+                price,
+                status="SUBMITTED",
+                mode=self.mode,
+            )
+            self.h_db.record(time.perf_counter_ns() - t1)
+        elif self.paper is not None:
+            self.paper.on_submitted(clordid, time.time())
         log("order.submit", symbol=symbol, side=side, qty=qty, type=type_, mode=self.mode)
         slack_cfg = self.cfg.get('slack') or {}
         text = f"[{self.mode}] {symbol} {side} {qty} {type_}"
+        t2 = time.perf_counter_ns()
         await notify(slack_cfg.get('webhook_url', ''), text)
+        self.h_slack.record(time.perf_counter_ns() - t2)
         return clordid
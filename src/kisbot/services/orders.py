@@ -0,0 +1,210 @@
+"""Open-order index and fill reconciliation.
+
+`OrderManager` keeps every open order in memory, indexed by clordid and by
+symbol. It ingests fill and cancel events (from the broker's execution feed,
+or `PaperExecutions` in paper mode) in O(1) each and notifies callbacks, which
+reconcile `KDTrader` and the PnL materializer with what actually executed.
+Order status changes and trades are collected and written in batches by
+`flush()`, so there are no DB round-trips per event. An order is dropped from
+memory once it is filled or cancelled.
+
+`KDTrader` books every order as filled at the tick price (`ref_px`) when it
+places it. `reconcile_fill` re-prices those shares to the actual fill price.
+`reconcile_cancel` takes back whatever did not execute.
+"""
+from __future__ import annotations
+import asyncio
+import uuid
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from kisbot.infra.logger import log
+from kisbot.services.pnl import _to_dt
+
+SUBMITTED, PARTIAL, FILLED, CANCELLED, REJECTED = "SUBMITTED", "PARTIAL", "FILLED", "CANCELLED", "REJECTED"
+
+
+class _Order:
+    __slots__ = ("clordid", "symbol", "side", "qty", "type", "px", "ts", "status", "filled", "fill_px",
+                 "ref_px", "ref_avg", "ref_slices")
+
+    def __init__(self, clordid: str, symbol: str, side: str, qty: int, type_: str, px: Optional[float], ts: float,
+                 ref_px: float, ref_avg: float, ref_slices: int):
+        self.clordid = clordid
+        self.symbol = symbol
+        self.side = side
+        self.qty = qty
+        self.type = type_
+        self.px = px
+        self.ts = ts
+        self.status = SUBMITTED
+        self.filled = 0
+        self.fill_px = 0.0  # average fill price
+        self.ref_px = ref_px  # price the trader booked the order at
+        self.ref_avg = ref_avg  # trader avg_px before the order
+        self.ref_slices = ref_slices  # slices in use before the order
+
+    @property
+    def remaining(self) -> int:
+        return self.qty - self.filled
+
+
+class OrderManager:
+    def __init__(self, writer: Optional[Callable[[list, list], Awaitable[None]]] = None, mode: str = "paper",
+                 on_fill: Optional[Callable[[_Order, int, float, float], None]] = None,
+                 on_cancel: Optional[Callable[[_Order, int, float], None]] = None):
+        self.writer = writer
+        self.mode = mode
+        self.on_fill_cb = on_fill
+        self.on_cancel_cb = on_cancel
+        self.open: Dict[str, _Order] = {}
+        self.by_symbol: Dict[str, Dict[str, _Order]] = {}
+        self.dirty: Dict[str, _Order] = {}
+        self.trades: List[dict] = []
+        self.unknown = 0
+
+    def submit(self, symbol: str, side: str, qty: int, type_: str = "MKT", px: Optional[float] = None,
+               ts: float = 0.0, ref_px: float = 0.0, ref_avg: float = 0.0, ref_slices: int = 0,
+               clordid: Optional[str] = None) -> str:
+        """Register a new order before it is sent; returns its clordid."""
+        clordid = clordid or str(uuid.uuid4())
+        o = _Order(clordid, symbol, side, qty, type_, px, ts, ref_px, ref_avg, ref_slices)
+        self.open[clordid] = o
+        self.by_symbol.setdefault(symbol, {})[clordid] = o
+        self.dirty[clordid] = o
+        return clordid
+
+    def open_orders(self, symbol: str) -> List[_Order]:
+        return list(self.by_symbol.get(symbol, {}).values())
+
+    # Execution events ---------------------------------------------------
+    def on_fill(self, clordid: str, qty: int, px: float, ts: float) -> bool:
+        o = self.open.get(clordid)
+        if o is None:
+            self.unknown += 1
+            log("orders.unknown_fill", clordid=clordid, qty=qty, px=px)
+            return False
+        qty = min(qty, o.remaining)
+        if qty <= 0:
+            return False
+        o.fill_px = (o.fill_px * o.filled + px * qty) / (o.filled + qty)
+        o.filled += qty
+        o.status = FILLED if o.remaining == 0 else PARTIAL
+        self.trades.append({"clordid": clordid, "ts": _to_dt(ts), "symbol": o.symbol, "side": o.side,
+                            "qty": qty, "px": px})
+        self.dirty[clordid] = o
+        if o.status == FILLED:
+            self._close(o)
+        if self.on_fill_cb is not None:
+            self.on_fill_cb(o, qty, px, ts)
+        return True
+
+    def on_cancel(self, clordid: str, ts: float, status: str = CANCELLED) -> bool:
+        """Cancel (or reject) the unfilled remainder of an order."""
+        o = self.open.get(clordid)
+        if o is None:
+            self.unknown += 1
+            log("orders.unknown_cancel", clordid=clordid, status=status)
+            return False
+        o.status = status
+        self.dirty[clordid] = o
+        self._close(o)
+        if self.on_cancel_cb is not None:
+            self.on_cancel_cb(o, o.remaining, ts)
+        return True
+
+    def apply(self, events: Iterable[tuple]) -> int:
+        """Ingest a batch of ``("fill", clordid, qty, px, ts)`` / ``("cancel", clordid, ts[, status])`` events."""
+        n = 0
+        for ev in events:
+            if ev[0] == "fill":
+                n += self.on_fill(ev[1], ev[2], ev[3], ev[4])
+            else:
+                n += self.on_cancel(*ev[1:])
+        return n
+
+    def _close(self, o: _Order) -> None:
+        del self.open[o.clordid]
+        orders = self.by_symbol[o.symbol]
+        del orders[o.clordid]
+        if not orders:
+            del self.by_symbol[o.symbol]
+
+    # Persistence ------------------------------------------------------
+    def drain(self) -> tuple[list, list]:
+        """Changed `orders` rows and new `trades` rows since the last call."""
+        orders = [
+            {"ts": _to_dt(o.ts), "clordid": o.clordid, "symbol": o.symbol, "side": o.side, "qty": o.qty,
+             "type": o.type, "px": o.px, "status": o.status, "mode": self.mode}
+            for o in self.dirty.values()
+        ]
+        trades = self.trades
+        self.dirty = {}
+        self.trades = []
+        return orders, trades
+
+    async def flush(self) -> int:
+        dirty = self.dirty
+        orders, trades = self.drain()
+        if (orders or trades) and self.writer is not None:
+            try:
+                await self.writer(orders, trades)
+            except Exception:
+                # Re-queue; later changes to the same orders win.
+                self.dirty = {**dirty, **self.dirty}
+                self.trades = trades + self.trades
+                raise
+        return len(orders) + len(trades)
+
+    async def run(self, interval: float = 1.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log("orders.flush_error", error=str(e))
+
+
+class PaperExecutions:
+    """Local stand-in for the execution feed: orders fill in full at the price the trader booked."""
+
+    def __init__(self, manager: OrderManager):
+        self.manager = manager
+
+    def on_submitted(self, clordid: str, ts: float) -> None:
+        o = self.manager.open.get(clordid)
+        if o is not None:
+            self.manager.on_fill(clordid, o.remaining, o.ref_px, ts)
+
+
+# Trader reconciliation ------------------------------------------------
+def reconcile_fill(trader, order: _Order, qty: int, px: float) -> None:
+    """Re-price `qty` shares of a BUY that `trader` booked at `order.ref_px` to the fill price."""
+    if order.side == "BUY" and trader.position_qty > 0 and px != order.ref_px:
+        trader.avg_px += (px - order.ref_px) * qty / trader.position_qty
+
+
+def reconcile_cancel(trader, order: _Order, remaining: int) -> None:
+    """Undo the part of an order that `trader` booked but did not execute.
+
+    An unfilled BUY remainder is removed from the position. If nothing is
+    left, the slices are freed and the batch is reset, as on a sell. Otherwise
+    the reserved slices stay in use. An unfilled SELL remainder is still held:
+    it goes back into the position at its old average, with its share of
+    the slices.
+    """
+    if remaining <= 0:
+        return
+    if order.side == "BUY":
+        qty = trader.position_qty - remaining
+        if qty > 0:
+            trader.avg_px = (trader.avg_px * trader.position_qty - order.ref_px * remaining) / qty
+            trader.position_qty = qty
+        else:
+            trader.position_qty = 0
+            trader.avg_px = 0.0
+            trader.book.free_all()
+            trader._reset_batch()
+    else:
+        held = trader.position_qty + remaining
+        trader.avg_px = (trader.avg_px * trader.position_qty + order.ref_avg * remaining) / held
+        trader.position_qty = held
+        trader.book.slices_in_use += -(-order.ref_slices * remaining // order.qty)
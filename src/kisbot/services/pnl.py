@@ -0,0 +1,148 @@
+"""Incremental position and daily PnL materializer.
+
+Keeps per-symbol position, realized/unrealized PnL and the day's running max
+drawdown up to date in O(1) per fill or mark, and upserts only the rows that
+changed since the last flush. Dashboards read `positions` (one row per symbol)
+and `pnl_daily` (one row per day) instead of aggregating `orders`/`trades`.
+"""
+from __future__ import annotations
+import asyncio
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from kisbot.infra.logger import log
+
+
+class _Pos:
+    __slots__ = ("qty", "avg_px", "r_pnl", "u_pnl", "mark", "last_ts")
+
+    def __init__(self, qty: int = 0, avg_px: float = 0.0, r_pnl: float = 0.0):
+        self.qty = qty
+        self.avg_px = avg_px
+        self.r_pnl = r_pnl
+        self.u_pnl = 0.0
+        self.mark = 0.0
+        self.last_ts = 0.0
+
+
+def _to_dt(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None)
+
+
+class PnLMaterializer:
+    def __init__(self, writer: Optional[Callable[[list, list], Awaitable[None]]] = None):
+        self.writer = writer
+        self.pos: Dict[str, _Pos] = {}
+        self.dirty: set[str] = set()
+        self.total_realized = 0.0
+        self.total_unrealized = 0.0
+        self.day: Optional[int] = None  # days since epoch (UTC)
+        self.day_realized_start = 0.0
+        self.peak = 0.0
+        self.max_dd = 0.0
+        self.days_dirty: Dict[int, tuple] = {}
+
+    def _get(self, sym: str) -> _Pos:
+        p = self.pos.get(sym)
+        if p is None:
+            p = self.pos[sym] = _Pos()
+        return p
+
+    def seed(self, sym: str, qty: int, avg_px: float, r_pnl: float | None = None) -> None:
+        """Initial state at startup (from the positions table and/or the trader journal)."""
+        p = self._get(sym)
+        p.qty, p.avg_px = qty, avg_px
+        if r_pnl is not None:
+            self.total_realized += r_pnl - p.r_pnl
+            p.r_pnl = r_pnl
+
+    # Event path -------------------------------------------------------
+    def on_fill(self, sym: str, side: str, qty: int, px: float, ts: float) -> None:
+        self._roll_day(ts)
+        p = self._get(sym)
+        if side == "BUY":
+            new_qty = p.qty + qty
+            p.avg_px = (p.avg_px * p.qty + px * qty) / max(new_qty, 1)
+            p.qty = new_qty
+        else:
+            closed = min(qty, p.qty)
+            pnl = (px - p.avg_px) * closed
+            p.r_pnl += pnl
+            self.total_realized += pnl
+            p.qty -= closed
+            if p.qty == 0:
+                p.avg_px = 0.0
+        self._mark(sym, p, px, ts)
+        self.dirty.add(sym)
+
+    def on_mark(self, sym: str, px: float, ts: float) -> None:
+        p = self.pos.get(sym)
+        if p is None or (p.qty == 0 and p.u_pnl == 0.0):
+            return
+        self._roll_day(ts)
+        self._mark(sym, p, px, ts)
+
+    def _mark(self, sym: str, p: _Pos, px: float, ts: float) -> None:
+        u = (px - p.avg_px) * p.qty if p.qty else 0.0
+        p.mark = px
+        p.last_ts = ts
+        if u != p.u_pnl:
+            self.total_unrealized += u - p.u_pnl
+            p.u_pnl = u
+            self.dirty.add(sym)
+        self._update_day()
+
+    def _roll_day(self, ts: float) -> None:
+        day = int(ts // 86400)
+        if day != self.day:
+            self.day = day
+            self.day_realized_start = self.total_realized
+            self.peak = self.total_unrealized
+            self.max_dd = 0.0
+
+    def _update_day(self) -> None:
+        realized = self.total_realized - self.day_realized_start
+        equity = realized + self.total_unrealized
+        if equity > self.peak:
+            self.peak = equity
+        elif self.peak - equity > self.max_dd:
+            self.max_dd = self.peak - equity
+        self.days_dirty[self.day] = (realized, self.total_unrealized, self.max_dd)
+
+    # Persistence ------------------------------------------------------
+    def drain(self) -> tuple[list, list]:
+        """Rows changed since the last call: (positions, pnl_daily)."""
+        positions = [
+            {"symbol": s, "qty": p.qty, "avg_px": p.avg_px, "u_pnl": p.u_pnl, "r_pnl": p.r_pnl,
+             "last_ts": _to_dt(p.last_ts) if p.last_ts else None}
+            for s in self.dirty
+            for p in (self.pos[s],)
+        ]
+        daily = [
+            {"dt": _to_dt(day * 86400.0), "realized": r, "unrealized": u, "max_dd": dd}
+            for day, (r, u, dd) in sorted(self.days_dirty.items())
+        ]
+        self.dirty.clear()
+        self.days_dirty.clear()
+        return positions, daily
+
+    async def flush(self) -> int:
+        days = dict(self.days_dirty)
+        positions, daily = self.drain()
+        if (positions or daily) and self.writer is not None:
+            try:
+                await self.writer(positions, daily)
+            except Exception:
+                # Re-queue so the next flush writes the then-current values.
+                self.dirty.update(r["symbol"] for r in positions)
+                for day, row in days.items():
+                    self.days_dirty.setdefault(day, row)
+                raise
+        return len(positions) + len(daily)
+
+    async def run(self, interval: float = 5.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log("pnl.flush_error", error=str(e))
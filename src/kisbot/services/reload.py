@@ -0,0 +1,110 @@
+"""Hot reload of the config file for `kisbot run --watch`.
+
+`ConfigWatcher` polls the file's size and mtime. On a change it re-validates
+the file as `AppConfig`, and `diff_configs` compares it with the running
+config one symbol at a time. The bot applies the diff in place:
+
+- symbols removed from `universe` are dropped;
+- new symbols are built and start warming up;
+- a symbol whose merged ``strategy``/``slices``/``risk`` changed is retuned
+  with `retune_symbol`. Its StochRSI is rebuilt only if an indicator period
+  changed; position, batch and slice usage are kept.
+
+Other symbols are not touched. A file that fails to parse or validate is
+logged and ignored. Sections that need a restart (mode, shards, DB, ...) are
+logged and otherwise ignored until the next start.
+"""
+from __future__ import annotations
+import asyncio
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from kisbot.infra.logger import log
+from kisbot.services.trader import INDICATOR_KEYS, symbol_config
+
+# Merged per-symbol sections that can change on a live symbol.
+SYMBOL_SECTIONS = ("strategy", "slices", "risk")
+# Top-level sections that are only read at start-up.
+RESTART_SECTIONS = ("mode", "ws", "execution", "postgres", "opensearch", "slack", "shards", "metrics", "journal",
+                    "signals_store", "pnl", "orders", "equity")
+
+
+@dataclass
+class ConfigDiff:
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    # symbol -> True if its indicator must be rebuilt, False for a parameter swap
+    changed: Dict[str, bool] = field(default_factory=dict)
+    restart: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def load_config(path: str) -> dict:
+    """Parse and validate `path` as `AppConfig`; raises on invalid files."""
+    import yaml
+    from kisbot.config import AppConfig
+    with open(path) as f:
+        return AppConfig.model_validate(yaml.safe_load(f)).model_dump()
+
+
+def diff_configs(old: dict, new: dict) -> ConfigDiff:
+    old_u = list(dict.fromkeys(old.get("universe") or []))
+    new_u = list(dict.fromkeys(new.get("universe") or []))
+    d = ConfigDiff(
+        added=[s for s in new_u if s not in old_u],
+        removed=[s for s in old_u if s not in new_u],
+        restart=[k for k in RESTART_SECTIONS if old.get(k) != new.get(k)],
+    )
+    for sym in new_u:
+        if sym not in old_u:
+            continue
+        o, n = symbol_config(old, sym), symbol_config(new, sym)
+        if any(o.get(k) != n.get(k) for k in SYMBOL_SECTIONS):
+            d.changed[sym] = any(o["strategy"].get(k) != n["strategy"].get(k) for k in INDICATOR_KEYS)
+    return d
+
+
+class ConfigWatcher:
+    def __init__(self, path: str, cfg: dict, apply: Callable[[dict, ConfigDiff], None], interval: float = 1.0):
+        self.path = path
+        self.cfg = cfg
+        self.apply = apply
+        self.interval = interval
+        self.reloads = 0
+        self._stamp = self._stat()
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def check(self) -> Optional[ConfigDiff]:
+        """Reload if the file changed since the last check; returns the applied diff."""
+        stamp = self._stat()
+        if stamp is None or stamp == self._stamp:
+            return None
+        self._stamp = stamp
+        try:
+            new = load_config(self.path)
+        except Exception as e:
+            log("config.reload_error", path=self.path, error=str(e))
+            return None
+        d = diff_configs(self.cfg, new)
+        if d.restart:
+            log("config.restart_required", path=self.path, sections=d.restart)
+        if d:
+            self.apply(new, d)
+            self.reloads += 1
+            log("config.reload", path=self.path, added=d.added, removed=d.removed,
+                rebuilt=[s for s, r in d.changed.items() if r], retuned=[s for s, r in d.changed.items() if not r])
+        self.cfg = new
+        return d
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.check()
@@ -0,0 +1,422 @@
+"""Symbol-sharded trading engine.
+
+The coordinator (the process running `run_bot`) owns the websocket feed and the
+`Executor`; each worker process owns the `StochRSI`/`SliceBook`/`KDTrader` set of
+the symbols hashed to it. Ticks go out and orders/signals come back over
+multiprocessing queues in batches, so the pickling cost is paid per batch rather
+than per tick. With ``transport: ring`` the coordinator instead publishes every
+tick once into a shared-memory `TickRing` that all workers read.
+
+Rebalancing: symbols are placed with rendezvous (highest-random-weight) hashing.
+Adding a symbol only sends an ``add`` message to its owning worker and leaves
+every other symbol where it is; a config change for a symbol goes to its
+owner the same way (`update_symbol`). Changing the worker count requires a restart;
+HRW then moves only the ~1/N of symbols whose winning shard changed, and those
+symbols re-warm their indicators on the new shard.
+
+Workers time the same stages as the inline path (ingest, indicator_update,
+signal_decision, per-symbol tick/signal counters) in a local registry and ship
+the deltas every METRICS_SHIP_SEC and on `drain`; the coordinator merges them
+into its exported registry.
+"""
+from __future__ import annotations
+import asyncio
+import multiprocessing as mp
+import queue
+import time
+import zlib
+from kisbot.infra import metrics
+from kisbot.infra.logger import log
+from kisbot.services.trader import build_equity_service, build_symbol, decide, retune_symbol, symbol_config
+
+
+# Per-symbol messages a worker applies between two ticks.
+CONTROL = ("add", "remove", "config")
+# How often a busy worker sends its metric deltas to the coordinator.
+METRICS_SHIP_SEC = 0.5
+# Config sections only the single-process loop implements: trader state lives in
+# the workers, and the coordinator has no journal, PnL materializer or order index.
+INLINE_ONLY = ("journal", "pnl", "orders")
+
+
+def shard_of(symbol: str, workers: int) -> int:
+    """Stable shard for `symbol` (rendezvous hashing, independent of PYTHONHASHSEED)."""
+    return max(range(workers), key=lambda i: zlib.crc32(f"{symbol}:{i}".encode()))
+
+
+def _worker(shard: int, cfgs: dict, inbox, outbox, ring_name: str | None = None) -> None:
+    stoch, traders = {}, {}
+    reg = metrics.Metrics()
+    h_ingest = reg.histogram("ingest")
+    h_indicator = reg.histogram("indicator_update")
+    h_signal = reg.histogram("signal_decision")
+    ticks, sigs = {}, {}
+    perf_ns = time.perf_counter_ns
+    shipped = time.monotonic()
+
+    def add(sym: str, scfg: dict) -> None:
+        stoch[sym], _, traders[sym] = build_symbol(sym, scfg)
+        ticks[sym] = reg.counter("ticks", symbol=sym)
+        sigs[sym] = reg.counter("signals", symbol=sym)
+
+    def ship() -> None:
+        nonlocal shipped
+        shipped = time.monotonic()
+        delta = reg.take()
+        if delta["hists"] or delta["counters"]:
+            outbox.put(("metrics", shard, delta))
+
+    equity_fetch = None  # the coordinator's account equity, once it sends one
+
+    def control(msg) -> None:
+        nonlocal equity_fetch
+        kind, sym = msg[0], msg[1]
+        if kind == "equity":
+            value = msg[1]
+            equity_fetch = lambda: value
+        elif kind == "add":
+            add(sym, msg[2])
+        elif kind == "remove":
+            stoch.pop(sym, None)
+            traders.pop(sym, None)
+        elif sym in traders:  # "config"
+            stoch[sym] = retune_symbol(stoch[sym], traders[sym], msg[2])
+
+    for sym, scfg in cfgs.items():
+        add(sym, scfg)
+
+    orders: list = []
+    signals: list = []
+
+    def place(sy, si, q, t, px=None):
+        orders.append((sy, si, q, t, px))
+
+    def on_signal(sym, k, d):
+        sigs[sym].inc()
+        signals.append((sym, k, d))
+
+    def run(rows) -> None:
+        nonlocal orders, signals
+        for sym, price, now in rows:
+            if sym in traders:
+                # Same stages as run_bot's on_tick (process_tick, timed)
+                t0 = perf_ns()
+                h_ingest.record(max(0, int((time.time() - now) * 1e9)))
+                ticks[sym].inc()
+                k, d = stoch[sym].update(price)
+                t1 = perf_ns()
+                h_indicator.record(t1 - t0)
+                decide(stoch[sym], traders[sym], k, d, price, now, place, on_signal, equity_fetch)
+                h_signal.record(perf_ns() - t1)
+        if orders or signals:
+            outbox.put(("out", shard, orders, signals))
+            orders, signals = [], []
+        if time.monotonic() - shipped >= METRICS_SHIP_SEC:
+            ship()
+
+    if ring_name is not None:
+        return _ring_loop(shard, ring_name, inbox, outbox, traders, control, run, ship)
+
+    while True:
+        msg = inbox.get()
+        kind = msg[0]
+        if kind == "ticks":
+            run(msg[1])
+        elif kind in CONTROL or kind == "equity":
+            control(msg)
+        elif kind == "sync":
+            ship()
+            outbox.put(("sync", shard, msg[1]))
+        elif kind == "stop":
+            return
+
+
+def _ring_loop(shard: int, ring_name: str, inbox, outbox, traders: dict, control, run, ship) -> None:
+    """Worker loop for the shared-memory transport.
+
+    Ticks are read from the ring in batches and filtered to this shard's
+    symbols with a numpy mask. Control messages arrive on `inbox` together with a
+    ring marker for this shard and are applied at the marker, so they take
+    effect exactly between the same ticks as with the queue transport.
+    """
+    import numpy as np
+    from collections import deque
+    from kisbot.infra.tickring import TickRing
+
+    ring = TickRing.attach(ring_name)
+    cons = ring.consumer(shard)
+    marker = -(shard + 1)
+    names: list = []
+    owned = np.zeros(0, dtype=bool)
+    pending: deque = deque()  # control messages waiting for their marker
+    later: list = []  # other messages read while waiting for a marker
+    gaps = 0
+
+    def refresh() -> None:
+        nonlocal names, owned
+        names = ring.load_symbols()
+        owned = np.array([n in traders for n in names], dtype=bool)
+
+    def apply_control() -> None:
+        while not pending:
+            msg = inbox.get()
+            (pending if msg[0] in CONTROL else later).append(msg)
+        control(pending.popleft())
+        refresh()
+
+    def pump() -> int:
+        nonlocal gaps
+        total = 0
+        while True:
+            batch = cons.poll(4096)
+            if not len(batch):
+                break
+            total += len(batch)
+            ids = batch["sym"]
+            if int(ids.max()) >= len(names):
+                refresh()
+            start = 0
+            for end in np.flatnonzero(ids == marker).tolist() + [len(batch)]:
+                seg = batch[start:end]
+                seg = seg[seg["sym"] >= 0]
+                seg = seg[owned[seg["sym"]]]
+                if len(seg):
+                    run(zip(map(names.__getitem__, seg["sym"].tolist()), seg["price"].tolist(), seg["ts"].tolist()))
+                if end < len(batch):
+                    apply_control()
+                start = end + 1
+        if cons.gaps != gaps:
+            log("shards.ring_gap", shard=shard, lost=cons.gaps - gaps)
+            gaps = cons.gaps
+        return total
+
+    refresh()
+    try:
+        while True:
+            busy = pump()
+            if later:
+                msg = later.pop(0)
+            else:
+                try:
+                    msg = inbox.get_nowait() if busy else inbox.get(timeout=0.001)
+                except queue.Empty:
+                    continue
+            kind = msg[0]
+            if kind in CONTROL:
+                pending.append(msg)  # applied when pump() reaches its marker
+            elif kind == "equity":
+                control(msg)
+            elif kind == "sync":
+                pump()
+                ship()
+                outbox.put(("sync", shard, msg[1]))
+            elif kind == "stop":
+                return
+    finally:
+        del cons
+        ring.close()
+
+
+class ShardedEngine:
+    def __init__(self, cfg: dict, workers: int, batch_size: int = 256, ctx=None, transport: str = "queue",
+                 ring_capacity: int = 1 << 20, registry: metrics.Metrics = metrics.REGISTRY):
+        self.cfg = cfg
+        self.registry = registry  # receives the workers' metric deltas
+        self.workers = workers
+        self.batch_size = batch_size
+        self.assign: dict[str, int] = {}
+        ctx = ctx or mp.get_context()
+        # "ring": ticks go through one shared-memory TickRing read by every
+        # worker instead of being pickled per shard.
+        self.ring = None
+        if transport == "ring":
+            from kisbot.infra.tickring import TickRing
+            self.ring = TickRing.create(ring_capacity, max_consumers=workers, symbols=cfg.get('universe') or [])
+        elif transport != "queue":
+            raise ValueError(f"Unknown shard transport '{transport}' (expected 'queue' or 'ring')")
+        self.inboxes = [ctx.Queue() for _ in range(workers)]
+        self.outbox = ctx.Queue()
+        self.pending: list[list] = [[] for _ in range(workers)]
+        cfgs: list[dict] = [{} for _ in range(workers)]
+        for sym in cfg.get('universe') or []:
+            shard = shard_of(sym, workers)
+            self.assign[sym] = shard
+            cfgs[shard][sym] = symbol_config(cfg, sym)
+        self.procs = [
+            ctx.Process(target=_worker, args=(i, cfgs[i], self.inboxes[i], self.outbox,
+                                              self.ring.name if self.ring is not None else None), daemon=True)
+            for i in range(workers)
+        ]
+        self._sync_token = 0
+
+    def start(self) -> None:
+        for p in self.procs:
+            p.start()
+
+    def add_symbol(self, sym: str, scfg: dict | None = None) -> int:
+        if sym in self.assign:
+            return self.assign[sym]
+        shard = shard_of(sym, self.workers)
+        self.assign[sym] = shard
+        self.inboxes[shard].put(("add", sym, scfg or symbol_config(self.cfg, sym)))
+        if self.ring is not None:
+            self.ring.symbol_id(sym)
+            self.ring.mark(shard)
+        return shard
+
+    def remove_symbol(self, sym: str) -> None:
+        shard = self.assign.pop(sym, None)
+        if shard is not None:
+            self._flush_shard(shard)
+            self.inboxes[shard].put(("remove", sym))
+            if self.ring is not None:
+                self.ring.mark(shard)
+
+    def update_symbol(self, sym: str, scfg: dict) -> None:
+        """Retune `sym` on its shard; ticks already submitted still see the old config."""
+        shard = self.assign.get(sym)
+        if shard is not None:
+            self._flush_shard(shard)
+            self.inboxes[shard].put(("config", sym, scfg))
+            if self.ring is not None:
+                self.ring.mark(shard)
+
+    def set_equity(self, value: float) -> None:
+        """Send account equity to every worker; their traders use it from their next tick on."""
+        for inbox in self.inboxes:
+            inbox.put(("equity", value))
+
+    def submit(self, sym: str, price: float, now: float) -> None:
+        shard = self.assign.get(sym)
+        if shard is None:
+            return
+        if self.ring is not None:
+            self.ring.publish(sym, price, now)
+            return
+        buf = self.pending[shard]
+        buf.append((sym, price, now))
+        if len(buf) >= self.batch_size:
+            self._flush_shard(shard)
+
+    def _flush_shard(self, shard: int) -> None:
+        buf = self.pending[shard]
+        if buf:
+            self.inboxes[shard].put(("ticks", buf))
+            self.pending[shard] = []
+
+    def flush(self) -> None:
+        for shard in range(self.workers):
+            self._flush_shard(shard)
+
+    def poll(self) -> tuple[list, list]:
+        """Non-blocking drain of (orders, signals) produced so far."""
+        orders, signals = [], []
+        while True:
+            try:
+                msg = self.outbox.get_nowait()
+            except queue.Empty:
+                return orders, signals
+            if msg[0] == "out":
+                orders.extend(msg[2])
+                signals.extend(msg[3])
+            elif msg[0] == "metrics":
+                self.registry.merge(msg[2])
+
+    def drain(self, timeout: float | None = 30.0) -> tuple[list, list]:
+        """Flush, then block until every worker has processed everything sent."""
+        self.flush()
+        self._sync_token += 1
+        token = self._sync_token
+        for inbox in self.inboxes:
+            inbox.put(("sync", token))
+        orders, signals = [], []
+        waiting = set(range(self.workers))
+        while waiting:
+            msg = self.outbox.get(timeout=timeout)
+            if msg[0] == "out":
+                orders.extend(msg[2])
+                signals.extend(msg[3])
+            elif msg[0] == "metrics":
+                self.registry.merge(msg[2])
+            elif msg[0] == "sync" and msg[2] == token:
+                waiting.discard(msg[1])
+        return orders, signals
+
+    def stop(self) -> None:
+        self.flush()
+        for inbox in self.inboxes:
+            inbox.put(("stop",))
+        for p in self.procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
+
+
+async def run_sharded(cfg: dict, ex, workers: int, watch: str | None = None, watch_interval: float = 1.0):
+    from kisbot.infra.ws_client import WSClient
+    from kisbot.db import crud
+
+    unsupported = [key for key in INLINE_ONLY if cfg.get(key)]
+    if unsupported:
+        # Refuse rather than run without crash recovery / PnL / fill tracking.
+        log("shards.unsupported", sections=unsupported)
+        raise ValueError(f"{', '.join(unsupported)} not supported with shards.workers > 1; "
+                         f"remove the section(s) or run a single process")
+    scfg = cfg.get('shards') or {}
+    eng = ShardedEngine(cfg, workers, batch_size=int(scfg.get('batch_size', 256)),
+                        transport=scfg.get('transport', 'queue'), ring_capacity=int(scfg.get('ring_capacity', 1 << 20)))
+    eng.start()
+    interval = float(scfg.get('flush_ms', 5)) / 1000.0
+    h_db = metrics.REGISTRY.histogram("db_write", table="signals")
+    equity = build_equity_service(cfg)
+    if equity is not None:
+        await equity.refresh()
+        eng.set_equity(equity.value)
+        equity.listeners.append(eng.set_equity)
+        asyncio.create_task(equity.run())
+
+    async def pump():
+        while True:
+            eng.flush()
+            orders, signals = eng.poll()
+            for sym, k, d in signals:
+                asyncio.create_task(metrics.timed(h_db, crud.insert_signal(sym, side="TICK", k=k, d=d)))
+            for sy, si, q, t, px in orders:
+                task = asyncio.create_task(ex.place(sy, si, q, t, px))
+                if equity is not None:
+                    # No fill feed here: refresh once the order has been sent.
+                    task.add_done_callback(lambda _: equity.invalidate())
+            await asyncio.sleep(interval)
+
+    if eng.ring is not None:
+        ws = WSClient(list(eng.assign), ring=eng.ring)
+    else:
+        ws = WSClient(list(eng.assign), eng.submit)
+
+    def reload(new_cfg: dict, diff) -> None:
+        eng.cfg = new_cfg
+        for sym in diff.removed:
+            eng.remove_symbol(sym)
+        for sym in diff.added:
+            eng.add_symbol(sym, symbol_config(new_cfg, sym))
+        for sym in diff.changed:
+            eng.update_symbol(sym, symbol_config(new_cfg, sym))
+        ws.symbols[:] = list(eng.assign)
+
+    log("bot.start", symbols=list(eng.assign), mode=cfg['mode'], shards=workers)
+    pump_task = asyncio.create_task(pump())
+    watch_task = None
+    if watch:
+        from kisbot.services.reload import ConfigWatcher
+        watch_task = asyncio.create_task(ConfigWatcher(watch, cfg, reload, watch_interval).run())
+    try:
+        await ws.run()
+    finally:
+        if watch_task is not None:
+            watch_task.cancel()
+        pump_task.cancel()
+        eng.stop()
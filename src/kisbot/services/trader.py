@@ -6,7 +6,10 @@ from kisbot.core.slices import SliceBook
 from kisbot.core.signals import KDTrader
 from kisbot.infra.logger import log
 from kisbot.services.executor import Executor
-from kisbot.db import crud
+from kisbot.db import base as db_base, crud
+from kisbot.infra import metrics
+from kisbot.services.pnl import PnLMaterializer
+from kisbot.services.orders import OrderManager, reconcile_cancel, reconcile_fill
 
 def _merge_dicts(base: dict, overlay: dict) -> dict:
     out = dict(base)
@@ -18,41 +21,249 @@ def _merge_dicts(base: dict, overlay: dict) -> dict:
     return out
 
 
-async def run_bot(cfg):
-    symbols = cfg.get('universe') or []
-    ex = Executor(cfg)
+def symbol_config(cfg: dict, sym: str) -> dict:
+    return _merge_dicts(cfg, (cfg.get('symbols') or {}).get(sym, {}))
 
-    def cfg_for(sym: str) -> dict:
-        return _merge_dicts(cfg, (cfg.get('symbols') or {}).get(sym, {}))
+
+def build_symbol(sym: str, scfg: dict):
+    """Return the (StochRSI, SliceBook, KDTrader) set owned by one symbol."""
+    strat = scfg['strategy']
+    stoch = StochRSI(strat['rsi_period'], strat['stoch_period'], strat['k_period'], strat['d_period'])
+    book = SliceBook(scfg['risk']['equity'], scfg['slices']['total'])
+    return stoch, book, KDTrader(sym, book, scfg)
+
+
+INDICATOR_KEYS = ('rsi_period', 'stoch_period', 'k_period', 'd_period')
+
+
+def retune_symbol(stoch: StochRSI, trader: KDTrader, scfg: dict) -> StochRSI:
+    """Switch a live symbol to merged config `scfg`, keeping its position and batch state.
+
+    The StochRSI is rebuilt (and re-warms) only if one of its periods changed;
+    returns the indicator to use from now on.
+    """
+    old = trader.cfg
+    strat = scfg['strategy']
+    if any(old['strategy'].get(k) != strat.get(k) for k in INDICATOR_KEYS):
+        stoch = StochRSI(strat['rsi_period'], strat['stoch_period'], strat['k_period'], strat['d_period'])
+        # K/D and RSI from the old indicator must not pair with the new one's first values.
+        trader.prev_k = trader.prev_d = trader.last_rsi = None
+    book = trader.book
+    if old['risk'].get('equity') != scfg['risk'].get('equity'):
+        book.equity = scfg['risk']['equity']
+    book.slices_total = scfg['slices']['total']
+    trader.apply_config(scfg)
+    return stoch
+
+
+def process_tick(stoch: StochRSI, trader: KDTrader, price: float, now: float, place_order, on_signal=None,
+                 equity_fetch=None):
+    """Advance one symbol by one tick: indicator update, RSI path, then K/D path."""
+    k, d = stoch.update(price)
+    decide(stoch, trader, k, d, price, now, place_order, on_signal, equity_fetch)
+
+
+def decide(stoch: StochRSI, trader: KDTrader, k, d, price: float, now: float, place_order, on_signal=None,
+           equity_fetch=None):
+    if trader.trend is not None:
+        trader.on_price(price)
+    # Attempt RSI-based buy path when RSI is available
+    rsi_val = stoch.rsi.last
+    if rsi_val is not None:
+        trader.on_rsi(rsi_val, price, now, place_order=place_order, equity_fetch=equity_fetch)
+    if k is None or d is None:
+        return
+    if on_signal is not None:
+        on_signal(trader.symbol, k, d)
+    trader.on_kd(k, d, price, now, place_order=place_order, equity_fetch=equity_fetch)
+
+
+def build_equity_service(cfg: dict):
+    """The shared `equity_fetch` for all traders, or None when `equity` is not configured.
+
+    Only paper mode has a balance source (`AccountClient.equity`); elsewhere the
+    service would report fresh fetches of the static `risk.equity`, so it is refused.
+    """
+    ecfg = cfg.get('equity')
+    if not ecfg:
+        return None
+    if cfg['mode'] != 'paper':
+        raise ValueError(f"equity: the KIS balance inquiry is not implemented; remove the equity section for mode={cfg['mode']!r}")
+    from kisbot.infra.rest_client import AccountClient
+    from kisbot.services.equity import EquityService
+    initial = float(cfg['risk']['equity'])
+    account = AccountClient(cfg['mode'], paper_equity=initial)
+    return EquityService(account.equity, initial, ttl=float(ecfg.get('ttl_sec', 30)))
+
+
+async def run_bot(cfg, watch: str | None = None, watch_interval: float = 1.0):
+    """Trade `cfg['universe']` until cancelled; with `watch`, hot-reload that config file."""
+    symbols = list(cfg.get('universe') or [])
+
+    maintenance = None
+    if db_base._engine is not None:
+        # Migrations only create the first few daily partitions (no DEFAULT one),
+        # so this runs with default settings even without a signals_store section.
+        # Today's partition must exist before the feed's first insert_signal.
+        from kisbot.db import partitions
+        scfg = cfg.get('signals_store') or {}
+        await partitions.prepare(scfg)
+        maintenance = asyncio.create_task(partitions.run_maintenance(scfg))
+
+    mcfg = cfg.get('metrics') or {}
+    if mcfg.get('port'):
+        await metrics.start_metrics_server(mcfg.get('host', '127.0.0.1'), int(mcfg['port']))
+        log("metrics.start", host=mcfg.get('host', '127.0.0.1'), port=int(mcfg['port']))
+
+    workers = int((cfg.get('shards') or {}).get('workers', 0) or 0)
+    if workers > 1:
+        from kisbot.services.shards import run_sharded
+        try:
+            return await run_sharded(cfg, Executor(cfg), workers, watch=watch, watch_interval=watch_interval)
+        finally:
+            if maintenance is not None:
+                maintenance.cancel()
 
     stoch = {}
     books = {}
     traders = {}
     for s in symbols:
-        scfg = cfg_for(s)
-        strat = scfg['strategy']
-        stoch[s] = StochRSI(strat['rsi_period'], strat['stoch_period'], strat['k_period'], strat['d_period'])
-        books[s] = SliceBook(scfg['risk']['equity'], scfg['slices']['total'])
-        traders[s] = KDTrader(s, books[s], scfg)
+        stoch[s], books[s], traders[s] = build_symbol(s, symbol_config(cfg, s))
+
+    pnl = PnLMaterializer(writer=crud.write_pnl)
+    if db_base.Session is not None:
+        for row in await crud.load_positions():
+            pnl.seed(row.symbol, row.qty, row.avg_px, row.r_pnl)
+
+    def on_order_fill(order, qty, px, ts):
+        pnl.on_fill(order.symbol, order.side, qty, px, ts)
+        if equity is not None:
+            equity.invalidate()
+        if order.symbol in traders:
+            reconcile_fill(traders[order.symbol], order, qty, px)
+
+    def on_order_cancel(order, remaining, ts):
+        if order.symbol in traders:
+            reconcile_cancel(traders[order.symbol], order, remaining)
+
+    equity = build_equity_service(cfg)
+
+    orders = OrderManager(writer=crud.write_orders, mode=cfg['mode'], on_fill=on_order_fill, on_cancel=on_order_cancel)
+    ex = Executor(cfg, orders=orders)
+
+    jcfg = cfg.get('journal') or {}
+    jr = None
+    jstate = {}
+    if jcfg.get('dir'):
+        from kisbot.infra.journal import TraderJournal, restore_trader, state_events, trader_state
+        jr = TraderJournal(
+            jcfg['dir'],
+            fsync_every=int(jcfg.get('fsync_every', 64)),
+            fsync_ms=float(jcfg.get('fsync_ms', 50)),
+            snapshot_every=int(jcfg.get('snapshot_every', 10000)),
+        )
+        t_rec = time.perf_counter()
+        for sym, st in jr.recover().items():
+            if sym in traders:
+                restore_trader(traders[sym], st)
+                pnl.seed(sym, traders[sym].position_qty, traders[sym].avg_px)
+        jstate = {s: trader_state(traders[s]) for s in symbols}
+        log("journal.recover", dir=jcfg['dir'], seq=jr.seq, ms=round((time.perf_counter() - t_rec) * 1000, 3))
+
+    reg = metrics.REGISTRY
+    h_ingest = reg.histogram("ingest")
+    h_indicator = reg.histogram("indicator_update")
+    h_signal = reg.histogram("signal_decision")
+    h_db = reg.histogram("db_write", table="signals")
+    ticks = {s: reg.counter("ticks", symbol=s) for s in symbols}
+    sigs = {s: reg.counter("signals", symbol=s) for s in symbols}
+    tick_ns = 0
+    tick_px = 0.0
+    tick_now = 0.0
+    perf_ns = time.perf_counter_ns
+
+    def place(sy, si, q, t, px=None):
+        # KDTrader books the order at the tick price; fills reconcile it (on_order_fill).
+        tr = traders[sy]
+        clordid = orders.submit(sy, si, q, t, px, ts=tick_now, ref_px=tick_px, ref_avg=tr.avg_px,
+                                ref_slices=tr.book.slices_in_use)
+        asyncio.create_task(ex.place(sy, si, q, t, px, tick_ns=tick_ns, clordid=clordid))
+
+    def on_signal(sym, k, d):
+        sigs[sym].inc()
+        asyncio.create_task(metrics.timed(h_db, crud.insert_signal(sym, side="TICK", k=k, d=d)))
 
     def on_tick(sym: str, price: float, now: float):
+        nonlocal tick_ns, tick_px, tick_now
+        tick_ns = t0 = perf_ns()
+        tick_px, tick_now = price, now
+        h_ingest.record(max(0, int((time.time() - now) * 1e9)))
+        ticks[sym].inc()
         k, d = stoch[sym].update(price)
-        # Attempt RSI-based buy path when RSI is available
-        rsi_val = stoch[sym].rsi.last
-        if rsi_val is not None:
-            traders[sym].on_rsi(
-                rsi_val,
-                price,
-                now,
-                place_order=lambda sy, si, q, t, px=None: asyncio.create_task(
-                    ex.place(sy, si, q, t, px)
-                ),
-            )
-        if k is None or d is None:
-            return
-        asyncio.create_task(crud.insert_signal(sym, side="TICK", k=k, d=d))
-        traders[sym].on_kd(k, d, price, now, place_order=lambda sy, si, q, t: asyncio.create_task(ex.place(sy, si, q, t)))
+        t1 = perf_ns()
+        h_indicator.record(t1 - t0)
+        decide(stoch[sym], traders[sym], k, d, price, now, place, on_signal, equity)
+        h_signal.record(perf_ns() - t1)
+        if jr is not None:
+            st = trader_state(traders[sym])
+            if st != jstate[sym]:
+                jr.record(sym, state_events(jstate[sym], st), st)
+                jstate[sym] = st
+        pnl.on_mark(sym, price, now)
+
+
+    async def journal_sync():
+        while True:
+            await asyncio.sleep(jr.fsync_s)
+            jr.sync()
+
+    if db_base.Session is not None:
+        asyncio.create_task(pnl.run(float((cfg.get('pnl') or {}).get('flush_sec', 5))))
+    # Also runs without a DB: flushing is what releases filled/cancelled orders' rows.
+    asyncio.create_task(orders.run(float((cfg.get('orders') or {}).get('flush_sec', 1))))
+
+    def add_symbol(s: str, new_cfg: dict) -> None:
+        stoch[s], books[s], traders[s] = build_symbol(s, symbol_config(new_cfg, s))
+        ticks[s] = reg.counter("ticks", symbol=s)
+        sigs[s] = reg.counter("signals", symbol=s)
+        if jr is not None:
+            if s in jr.states:
+                restore_trader(traders[s], jr.states[s])
+                pnl.seed(s, traders[s].position_qty, traders[s].avg_px)
+            jstate[s] = trader_state(traders[s])
+
+    def reload(new_cfg: dict, diff) -> None:
+        # Runs between ticks on the event loop, so no tick sees a half-applied config.
+        for s in diff.removed:
+            tr = traders.pop(s)
+            del stoch[s], books[s]
+            jstate.pop(s, None)
+            if tr.position_qty:
+                log("config.remove_open_position", symbol=s, qty=tr.position_qty, avg_px=tr.avg_px)
+        for s in diff.added:
+            add_symbol(s, new_cfg)
+        for s in diff.changed:
+            stoch[s] = retune_symbol(stoch[s], traders[s], symbol_config(new_cfg, s))
+        symbols[:] = list(dict.fromkeys(new_cfg.get('universe') or []))
+
+    if equity is not None:
+        await equity.refresh()
+        asyncio.create_task(equity.run())
 
     ws = WSClient(symbols, on_tick)
     log("bot.start", symbols=symbols, mode=cfg['mode'])
-    await ws.run()
+    sync_task = asyncio.create_task(journal_sync()) if jr is not None else None
+    watch_task = None
+    if watch:
+        from kisbot.services.reload import ConfigWatcher
+        watch_task = asyncio.create_task(ConfigWatcher(watch, cfg, reload, watch_interval).run())
+    try:
+        await ws.run()
+    finally:
+        if maintenance is not None:
+            maintenance.cancel()
+        if watch_task is not None:
+            watch_task.cancel()
+        if sync_task is not None:
+            sync_task.cancel()
+            jr.close()
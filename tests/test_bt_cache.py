@@ -0,0 +1,142 @@
+from __future__ import annotations
+import asyncio
+import os
+import time
+from pathlib import Path
+
+from kisbot.infra.backtest import backtest
+from kisbot.infra.bt_cache import BacktestCache
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+def _cfg(data_dir):
+    return {
+        "bars": {"type": "csv", "data_dir": str(data_dir), "column": "close"},
+        "strategy": {"rsi_period": 14, "stoch_period": 14, "k_period": 3, "d_period": 3,
+                     "overbought": 80, "oversold": 20, "rsi_buy_threshold": 50, "rsi_buy_multiplier": 1.1},
+        "slices": {"total": 60, "per_entry_lt20": 2, "per_entry_20_80": 2},
+        "risk": {"equity": 80000},
+    }
+
+
+def _run(cfg, cache):
+    return asyncio.run(backtest(cfg, "2024-01-01", "2025-01-31", ["TQQQ"], quiet=True, cache=cache))
+
+
+def test_identical_request_hits_and_matches(tmp_path):
+    (tmp_path / "TQQQ.csv").write_text((DATA / "TQQQ.csv").read_text())
+    cache = BacktestCache(str(tmp_path / "c.sqlite"))
+    cfg = _cfg(tmp_path)
+    first = _run(cfg, cache)
+    second = _run(cfg, cache)
+    assert first["cache"] == {"hits": 0, "misses": 1}
+    assert second["cache"] == {"hits": 1, "misses": 0}
+    assert second["metrics"] == first["metrics"] == _run(cfg, None)["metrics"]
+
+
+def test_config_or_data_change_misses(tmp_path):
+    src = (DATA / "TQQQ.csv").read_text()
+    (tmp_path / "TQQQ.csv").write_text(src)
+    cache = BacktestCache(str(tmp_path / "c.sqlite"))
+    cfg = _cfg(tmp_path)
+    _run(cfg, cache)
+
+    cfg2 = _cfg(tmp_path)
+    cfg2["strategy"]["take_profit_pct"] = 0.2
+    assert _run(cfg2, cache)["cache"]["hits"] == 0
+
+    # Irrelevant sections do not affect the key.
+    cfg3 = dict(_cfg(tmp_path), slack={"webhook_url": "x"})
+    assert _run(cfg3, cache)["cache"]["hits"] == 1
+
+    lines = src.splitlines()
+    (tmp_path / "TQQQ.csv").write_text("\n".join(lines[:-5]) + "\n")
+    os.utime(tmp_path / "TQQQ.csv", ns=(time.time_ns(), time.time_ns() + 1))
+    assert _run(cfg, cache)["cache"]["hits"] == 0
+
+
+def test_eviction_by_size_and_age(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    cache = BacktestCache(path)
+    from datetime import datetime, timedelta
+    old = datetime.utcnow() - timedelta(days=10)
+    for i in range(5):
+        cache.put(f"k{i}", f"r{i}", {"i": i}, {"symbol": "X", "i": i}, old if i == 0 else datetime.utcnow(), old if i == 0 else datetime.utcnow())
+        time.sleep(0.001)
+    cache.close()
+
+    aged = BacktestCache(path, max_age_days=1)
+    assert aged.get("k0") is None and aged.get("k1") is not None
+    aged.close()
+
+    size = BacktestCache(path, max_bytes=1)
+    assert all(size.get(f"k{i}") is None for i in range(5))
+
+
+def test_resume_simulates_only_appended_bars(tmp_path, monkeypatch):
+    from kisbot.infra import backtest as bt
+    lines = (DATA / "TQQQ.csv").read_text().splitlines(keepends=True)
+    (tmp_path / "TQQQ.csv").write_text("".join(lines[:300]))
+    cache = BacktestCache(str(tmp_path / "c.sqlite"))
+    cfg = _cfg(tmp_path)
+    steps = []
+    step = bt._Leg.step
+    monkeypatch.setattr(bt._Leg, "step", lambda self, ts, px: steps.append(ts) or step(self, ts, px))
+
+    def run():
+        steps.clear()
+        return asyncio.run(backtest(cfg, "2024-01-01", "2025-12-31", ["TQQQ"], quiet=True, cache=cache, resume=True))
+
+    first = run()
+    assert first["cache"] == {"hits": 0, "misses": 1, "resumed": 0} and len(steps) == 299
+    with open(tmp_path / "TQQQ.csv", "a") as f:
+        f.write("".join(lines[300:]))
+    second = run()
+    assert second["cache"]["resumed"] == 1 and len(steps) == len(lines) - 300
+    full = asyncio.run(backtest(cfg, "2024-01-01", "2025-12-31", ["TQQQ"], quiet=True))
+    assert second["metrics"] == full["metrics"]
+
+    # Rewriting already-simulated bars invalidates the checkpoint.
+    lines[1] = lines[1].split(",")[0] + ",1.0\n"
+    (tmp_path / "TQQQ.csv").write_text("".join(lines))
+    third = run()
+    assert third["cache"]["resumed"] == 0 and len(steps) == len(lines) - 1
+    assert third["metrics"] == asyncio.run(backtest(cfg, "2024-01-01", "2025-12-31", ["TQQQ"], quiet=True))["metrics"]
+
+
+def test_code_version_covers_backtest_modules(tmp_path):
+    # Every kisbot module a CSV backtest (both engines, resume) loads must be hashed.
+    import json, subprocess, sys
+    from kisbot.infra.bt_cache import CODE_SOURCES
+    script = f"""
+import asyncio, json, sys
+from kisbot.infra.backtest import backtest
+from kisbot.infra.bt_cache import BacktestCache
+cfg = {_cfg(DATA)!r}
+cache = BacktestCache({str(tmp_path / "c.sqlite")!r})
+asyncio.run(backtest(cfg, "2024-01-01", "2024-06-30", ["TQQQ"], quiet=True, cache=cache, resume=True))
+asyncio.run(backtest(cfg, "2024-01-01", "2024-06-30", ["TQQQ"], quiet=True, engine="kernel"))
+print(json.dumps(sorted(m for m in sys.modules if m.startswith("kisbot."))))
+"""
+    src = str(Path(__file__).resolve().parents[1] / "src")
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                         env={**os.environ, "PYTHONPATH": src})
+    modules = [m for m in json.loads(out.stdout.splitlines()[-1]) if m.count(".") == 2]  # skip packages
+    loaded = {m.split(".", 1)[1].replace(".", "/") + ".py" for m in modules}
+    assert loaded - {"infra/bt_cache.py"} <= set(CODE_SOURCES)
+
+
+def test_size_budget_counts_checkpoints_and_applies_on_write(tmp_path):
+    cache = BacktestCache(str(tmp_path / "c.sqlite"), max_bytes=10_000)
+    from datetime import datetime
+    now = datetime.utcnow()
+    cache.put("k0", "r0", {}, {"symbol": "X"}, now, now)
+    for i in range(5):
+        cache.put_checkpoint(f"c{i}", 100, "h", 1.0, b"x" * 4000)
+        time.sleep(0.001)
+    # Two 4 kB checkpoints fit the 10 kB budget; older entries (the result first) were evicted.
+    assert cache.get("k0") is None
+    assert [cache.get_checkpoint(f"c{i}") is not None for i in range(5)] == [False, False, False, True, True]
+    size = cache.db.execute("SELECT SUM(LENGTH(state)) FROM bt_checkpoints").fetchone()[0]
+    assert size <= 10_000
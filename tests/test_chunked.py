@@ -0,0 +1,84 @@
+from __future__ import annotations
+import os
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from kisbot.infra import chunked
+from kisbot.infra.backtest import _load_prices_csv, _price_stream
+from kisbot.infra.chunked import chunk_index, index_path, iter_batches, iter_rows
+
+
+def _ticks(path, n, start=datetime(2024, 1, 2, 9, 30), step=1, mode="w"):
+    with open(path, mode) as f:
+        if mode == "w":
+            f.write("timestamp,close\n")
+        for i in range(n):
+            ts = start + timedelta(seconds=step * i)
+            f.write(f"{ts.isoformat()},{100 + (i % 97) * 0.25}\n")
+
+
+def test_batches_match_full_load_and_skip_blocks(tmp_path):
+    path = str(tmp_path / "X.csv")
+    _ticks(path, 20000)
+    idx = chunk_index(path, chunk_bytes=16384)
+    assert idx["sorted"] and len(idx["blocks"]) > 20
+    assert os.path.exists(index_path(path))
+    frm, to = "2024-01-02T11:00:00", "2024-01-02T12:00:00"
+    rows = list(iter_rows(path, frm, to, chunk_bytes=16384))
+    assert rows == _load_prices_csv(str(tmp_path), "X", frm, to)
+    assert len(rows) == 3601
+    batches = list(iter_batches(path, frm, to, chunk_bytes=16384))
+    assert len(batches) < len(idx["blocks"]) // 2
+    assert all(ts.dtype.kind == "f" and len(ts) == len(px) for ts, px in batches)
+
+
+def test_quoted_fields_with_commas_do_not_shift_the_timestamp(tmp_path):
+    path = str(tmp_path / "X.csv")
+    with open(path, "w") as f:
+        f.write("note,timestamp,close\n")
+        for i in range(50):
+            note = '"split, 2030-01-01"' if i % 10 == 0 else "-"
+            f.write(f"{note},2024-01-02T09:{i:02d}:00,{100 + i}\n")
+    idx = chunk_index(path, chunk_bytes=256)
+    assert idx["sorted"]
+    assert max(b[chunked.TS_MAX] for b in idx["blocks"]) == datetime(2024, 1, 2, 9, 49, tzinfo=timezone.utc).timestamp()
+    frm, to = "2024-01-02", "2024-01-03"
+    assert list(iter_rows(path, frm, to, chunk_bytes=256)) == _load_prices_csv(str(tmp_path), "X", frm, to)
+
+
+def test_append_rescans_only_the_tail(tmp_path, monkeypatch):
+    path = str(tmp_path / "X.csv")
+    _ticks(path, 5000)
+    before = chunk_index(path, chunk_bytes=8192)
+    _ticks(path, 1000, start=datetime(2024, 1, 3, 9, 30), mode="a")
+    offsets = []
+    scan = chunked._scan
+    monkeypatch.setattr(chunked, "_scan", lambda f, offset, *a: offsets.append(offset) or scan(f, offset, *a))
+    after = chunk_index(path, chunk_bytes=8192)
+    assert offsets == [before["blocks"][-1][0]]
+    assert after["blocks"][:len(before["blocks"]) - 1] == before["blocks"][:-1]
+    assert after["sorted"] and after["size"] == os.path.getsize(path)
+    assert sum(b[4] for b in after["blocks"]) == 6000
+    os.unlink(index_path(path))
+    assert chunk_index(path, chunk_bytes=8192)["blocks"] == after["blocks"]
+
+
+def test_unsorted_file_falls_back_to_sorting(tmp_path):
+    (tmp_path / "X.csv").write_text("datetime,close\n2024-01-03,3\n2024-01-02,2\n2024-01-04,\n")
+    cfg = {"bars": {"type": "csv", "data_dir": str(tmp_path)}}
+    assert not chunk_index(str(tmp_path / "X.csv"))["sorted"]
+    assert [p for _, p in _price_stream(cfg, "X", "2024-01-01", "2024-12-31")] == [2.0, 3.0]
+
+
+def test_memory_does_not_grow_with_file(tmp_path):
+    peaks = []
+    for n in (20000, 80000):
+        path = str(tmp_path / f"X{n}.csv")
+        _ticks(path, n)
+        chunk_index(path, chunk_bytes=32768)
+        tracemalloc.start()
+        count = sum(1 for _ in iter_rows(path, "2024-01-01", "2024-12-31", chunk_bytes=32768))
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert count == n
+    assert peaks[1] < peaks[0] * 1.5
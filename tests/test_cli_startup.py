@@ -0,0 +1,52 @@
+from __future__ import annotations
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Generous wall-clock budgets (ms of import time); scale on slow CI with KISBOT_IMPORT_BUDGET_SCALE.
+SCALE = float(os.environ.get("KISBOT_IMPORT_BUDGET_SCALE", "1.0"))
+HEAVY = ("sqlalchemy", "asyncpg", "pandas", "httpx", "websockets", "kisbot.db", "kisbot.services")
+
+
+def _importtime(*args: str) -> tuple[set[str], float]:
+    env = dict(os.environ, PYTHONPATH=str(ROOT / "src"))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    modules, total_us = set(), 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        name = name[1:]
+        modules.add(name.strip())
+        if not name.startswith(" "):  # top-level import: cumulative covers its children
+            total_us += int(cumulative_us)
+    return modules, total_us / 1000.0
+
+
+def _heavy(modules: set[str]) -> set[str]:
+    return {m for m in modules if any(m == h or m.startswith(h + ".") for h in HEAVY)}
+
+
+def test_help_does_not_load_runtime_stack():
+    modules, ms = _importtime("-m", "kisbot.main", "--help")
+    assert not _heavy(modules)
+    assert "pydantic" not in modules
+    assert ms < 400 * SCALE, f"kisbot --help import time {ms:.0f}ms"
+
+
+def test_backtest_startup_budget(tmp_path):
+    cfg = tmp_path / "cfg.yaml"
+    cfg.write_text((ROOT / "config.yaml").read_text().replace("data_dir: data", f"data_dir: {ROOT / 'data'}"))
+    modules, ms = _importtime(
+        "-m", "kisbot.main", "backtest", "--config", str(cfg),
+        "--from", "2024-01-01", "--to", "2024-03-01", "--symbols", "TQQQ",
+    )
+    assert not _heavy(modules)
+    assert "kisbot.infra.backtest" in modules
+    assert ms < 600 * SCALE, f"kisbot backtest import time {ms:.0f}ms"
@@ -0,0 +1,118 @@
+from __future__ import annotations
+import asyncio
+
+import pytest
+
+from kisbot.infra.metrics import Metrics
+from kisbot.services.equity import EquityService
+from kisbot.infra.rest_client import AccountClient
+from kisbot.services.trader import build_equity_service, build_symbol, process_tick, symbol_config
+
+
+class FakeAccount:
+    """Stand-in for the broker balance API: counts calls, optionally slow or failing."""
+
+    def __init__(self, equity: float, delay: float = 0.0):
+        self.balance = equity
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    async def equity(self) -> float:
+        self.calls += 1
+        seen = self.balance  # balance as of the start of the request
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("balance API unavailable")
+        return seen
+
+
+def test_concurrent_refreshes_share_one_fetch_and_reads_are_cached():
+    async def main():
+        acct = FakeAccount(120_000.0, delay=0.01)
+        svc = EquityService(acct.equity, 100_000.0, registry=Metrics())
+        assert svc() == 100_000.0 and acct.calls == 0
+        values = await asyncio.gather(*(svc.refresh() for _ in range(50)))
+        assert values == [120_000.0] * 50 and acct.calls == 1
+        acct.balance = 90_000.0
+        assert [svc() for _ in range(1000)] == [120_000.0] * 1000 and acct.calls == 1
+        await svc.refresh()
+        assert svc() == 90_000.0 and acct.calls == 2
+
+    asyncio.run(main())
+
+
+def test_fills_during_a_fetch_trigger_exactly_one_more():
+    async def main():
+        acct = FakeAccount(100_000.0, delay=0.02)
+        svc = EquityService(acct.equity, 100_000.0, registry=Metrics())
+        seen = []
+        svc.listeners.append(seen.append)
+        svc.invalidate()
+        await asyncio.sleep(0.005)  # first fetch has read the old balance
+        acct.balance = 95_000.0
+        for _ in range(10):  # a burst of fills
+            svc.invalidate()
+        await svc.refresh()
+        assert acct.calls == 2 and svc() == 95_000.0 and seen == [95_000.0]
+
+    asyncio.run(main())
+
+
+def test_failed_fetch_keeps_value_and_is_visible_in_metrics():
+    async def main():
+        reg = Metrics()
+        acct = FakeAccount(110_000.0)
+        svc = EquityService(acct.equity, 100_000.0, registry=reg)
+        await svc.refresh()
+        acct.fail = True
+        acct.balance = 1.0
+        await svc.refresh()
+        assert svc() == 110_000.0 and svc.age >= 0.0
+        return reg.render()
+
+    text = asyncio.run(main())
+    assert 'kisbot_equity_fetches_total{result="ok"} 1' in text
+    assert 'kisbot_equity_fetches_total{result="error"} 1' in text
+    assert "kisbot_account_equity{} 110000.0" in text
+    assert "# TYPE kisbot_equity_age_seconds gauge" in text
+    assert 'kisbot_stage_latency_seconds_count{stage="equity_fetch"} 2' in text
+
+
+def test_ttl_loop_refreshes_in_the_background():
+    async def main():
+        acct = FakeAccount(100_000.0)
+        svc = EquityService(acct.equity, 100_000.0, ttl=0.1, registry=Metrics())
+        task = asyncio.create_task(svc.run())
+        await asyncio.sleep(0.25)
+        task.cancel()
+        return acct.calls
+
+    assert asyncio.run(main()) == 3  # t=0, 0.1, 0.2
+
+
+def test_traders_read_the_shared_value():
+    cfg = {
+        "universe": ["TQQQ", "SOXL"],
+        "strategy": {"rsi_period": 2, "stoch_period": 2, "k_period": 1, "d_period": 1, "overbought": 80,
+                     "oversold": 20, "rsi_buy_threshold": 50, "rsi_buy_multiplier": 1.1},
+        "slices": {"total": 60, "per_entry_lt20": 2, "per_entry_20_80": 1},
+        "risk": {"equity": 6000},
+    }
+    svc = EquityService(FakeAccount(0.0).equity, 12_000.0, registry=Metrics())
+    books = []
+    for sym in cfg["universe"]:
+        stoch, book, trader = build_symbol(sym, symbol_config(cfg, sym))
+        for i, px in enumerate([100.0, 99.0, 98.0, 99.5]):
+            process_tick(stoch, trader, px, float(i), lambda *a: None, equity_fetch=svc)
+        books.append(book)
+    assert [b.equity for b in books] == [12_000.0, 12_000.0]
+
+
+def test_live_mode_refuses_the_unimplemented_balance_inquiry():
+    cfg = {"mode": "live", "risk": {"equity": 6000}, "equity": {"ttl_sec": 30}}
+    with pytest.raises(ValueError, match="balance inquiry"):
+        build_equity_service(cfg)
+    with pytest.raises(NotImplementedError):
+        asyncio.run(AccountClient("live", paper_equity=6000.0).equity())
+    assert asyncio.run(AccountClient("paper", paper_equity=6000.0).equity()) == 6000.0
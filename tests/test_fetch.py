@@ -0,0 +1,139 @@
+from __future__ import annotations
+import csv
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from kisbot.infra.fetch import bar_time, fetch_all, fetch_symbol
+
+
+class FakeProvider:
+    """Daily bars with close = day-of-year (+ `bump` for revised bars); records calls."""
+
+    def __init__(self, delay: float = 0.0, bump: float = 0.0, fail: set | None = None):
+        self.calls = []
+        self.delay = delay
+        self.bump = bump
+        self.fail = fail or set()
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def history(self, symbol, start, end, interval):
+        with self._lock:
+            self.calls.append((symbol, start, end))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if symbol in self.fail:
+                raise RuntimeError("boom")
+            rows = []
+            d = start
+            while d < end:
+                rows.append({"Date": f"{d.isoformat()} 00:00:00", "Close": str(d.timetuple().tm_yday + self.bump)})
+                d += timedelta(days=1)
+            return rows
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _read(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_initial_fetch_then_tail_only(tmp_path):
+    p = FakeProvider()
+    r = fetch_symbol(p, "AAA", date(2024, 1, 1), date(2024, 1, 11), "1d", str(tmp_path))
+    assert r["changed"] == 10
+    rows = _read(tmp_path / "AAA.csv")
+    assert rows[0] == ["Date", "Close"] and len(rows) == 11
+
+    p.calls.clear()
+    r = fetch_symbol(p, "AAA", date(2024, 1, 1), date(2024, 1, 15), "1d", str(tmp_path))
+    # Only the last stored day onward is requested again.
+    assert p.calls == [("AAA", date(2024, 1, 10), date(2024, 1, 15))]
+    rows = _read(tmp_path / "AAA.csv")
+    assert len(rows) == 15
+    assert [r[0][:10] for r in rows[1:]] == [(date(2024, 1, 1) + timedelta(days=i)).isoformat() for i in range(14)]
+
+
+def test_head_range_and_revised_bar_dedup(tmp_path):
+    fetch_symbol(FakeProvider(), "AAA", date(2024, 1, 5), date(2024, 1, 10), "1d", str(tmp_path))
+    p = FakeProvider(bump=0.5)
+    r = fetch_symbol(p, "AAA", date(2024, 1, 1), date(2024, 1, 10), "1d", str(tmp_path))
+    assert p.calls == [("AAA", date(2024, 1, 1), date(2024, 1, 5)), ("AAA", date(2024, 1, 9), date(2024, 1, 10))]
+    rows = _read(tmp_path / "AAA.csv")[1:]
+    assert len(rows) == 9  # no duplicate for the re-fetched 2024-01-09
+    assert r["changed"] == 5  # 4 new head bars + the revised last bar
+    assert float(rows[-1][1]) == 9.5
+    assert float(rows[4][1]) == 5  # untouched middle bar
+
+
+def test_existing_header_preserved(tmp_path):
+    (tmp_path / "AAA.csv").write_text("datetime,close\n2024-01-01 00:00:00,1\n2024-01-02 00:00:00,2\n")
+    fetch_symbol(FakeProvider(), "AAA", date(2024, 1, 1), date(2024, 1, 4), "1d", str(tmp_path))
+    rows = _read(tmp_path / "AAA.csv")
+    assert rows[0] == ["datetime", "close"]
+    assert [r[0][:10] for r in rows[1:]] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert [float(r[1]) for r in rows[1:]] == [1, 2, 3]
+
+
+class ExchangeTimeProvider(FakeProvider):
+    """Daily bars stamped at New York midnight, as Yahoo returns them."""
+
+    def history(self, symbol, start, end, interval):
+        ny = timezone(timedelta(hours=-5))
+        rows = super().history(symbol, start, end, interval)
+        for r in rows:
+            r["Date"] = bar_time(datetime.fromisoformat(r["Date"]).replace(tzinfo=ny), interval)
+        return rows
+
+
+def test_overlapping_day_from_exchange_time_provider(tmp_path):
+    (tmp_path / "AAA.csv").write_text("datetime,close\n2024-01-01,1\n2024-01-02,2\n")
+    r = fetch_symbol(ExchangeTimeProvider(bump=0.5), "AAA", date(2024, 1, 1), date(2024, 1, 4), "1d", str(tmp_path))
+    rows = _read(tmp_path / "AAA.csv")
+    assert rows[1:] == [["2024-01-01", "1"], ["2024-01-02", "2.5"], ["2024-01-03", "3.5"]]
+    assert r["changed"] == 2
+    # Running again re-fetches the last day only, without adding a duplicate of it.
+    fetch_symbol(ExchangeTimeProvider(bump=0.5), "AAA", date(2024, 1, 1), date(2024, 1, 4), "1d", str(tmp_path))
+    assert len(_read(tmp_path / "AAA.csv")) == 4
+
+
+def test_bar_time_intraday_is_utc():
+    ny = timezone(timedelta(hours=-5))
+    assert bar_time(datetime(2024, 1, 2, 9, 30, tzinfo=ny), "5m") == "2024-01-02 14:30:00"
+    assert bar_time(datetime(2024, 1, 2, tzinfo=ny), "1d") == "2024-01-02"
+
+
+def test_up_to_date_requests_nothing(tmp_path):
+    fetch_symbol(FakeProvider(), "AAA", date(2024, 1, 1), date(2024, 1, 5), "1d", str(tmp_path))
+    p = FakeProvider()
+    r = fetch_symbol(p, "AAA", date(2024, 1, 2), date(2024, 1, 4), "1d", str(tmp_path))
+    assert p.calls == [] and r["changed"] == 0
+
+
+def test_bounded_concurrency_and_failure_isolation(tmp_path):
+    syms = [f"S{i}" for i in range(8)]
+    fetch_all(FakeProvider(), ["S1"], date(2024, 1, 1), date(2024, 1, 3), out_dir=str(tmp_path))
+    before = (tmp_path / "S1.csv").read_bytes()
+    p = FakeProvider(delay=0.05, fail={"S1"})
+    results = fetch_all(p, syms, date(2024, 1, 1), date(2024, 1, 5), out_dir=str(tmp_path), max_workers=3)
+    assert 1 < p.peak <= 3
+    by = {r["symbol"]: r for r in results}
+    assert "error" in by["S1"]
+    # A failed fetch leaves the existing file untouched and no temp files behind.
+    assert (tmp_path / "S1.csv").read_bytes() == before
+    assert all(by[s]["changed"] == 4 for s in syms if s != "S1")
+    assert not [f for f in tmp_path.iterdir() if f.name.startswith(".fetch-")]
+
+
+def test_missing_datetime_column_raises(tmp_path):
+    (tmp_path / "AAA.csv").write_text("close\n1\n")
+    with pytest.raises(ValueError):
+        fetch_symbol(FakeProvider(), "AAA", date(2024, 1, 1), date(2024, 1, 3), "1d", str(tmp_path))
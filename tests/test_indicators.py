@@ -1,5 +1,10 @@
 from __future__ import annotations
-from kisbot.core.indicators import StochRSI
+import random
+
+import pytest
+
+from kisbot.core.indicators import CooldownClock, RollingEMA, RollingSMA, StochRSI, WilderATR
+from kisbot.core.kernel import atr_array, ema_array, sma_array
 
 
 def test_stochrsi_warmup_and_range():
@@ -17,3 +22,42 @@ def test_stochrsi_warmup_and_range():
     assert 0.0 <= k <= 100.0
     assert 0.0 <= d <= 100.0
 
+
+
+def _series(n=300):
+    rng = random.Random(7)
+    px, out = 40.0, []
+    for _ in range(n):
+        px *= 1.0 + rng.gauss(0.0, 0.02)
+        out.append(round(px, 2))
+    return out
+
+
+def test_batch_indicators_bit_identical():
+    prices = _series()
+    highs = [p * 1.01 for p in prices]
+    lows = [p * 0.99 for p in prices]
+    for period in (1, 5, 20):
+        sma, ema, atr = RollingSMA(period), RollingEMA(period), WilderATR(period)
+        assert sma_array(prices, period) == [sma.update(p) for p in prices]
+        assert ema_array(prices, period) == [ema.update(p) for p in prices]
+        assert atr_array(highs, lows, prices, period) == [atr.update(h, lo, c) for h, lo, c in zip(highs, lows, prices)]
+
+
+def test_ema_and_atr_values():
+    ema = RollingEMA(3)
+    assert [ema.update(x) for x in (1.0, 2.0, 3.0, 7.0)] == [None, None, 2.0, 4.5]
+    atr = WilderATR(2)
+    assert atr.update(10.0, 8.0, 9.0) is None  # TR 2.0
+    assert atr.update(9.5, 9.0, 9.2) == 1.25  # TR 0.5, seeded with the mean
+    assert atr.update(12.0, 11.0, 11.5) == pytest.approx(2.025)  # TR 12 - 9.2, Wilder smoothing
+
+
+def test_cooldown_clock():
+    c = CooldownClock(60)
+    assert c.ready(0.0)
+    c.mark(100.0)
+    assert not c.ready(159.9)
+    assert c.ready(160.0)
+    c.seconds = 0
+    assert c.ready(100.0)
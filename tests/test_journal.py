@@ -0,0 +1,82 @@
+from __future__ import annotations
+import os
+
+from kisbot.core.signals import KDTrader
+from kisbot.core.slices import SliceBook
+from kisbot.infra.journal import TraderJournal, restore_trader, state_events, trader_state
+
+
+def _state(i: int):
+    return (i, 100.0 + i / 3.0, i % 2 == 0, i % 3 == 0, 2, i % 60)
+
+
+def _write(path, n, syms=("TQQQ", "SOXL"), **kw):
+    jr = TraderJournal(str(path), **kw)
+    jr.recover()
+    for i in range(n):
+        jr.record(syms[i % len(syms)], "fill", _state(i))
+    return jr
+
+
+def test_recover_snapshot_plus_tail(tmp_path):
+    jr = _write(tmp_path, 25, snapshot_every=10)
+    jr.close()
+    assert os.path.exists(tmp_path / "snapshot.json")
+    states = TraderJournal(str(tmp_path)).recover()
+    assert states == {"TQQQ": _state(24), "SOXL": _state(23)}
+
+
+def test_torn_tail_is_dropped_and_truncated(tmp_path):
+    jr = _write(tmp_path, 6)
+    jr.close()
+    log = tmp_path / "journal.log"
+    data = log.read_bytes()
+    log.write_bytes(data[:-7])  # crash mid-write of the last record
+
+    jr2 = TraderJournal(str(tmp_path))
+    states = jr2.recover()
+    assert states == {"TQQQ": _state(4), "SOXL": _state(3)}
+    # New appends continue cleanly after the truncated tail.
+    jr2.record("SOXL", "fill", _state(99))
+    jr2.close()
+    assert TraderJournal(str(tmp_path)).recover()["SOXL"] == _state(99)
+
+
+def test_corrupt_record_ends_replay(tmp_path):
+    jr = _write(tmp_path, 6)
+    jr.close()
+    log = tmp_path / "journal.log"
+    lines = log.read_bytes().split(b"\n")
+    lines[2] = lines[2].replace(b"fill", b"fIll")  # crc mismatch
+    log.write_bytes(b"\n".join(lines))
+    states = TraderJournal(str(tmp_path)).recover()
+    assert states == {"TQQQ": _state(0), "SOXL": _state(1)}
+
+
+def test_crash_during_snapshot_keeps_previous_state(tmp_path):
+    jr = _write(tmp_path, 4, snapshot_every=1000)
+    jr.close()
+    # Crash before the rename: a partial tmp file must be ignored.
+    (tmp_path / "snapshot.json.tmp").write_text('{"seq": 99, "sta')
+    states = TraderJournal(str(tmp_path)).recover()
+    assert states == {"TQQQ": _state(2), "SOXL": _state(3)}
+
+
+def test_restore_trader_roundtrip(tmp_path):
+    cfg = {"strategy": {"oversold": 20, "overbought": 80}, "slices": {"per_entry_lt20": 4, "per_entry_20_80": 1}}
+    book = SliceBook(6000, 60)
+    trader = KDTrader("TQQQ", book, cfg)
+    before = trader_state(trader)
+    trader.on_kd(k=10.0, d=15.0, last_px=100.0, now=0.0, place_order=lambda *a: None)
+    after = trader_state(trader)
+    assert state_events(before, after) == "fill"
+
+    jr = TraderJournal(str(tmp_path))
+    jr.recover()
+    jr.record("TQQQ", state_events(before, after), after)
+    jr.close()
+
+    fresh = KDTrader("TQQQ", SliceBook(6000, 60), cfg)
+    restore_trader(fresh, TraderJournal(str(tmp_path)).recover()["TQQQ"])
+    assert trader_state(fresh) == after
+    assert fresh.book.slices_in_use == 4
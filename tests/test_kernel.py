@@ -0,0 +1,153 @@
+from __future__ import annotations
+import itertools
+import random
+from pathlib import Path
+
+import pytest
+
+from kisbot.core.kernel import indicator_arrays, simulate_arrays
+from kisbot.core.slices import SliceBook
+from kisbot.infra.backtest import _Leg, _price_stream, _simulate_symbol
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+class _LoggingLeg(_Leg):
+    def __init__(self, *a):
+        super().__init__(*a)
+        self.trades = []
+        self.i = 0
+
+    def place(self, symbol, side, qty, type_, price=None):
+        self.trades.append((self.i, side, qty, type_, price))
+        super().place(symbol, side, qty, type_, price)
+
+
+def _cfg(strategy=None, slices=None, equity=80000):
+    cfg = {
+        "strategy": {"rsi_period": 14, "stoch_period": 14, "k_period": 3, "d_period": 3,
+                     "overbought": 80, "oversold": 20, "rsi_buy_threshold": 50, "rsi_buy_multiplier": 1.1},
+        "slices": {"total": 60, "per_entry_lt20": 2, "per_entry_20_80": 2},
+        "risk": {"equity": equity},
+    }
+    cfg["strategy"].update(strategy or {})
+    cfg["slices"].update(slices or {})
+    return cfg
+
+
+DAY = 86400.0
+
+
+def _object(prices, cfg, ts=None):
+    ts = ts or [i * DAY for i in range(len(prices))]
+    leg = _LoggingLeg("X", cfg, SliceBook(cfg["risk"]["equity"], cfg["slices"]["total"]))
+    for i, (t, px) in enumerate(zip(ts, prices)):
+        leg.i = i
+        leg.step(t, px)
+    m = leg.metrics()
+    del m["symbol"]
+    return m, leg.trades
+
+
+def _kernel(prices, cfg, ts=None):
+    ts = ts or [i * DAY for i in range(len(prices))]
+    st = cfg["strategy"]
+    trades = []
+    arrays = indicator_arrays(prices, st["rsi_period"], st["stoch_period"], st["k_period"], st["d_period"])
+    return simulate_arrays(prices, *arrays, cfg, trades=trades, ts=ts), trades
+
+
+def _walk(seed, n=1500, vol=0.03):
+    rng = random.Random(seed)
+    px, out = 50.0, []
+    for _ in range(n):
+        px *= 1.0 + rng.gauss(0.0, vol)
+        out.append(round(px, 2))
+    return out
+
+
+STRATEGIES = [
+    {},
+    {"enable_kd_buys": False},
+    {"stop_loss_pct": 0.08},
+    {"take_profit_pct": 0.05, "rsi_buy_threshold": 60, "rsi_buy_multiplier": 1.05},
+    {"oversold": 25, "overbought": 85, "rsi_period": 7, "stoch_period": 10, "k_period": 2, "d_period": 4},
+    {"trend_sma_period": 20},
+    {"add_cooldown_sec": 3 * DAY},
+    {"trend_sma_period": 50, "add_cooldown_sec": 1, "stop_loss_pct": 0.08},
+]
+SLICES = [{}, {"total": 8, "per_entry_lt20": 4, "per_entry_20_80": 1}, {"per_entry_20_80": 0}]
+
+
+@pytest.mark.parametrize("strategy,slices", list(itertools.product(STRATEGIES, SLICES)))
+@pytest.mark.parametrize("seed", [1, 2])
+def test_random_walk_parity(strategy, slices, seed):
+    cfg = _cfg(strategy, slices)
+    prices = _walk(seed)
+    assert _kernel(prices, cfg) == _object(prices, cfg)
+
+
+@pytest.mark.parametrize("sym", ["TQQQ", "SOXL"])
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_historical_parity(sym, strategy):
+    cfg = _cfg(strategy)
+    cfg["bars"] = {"type": "csv", "data_dir": str(DATA), "column": "close"}
+    rows = list(_price_stream(cfg, sym, "2024-01-01", "2025-12-31"))
+    ts, prices = [t for t, _ in rows], [px for _, px in rows]
+    m, trades = _kernel(prices, cfg, ts)
+    assert (m, trades) == _object(prices, cfg, ts)
+    assert trades  # the strategy actually trades on this data
+    assert _simulate_symbol(sym, cfg, "2024-01-01", "2025-12-31", engine="kernel") == \
+        _simulate_symbol(sym, cfg, "2024-01-01", "2025-12-31")
+
+
+def test_zero_slice_value_reserves_without_buying():
+    # slice_value == 0: reserve() still counts the slices, KDTrader never buys.
+    cfg = _cfg(slices={"total": 60}, equity=30)
+    prices = _walk(3, n=400)
+    assert _kernel(prices, cfg) == _object(prices, cfg)
+    assert _kernel(prices, cfg)[1] == []
+
+
+def test_flat_prices_and_short_series():
+    cfg = _cfg()
+    for prices in ([10.0] * 200, [10.0, 9.0, 8.0], []):
+        assert _kernel(prices, cfg) == _object(prices, cfg)
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        _simulate_symbol("X", _cfg(), "2024-01-01", "2024-02-01", engine="gpu")
+
+
+@pytest.mark.parametrize("periods", [(14, 14, 3, 3), (7, 10, 2, 4), (2, 2, 1, 1)])
+def test_indicator_arrays_bit_identical(periods):
+    from kisbot.core.indicators import StochRSI
+    prices = _walk(5, n=800) + [20.0] * 40 + _walk(6, n=200)
+    s = StochRSI(*periods)
+    exp = ([], [], [])
+    for px in prices:
+        k, d = s.update(px)
+        exp[0].append(s.rsi.last)
+        exp[1].append(k)
+        exp[2].append(d)
+    assert indicator_arrays(prices, *periods) == exp
+
+
+def test_buy_gates_limit_buys():
+    prices = _walk(4)
+    _, base = _kernel(prices, _cfg())
+    _, trend = _kernel(prices, _cfg({"trend_sma_period": 30}))
+    _, cool = _kernel(prices, _cfg({"add_cooldown_sec": 5 * DAY}))
+    buys = lambda trades: [t for t in trades if t[1] == "BUY"]
+    assert 0 < len(buys(trend)) < len(buys(base))
+    assert 0 < len(buys(cool)) < len(buys(base))
+    bars = [t[0] for t in buys(cool)]
+    assert all(b - a >= 5 for a, b in zip(bars, bars[1:]))
+
+
+def test_cooldown_needs_timestamps():
+    cfg = _cfg({"add_cooldown_sec": 60})
+    prices = _walk(1, n=100)
+    with pytest.raises(ValueError):
+        simulate_arrays(prices, *indicator_arrays(prices), cfg)
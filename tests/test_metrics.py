@@ -0,0 +1,67 @@
+from __future__ import annotations
+import asyncio
+
+from kisbot.infra.metrics import Histogram, Metrics, _bucket, _bucket_high, start_metrics_server
+
+
+def test_bucket_bounds_contain_value():
+    for v in [0, 1, 15, 16, 17, 31, 32, 1000, 123_456, 10**9, 10**12]:
+        idx = _bucket(v)
+        assert v < _bucket_high(idx)
+        # relative bucket width stays under ~1/8 for values past the linear range
+        if v >= 16:
+            assert (_bucket_high(idx) - v) / v <= 0.125
+
+
+def test_histogram_quantiles_and_export():
+    h = Histogram()
+    for v in range(1, 1001):
+        h.record(v * 1000)  # 1us .. 1ms
+    assert h.total == 1000
+    assert 450_000 <= h.quantile(0.5) <= 560_000
+    assert h.quantile(1.0) == 1_000_000
+    cum = h.cumulative([int(1e-6 * 1e9), int(1e-3 * 1e9), int(1e9)])
+    assert cum[0] <= 1 and cum[-1] == 1000
+
+
+def test_prometheus_endpoint_serves_histograms_and_counters():
+    reg = Metrics()
+    reg.histogram("indicator_update").record(2_000)
+    reg.counter("ticks", symbol="TQQQ").inc(3)
+
+    async def scrape():
+        server = await start_metrics_server("127.0.0.1", 0, registry=reg)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /metrics HTTP/1.0\r\n\r\n")
+        body = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return body.decode()
+
+    text = asyncio.run(scrape())
+    assert text.startswith("HTTP/1.0 200 OK")
+    assert 'kisbot_stage_latency_seconds_count{stage="indicator_update"} 1' in text
+    assert 'kisbot_stage_latency_seconds_bucket{stage="indicator_update",le="5e-06"} 1' in text
+    assert 'kisbot_ticks_total{symbol="TQQQ"} 3' in text
+
+
+def test_take_and_merge_move_worker_deltas():
+    worker, main = Metrics(), Metrics()
+    h = worker.histogram("db_write", table="orders")
+    h.record(3_000)
+    h.record(40_000)
+    worker.counter("ticks", symbol="TQQQ").inc(2)
+    main.merge(worker.take())
+    # The worker's handles are zeroed in place and keep recording.
+    assert h.total == 0 and worker.take() == {"hists": {}, "counters": {}}
+    h.record(5_000)
+    main.merge(worker.take())
+
+    merged = main.histogram("db_write", table="orders")
+    assert merged.total == 3 and merged.max_ns == 40_000
+    assert main.counter("ticks", symbol="TQQQ").value == 2
+    text = main.render()
+    assert 'kisbot_stage_latency_seconds_count{stage="db_write",table="orders"} 3' in text
+    assert 'kisbot_stage_latency_seconds_bucket{stage="db_write",table="orders",le="5e-06"} 1' in text
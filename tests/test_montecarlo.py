@@ -0,0 +1,111 @@
+from __future__ import annotations
+import copy
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from kisbot.core.indicators import StochRSI
+from kisbot.infra.backtest import _price_stream, _simulate_symbol
+from kisbot.infra.montecarlo import block_bootstrap, jitter_params, robustness, simulate_paths, stoch_rsi_lanes
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+FROM, TO = "2024-01-01", "2025-12-31"
+
+
+def _cfg(**strategy):
+    cfg = {
+        "bars": {"type": "csv", "data_dir": str(DATA), "column": "close"},
+        "strategy": {"rsi_period": 14, "stoch_period": 14, "k_period": 3, "d_period": 3,
+                     "overbought": 80, "oversold": 20, "rsi_buy_threshold": 50, "rsi_buy_multiplier": 1.1},
+        "slices": {"total": 60, "per_entry_lt20": 2, "per_entry_20_80": 2},
+        "risk": {"equity": 80000},
+    }
+    cfg["strategy"].update(strategy)
+    return cfg
+
+
+def _prices(cfg, sym):
+    return np.array([px for _, px in _price_stream(cfg, sym, FROM, TO)])
+
+
+@pytest.mark.parametrize("sym", ["TQQQ", "SOXL"])
+def test_stoch_rsi_lanes_match_scalar(sym):
+    px = _prices(_cfg(), sym)
+    paths = np.stack([px, block_bootstrap(px, 1, len(px) - 1, seed=5)[0]])
+    rsi, k, d = stoch_rsi_lanes(paths)
+    for row in range(len(paths)):
+        s = StochRSI(14, 14, 3, 3)
+        for t, p in enumerate(paths[row]):
+            kk, dd = s.update(p)
+            for scalar, lane in ((s.rsi.last, rsi[row, t]), (kk, k[row, t]), (dd, d[row, t])):
+                if scalar is None:
+                    assert np.isnan(lane)
+                else:
+                    assert lane == scalar  # bit-identical, not approximately equal
+
+
+@pytest.mark.parametrize("sym", ["TQQQ", "SOXL"])
+@pytest.mark.parametrize("strategy", [
+    {"enable_kd_buys": False},
+    {"enable_kd_buys": True},
+    {"enable_kd_buys": True, "stop_loss_pct": 0.08},
+    {"take_profit_pct": 0.05, "rsi_buy_threshold": 60},
+    {"trend_sma_period": 20, "add_cooldown_sec": 3 * 86400},
+])
+def test_single_lane_matches_backtest(sym, strategy):
+    cfg = _cfg(**strategy)
+    exp = _simulate_symbol(sym, cfg, FROM, TO)
+    ts = [t for t, _ in _price_stream(cfg, sym, FROM, TO)]
+    got = simulate_paths(_prices(cfg, sym)[None, :], cfg, ts=ts)
+    assert round(float(got["realized"][0]), 2) == exp["realized_pnl"]
+    assert round(float(got["unrealized"][0]), 2) == exp["unrealized_pnl"]
+    assert int(got["qty"][0]) == exp["position_qty_end"]
+    assert int(got["slices"][0]) == exp["slices_in_use_end"]
+
+
+def test_lanes_are_independent():
+    cfg = _cfg(enable_kd_buys=True)
+    a, b = _prices(cfg, "TQQQ"), _prices(cfg, "SOXL")
+    both = simulate_paths(np.stack([a, b]), cfg)
+    for i, px in enumerate((a, b)):
+        one = simulate_paths(px[None, :], cfg)
+        assert both["pnl"][i] == one["pnl"][0]
+        assert both["max_drawdown"][i] == one["max_drawdown"][0]
+
+
+def test_block_bootstrap_shape_and_blocks():
+    px = np.exp(np.linspace(0.0, 1.0, 101))  # constant log return
+    paths = block_bootstrap(px, 50, 30, block=7, seed=3)
+    assert paths.shape == (50, 31)
+    assert np.allclose(paths[:, 0], px[0])
+    assert np.allclose(np.diff(np.log(paths), axis=1), 0.01)
+    assert np.array_equal(paths, block_bootstrap(px, 50, 30, block=7, seed=3))
+
+
+def test_jitter_keeps_disabled_stop_loss():
+    p = jitter_params(_cfg()["strategy"], 1000, 0.2, seed=0)
+    assert np.all(p["stop_loss_pct"] == 0.0)
+    assert p["take_profit_pct"].min() >= 0.11 * 0.8 and p["take_profit_pct"].max() <= 0.11 * 1.2
+    assert p["rsi_buy_multiplier"].min() >= 1.08 - 1e-12
+
+
+def test_robustness_summary():
+    cfg = _cfg()
+    out = robustness(cfg, "TQQQ", FROM, TO, paths=200, horizon=120, jitter=0.1, seed=7)
+    assert out["paths"] == 200 and out["horizon"] == 120
+    assert out["pnl"]["p5"] <= out["pnl"]["p50"] <= out["pnl"]["p95"]
+    assert out["max_drawdown"]["min"] >= 0
+    assert 0.0 <= out["p_loss"] <= 1.0
+    exp = _simulate_symbol("TQQQ", cfg, FROM, TO)
+    # Same trades; only the cent rounding differs (pnl rounded once, backtest rounds each part).
+    assert out["historical"]["pnl"] == pytest.approx(exp["realized_pnl"] + exp["unrealized_pnl"], abs=0.01 + 1e-9)
+    assert out == robustness(copy.deepcopy(cfg), "TQQQ", FROM, TO, paths=200, horizon=120, jitter=0.1, seed=7)
+
+
+def test_robustness_with_trend_and_cooldown():
+    cfg = _cfg(trend_sma_period=20, add_cooldown_sec=2 * 86400)
+    out = robustness(cfg, "SOXL", FROM, TO, paths=50, horizon=200, seed=3)
+    exp = _simulate_symbol("SOXL", cfg, FROM, TO)
+    assert out["historical"]["pnl"] == pytest.approx(exp["realized_pnl"] + exp["unrealized_pnl"], abs=0.01 + 1e-9)
+    assert out["pnl"]["min"] <= out["pnl"]["max"]
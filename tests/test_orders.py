@@ -0,0 +1,139 @@
+from __future__ import annotations
+import asyncio
+
+import pytest
+
+from kisbot.core.signals import KDTrader
+from kisbot.core.slices import SliceBook
+from kisbot.services.executor import Executor
+from kisbot.services.orders import OrderManager, reconcile_cancel, reconcile_fill
+from kisbot.services.pnl import PnLMaterializer
+
+CFG = {
+    "mode": "paper",
+    "strategy": {"oversold": 20, "overbought": 80},
+    "slices": {"total": 10, "per_entry_lt20": 2, "per_entry_20_80": 1},
+    "risk": {"equity": 10000},
+}
+
+
+def _wired():
+    trader = KDTrader("TQQQ", SliceBook(10000, 10), CFG)
+    pnl = PnLMaterializer()
+
+    def on_fill(o, qty, px, ts):
+        pnl.on_fill(o.symbol, o.side, qty, px, ts)
+        reconcile_fill(trader, o, qty, px)
+
+    om = OrderManager(on_fill=on_fill, on_cancel=lambda o, rem, ts: reconcile_cancel(trader, o, rem))
+    placed = []
+
+    def place(sy, si, q, t, px=None):
+        placed.append(om.submit(sy, si, q, t, px, ts=1.0, ref_px=trader.last_px, ref_avg=trader.avg_px,
+                                ref_slices=trader.book.slices_in_use))
+    return trader, pnl, om, placed, place
+
+
+def test_partial_fill_then_cancel_reconciles_trader_and_index():
+    trader, pnl, om, placed, place = _wired()
+    trader.on_kd(10.0, 15.0, 100.0, 1.0, place)  # K < oversold: buys 2 slices = 20 shares at 100
+    assert trader.position_qty == 20 and trader.book.slices_in_use == 2
+    (cid,) = placed
+    assert [o.clordid for o in om.open_orders("TQQQ")] == [cid]
+
+    om.on_fill(cid, 5, 101.0, 2.0)
+    assert om.open[cid].status == "PARTIAL"
+    assert trader.avg_px == pytest.approx(100.25)
+    om.on_cancel(cid, 3.0)
+    assert trader.position_qty == 5
+    assert trader.avg_px == pytest.approx(101.0)
+    assert trader.book.slices_in_use == 2
+    assert om.open == {} and om.by_symbol == {}
+    assert pnl.pos["TQQQ"].qty == 5 and pnl.pos["TQQQ"].avg_px == pytest.approx(101.0)
+    assert not om.on_fill(cid, 1, 101.0, 4.0) and om.unknown == 1
+
+
+def test_unfilled_buy_frees_slices_and_unfilled_sell_restores_position():
+    trader, pnl, om, placed, place = _wired()
+    trader.on_kd(10.0, 15.0, 100.0, 1.0, place)
+    om.on_cancel(placed[0], 2.0, status="REJECTED")
+    assert (trader.position_qty, trader.avg_px, trader.book.slices_in_use) == (0, 0.0, 0)
+
+    trader.on_kd(10.0, 15.0, 100.0, 3.0, place)
+    om.on_fill(placed[1], 20, 100.0, 3.0)
+    trader.on_kd(30.0, 35.0, 112.0, 4.0, place)  # take profit: sells all 20
+    assert trader.position_qty == 0 and trader.book.slices_in_use == 0
+    om.on_fill(placed[2], 8, 112.0, 5.0)
+    om.on_cancel(placed[2], 6.0)
+    assert (trader.position_qty, trader.avg_px, trader.book.slices_in_use) == (12, 100.0, 2)
+    assert pnl.pos["TQQQ"].qty == 12 and pnl.pos["TQQQ"].r_pnl == pytest.approx(96.0)
+
+
+def test_events_are_persisted_in_batches():
+    calls = []
+
+    async def writer(orders, trades):
+        calls.append((orders, trades))
+        if len(calls) == 1:
+            raise RuntimeError("db down")
+
+    om = OrderManager(writer=writer)
+    ids = [om.submit(f"S{i % 50}", "BUY", 10, ts=1.0) for i in range(20000)]
+    events = [("fill", cid, 10, 5.0, 2.0) for cid in ids[:15000]] + [("cancel", cid, 2.0) for cid in ids[15000:]]
+    assert om.apply(events) == 20000
+    assert om.open == {} and om.by_symbol == {}
+    with pytest.raises(RuntimeError):
+        asyncio.run(om.flush())
+    assert asyncio.run(om.flush()) == 35000
+    orders, trades = calls[1]
+    assert len(calls) == 2 and len(orders) == 20000 and len(trades) == 15000
+    assert {o["status"] for o in orders} == {"FILLED", "CANCELLED"}
+    assert asyncio.run(om.flush()) == 0
+
+
+def test_paper_executor_fills_through_the_manager():
+    fills = []
+    om = OrderManager(on_fill=lambda o, qty, px, ts: fills.append((o.symbol, o.side, qty, px)))
+    ex = Executor(CFG, orders=om)
+    cid = om.submit("TQQQ", "BUY", 3, "LOC", 110.0, ts=1.0, ref_px=100.0)
+    assert asyncio.run(ex.place("TQQQ", "BUY", 3, "LOC", 110.0, clordid=cid)) == cid
+    assert fills == [("TQQQ", "BUY", 3, 100.0)]
+    orders, trades = om.drain()
+    assert [o["status"] for o in orders] == ["FILLED"] and trades[0]["px"] == 100.0
+
+
+def test_large_order_flush_stays_under_the_bind_parameter_limit(monkeypatch):
+    from sqlalchemy.dialects import postgresql
+    from kisbot.db import base, crud
+
+    executed = []
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, stmt, params=None):
+            compiled = stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"render_postcompile": True})
+            assert len(compiled.params) <= 32767
+            executed.append((stmt.is_insert, len(compiled.params), params))
+            clordids = [v for k, v in compiled.params.items() if k.startswith("clordid")]
+
+            class Result:
+                def all(self):
+                    return [(cid, n) for n, cid in enumerate(clordids)]
+            return Result()
+
+        async def commit(self):
+            pass
+
+    monkeypatch.setattr(base, "Session", FakeSession)
+    om = OrderManager(writer=crud.write_orders)
+    ids = [om.submit(f"S{i % 50}", "BUY", 10, ts=1.0) for i in range(5000)]  # 9 params/row: 45k in total
+    om.apply([("fill", cid, 10, 5.0, 2.0) for cid in ids])
+    assert asyncio.run(om.flush()) == 10000
+    upserts = [e for e in executed if e[0] and e[2] is None]
+    assert len(upserts) == 5 and sum(n for _, n, _ in upserts) == 5000 * 9
+    assert len(executed[-1][2]) == 5000  # trades: one executemany insert
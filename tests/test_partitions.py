@@ -0,0 +1,97 @@
+from __future__ import annotations
+import asyncio
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from kisbot.db.partitions import partition_day, partition_name
+
+PG_DSN = os.getenv("PG_DSN")
+
+
+def test_partition_name_roundtrip():
+    day = date(2025, 1, 31)
+    assert partition_name(day) == "signals_p20250131"
+    assert partition_day("signals_p20250131") == day
+    assert partition_day("signals_1m") is None
+    assert partition_day("signals_pXXXX") is None
+
+
+@pytest.mark.skipif(not PG_DSN, reason="set PG_DSN to a migrated Postgres database")
+def test_rollup_and_retention_against_postgres():
+    from sqlalchemy import text
+    from kisbot.db import base, crud
+    from kisbot.db.partitions import drop_partitions_before, ensure_partitions, list_partitions, rollup
+
+    async def go():
+        await base.init_db(PG_DSN)
+        today = datetime.utcnow().date()
+        old = today - timedelta(days=30)
+        async with base._engine.begin() as conn:
+            await conn.execute(text("DELETE FROM signals WHERE symbol = 'TEST'"))
+            await ensure_partitions(conn, old, 0)
+            await ensure_partitions(conn, today, 1)
+        await crud.insert_signal("TEST", side="TICK", k=10.0, d=20.0)
+        await crud.insert_signal("TEST", side="TICK", k=30.0, d=25.0)
+        now = datetime.utcnow()
+        async with base._engine.begin() as conn:
+            await rollup(conn, now - timedelta(minutes=2), now + timedelta(minutes=1))
+            dropped = await drop_partitions_before(conn, today - timedelta(days=7))
+            remaining = await list_partitions(conn)
+        raw = await crud.recent_kd("TEST", now - timedelta(days=1))
+        agg = await crud.recent_kd("TEST", now - timedelta(days=1), rollup=True)
+        await base._engine.dispose()
+        return dropped, remaining, raw, agg
+
+    dropped, remaining, raw, agg = asyncio.run(go())
+    assert partition_name(datetime.utcnow().date() - timedelta(days=30)) in dropped
+    assert partition_name(datetime.utcnow().date()) in remaining
+    assert [(k, d) for _, k, d in raw] == [(10.0, 20.0), (30.0, 25.0)]
+    assert agg and agg[-1][1] == 30.0
+
+
+def test_maintenance_survives_failed_passes(monkeypatch):
+    from kisbot.db import base, partitions
+
+    class BrokenEngine:
+        def begin(self):
+            raise RuntimeError("no partition")
+
+    events = []
+    monkeypatch.setattr(base, "_engine", BrokenEngine())
+    monkeypatch.setattr(partitions, "log", lambda event, **kw: events.append(event))
+
+    async def go():
+        task = asyncio.ensure_future(partitions.run_maintenance({"interval_sec": 0}))
+        while len(events) < 3:
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(go())
+    assert events[:3] == ["signals.maintenance_error"] * 3
+
+
+def test_prepare_creates_today_and_days_ahead(monkeypatch):
+    from kisbot.db import base, partitions
+
+    sql = []
+
+    class Conn:
+        async def execute(self, stmt, *args):
+            sql.append(str(stmt))
+
+    class Engine:
+        def begin(self):
+            class Tx:
+                async def __aenter__(self):
+                    return Conn()
+
+                async def __aexit__(self, *exc):
+                    return False
+            return Tx()
+
+    monkeypatch.setattr(base, "_engine", Engine())
+    created = asyncio.run(partitions.prepare({"partition_days_ahead": 1}, now=lambda: datetime(2025, 1, 31, 23, 59)))
+    assert created == ["signals_p20250131", "signals_p20250201"]
+    assert "FOR VALUES FROM ('2025-01-31') TO ('2025-02-01')" in sql[0]
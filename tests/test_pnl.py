@@ -0,0 +1,68 @@
+from __future__ import annotations
+import asyncio
+
+import pytest
+
+from kisbot.services.pnl import PnLMaterializer
+
+DAY = 86400.0
+
+
+def test_fills_and_marks_update_pnl_incrementally():
+    m = PnLMaterializer()
+    m.on_fill("TQQQ", "BUY", 10, 100.0, DAY + 1)
+    m.on_fill("TQQQ", "BUY", 10, 110.0, DAY + 2)
+    assert m.pos["TQQQ"].avg_px == pytest.approx(105.0)
+
+    m.on_mark("TQQQ", 120.0, DAY + 3)
+    assert m.pos["TQQQ"].u_pnl == pytest.approx(300.0)
+    m.on_mark("TQQQ", 100.0, DAY + 4)  # drawdown of 400 from the 300 peak
+    m.on_fill("TQQQ", "SELL", 20, 103.0, DAY + 5)
+
+    p = m.pos["TQQQ"]
+    assert (p.qty, p.avg_px, p.u_pnl) == (0, 0.0, 0.0)
+    assert p.r_pnl == pytest.approx(-40.0)
+    assert m.total_unrealized == 0.0
+    assert m.max_dd == pytest.approx(400.0)
+
+
+def test_drain_returns_only_changed_rows():
+    m = PnLMaterializer()
+    m.on_fill("TQQQ", "BUY", 1, 100.0, DAY)
+    m.on_fill("SOXL", "BUY", 1, 20.0, DAY)
+    positions, daily = m.drain()
+    assert {r["symbol"] for r in positions} == {"TQQQ", "SOXL"}
+    assert len(daily) == 1
+
+    m.on_mark("SOXL", 21.0, DAY + 10)
+    m.on_mark("TQQQ", 100.0, DAY + 10)  # unchanged unrealized -> not dirty
+    positions, _ = m.drain()
+    assert [r["symbol"] for r in positions] == ["SOXL"]
+    assert m.drain() == ([], [])
+
+
+def test_day_rollover_emits_separate_rows_and_resets_drawdown():
+    m = PnLMaterializer()
+    m.on_fill("TQQQ", "BUY", 10, 100.0, DAY)
+    m.on_mark("TQQQ", 90.0, DAY + 100)
+    m.on_fill("TQQQ", "SELL", 10, 95.0, 2 * DAY + 1)
+    _, daily = m.drain()
+    assert [r["dt"].day for r in daily] == [2, 3]
+    assert daily[0]["max_dd"] == pytest.approx(100.0)
+    assert daily[1]["realized"] == pytest.approx(-50.0)
+
+
+def test_failed_flush_requeues_rows():
+    calls = []
+
+    async def writer(positions, daily):
+        calls.append((positions, daily))
+        if len(calls) == 1:
+            raise RuntimeError("db down")
+
+    m = PnLMaterializer(writer=writer)
+    m.on_fill("TQQQ", "BUY", 1, 100.0, DAY)
+    with pytest.raises(RuntimeError):
+        asyncio.run(m.flush())
+    assert asyncio.run(m.flush()) == 2
+    assert calls[1][0][0]["symbol"] == "TQQQ"
@@ -0,0 +1,54 @@
+from __future__ import annotations
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from kisbot.infra.backtest import _iter_prices_csv, backtest, backtest_portfolio
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+def _cfg(total):
+    return {
+        "bars": {"type": "csv", "data_dir": str(DATA), "column": "close"},
+        "strategy": {"rsi_period": 14, "stoch_period": 14, "k_period": 3, "d_period": 3,
+                     "overbought": 80, "oversold": 20, "rsi_buy_threshold": 50, "rsi_buy_multiplier": 1.1},
+        "slices": {"total": total, "per_entry_lt20": 2, "per_entry_20_80": 2},
+        "risk": {"equity": 80000},
+    }
+
+
+def _run(fn, cfg, symbols):
+    return asyncio.run(fn(cfg, "2024-01-01", "2025-12-31", symbols, quiet=True))
+
+
+def test_unconstrained_portfolio_matches_isolated():
+    # With slices that never bind, sharing capital changes nothing.
+    cfg = _cfg(100000)
+    iso = _run(backtest, cfg, ["TQQQ", "SOXL"])
+    port = _run(backtest_portfolio, cfg, ["TQQQ", "SOXL"])
+    assert port["metrics"] == iso["metrics"]
+    agg = port["aggregate"]
+    assert agg["bars"] == 860
+    assert agg["end_equity"] == pytest.approx(
+        80000 + agg["total_realized_pnl"] + agg["total_unrealized_pnl"], abs=0.02)
+
+
+def test_shared_capital_is_bounded():
+    cfg = _cfg(60)
+    port = _run(backtest_portfolio, cfg, ["TQQQ", "SOXL"])
+    agg = port["aggregate"]
+    assert agg["slices_in_use_peak"] <= 60
+    assert agg["slices_in_use_end"] == sum(m["slices_in_use_end"] for m in port["metrics"])
+    assert agg["max_drawdown"] >= 0
+    # Capital contention changes results relative to isolated books.
+    assert port["metrics"] != _run(backtest, cfg, ["TQQQ", "SOXL"])["metrics"]
+
+
+def test_streaming_reader_rejects_unsorted(tmp_path):
+    (tmp_path / "X.csv").write_text("datetime,close\n2024-01-02,2\n2024-01-01,1\n")
+    with pytest.raises(ValueError):
+        list(_iter_prices_csv(str(tmp_path), "X", "2024-01-01", "2024-12-31", ordered=True))
+    # Without ordered=True rows are yielded in file order, unsorted and unchecked.
+    assert [p for _, p in _iter_prices_csv(str(tmp_path), "X", "2024-01-01", "2024-12-31")] == [2.0, 1.0]
@@ -0,0 +1,64 @@
+from __future__ import annotations
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from kisbot.infra.backtest import backtest, backtest_portfolio
+from kisbot.infra.profiling import StageProfiler, cprofile, write_reports
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+def _cfg():
+    return {
+        "bars": {"type": "csv", "data_dir": str(DATA), "column": "close"},
+        "strategy": {"rsi_period": 14, "stoch_period": 14, "k_period": 3, "d_period": 3,
+                     "overbought": 80, "oversold": 20, "rsi_buy_threshold": 50, "rsi_buy_multiplier": 1.1},
+        "slices": {"total": 60, "per_entry_lt20": 2, "per_entry_20_80": 2},
+        "risk": {"equity": 80000},
+    }
+
+
+def test_nested_stages_split_self_time():
+    prof = StageProfiler()
+    inner = prof.wrap("inner", lambda: time.sleep(0.002))
+    with prof.stage("outer"):
+        inner()
+        inner()
+    s = prof.summary()["stages"]
+    assert s["inner"]["calls"] == 2 and s["outer"]["calls"] == 1
+    assert s["outer"]["total_ms"] >= s["inner"]["total_ms"] >= 4.0
+    assert s["outer"]["self_ms"] == pytest.approx(s["outer"]["total_ms"] - s["inner"]["total_ms"], abs=0.01)
+    stacks = dict(line.rsplit(" ", 1) for line in prof.collapsed().splitlines())
+    assert "outer;inner" in stacks and int(stacks["outer;inner"]) >= 4000
+
+
+def test_iter_times_each_next():
+    prof = StageProfiler()
+    assert list(prof.iter("load", range(5))) == [0, 1, 2, 3, 4]
+    assert prof.summary()["stages"]["load"]["calls"] == 6  # five items plus StopIteration
+
+
+@pytest.mark.parametrize("engine", ["object", "kernel"])
+def test_profiled_backtest_matches_plain(engine):
+    plain = asyncio.run(backtest(_cfg(), "2024-01-01", "2025-12-31", ["TQQQ"], quiet=True, engine=engine))
+    prof = StageProfiler()
+    res = asyncio.run(backtest(_cfg(), "2024-01-01", "2025-12-31", ["TQQQ"], quiet=True, engine=engine, profile=prof))
+    assert res["metrics"] == plain["metrics"]
+    assert "profile" not in plain
+    assert {"load", "indicators", "signals", "simulate"} <= set(res["profile"]["stages"])
+
+
+def test_profiled_portfolio_and_reports(tmp_path):
+    plain = asyncio.run(backtest_portfolio(_cfg(), "2024-01-01", "2025-12-31", ["TQQQ", "SOXL"], quiet=True))
+    prof = StageProfiler()
+    with cprofile() as cprof:
+        res = asyncio.run(backtest_portfolio(_cfg(), "2024-01-01", "2025-12-31", ["TQQQ", "SOXL"], quiet=True, profile=prof))
+    assert res["metrics"] == plain["metrics"]
+    assert res["profile"]["stages"]["indicators"]["calls"] == res["aggregate"]["bars"]
+    paths = write_reports(prof, str(tmp_path), cprof)
+    assert set(paths) == {"report", "collapsed", "cprofile"}
+    assert "indicators" in Path(paths["report"]).read_text()
+    assert "merge;load" in Path(paths["collapsed"]).read_text()
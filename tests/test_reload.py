@@ -0,0 +1,105 @@
+from __future__ import annotations
+import copy
+import os
+
+import yaml
+
+from kisbot.services.reload import ConfigWatcher, diff_configs
+from kisbot.services.trader import build_symbol, process_tick, retune_symbol, symbol_config
+
+
+def _cfg():
+    return {
+        "mode": "paper",
+        "universe": ["TQQQ", "SOXL"],
+        "strategy": {"rsi_period": 14, "stoch_period": 14, "k_period": 3, "d_period": 3, "overbought": 80,
+                     "oversold": 20, "rsi_buy_threshold": 50, "rsi_buy_multiplier": 1.1},
+        "slices": {"total": 60, "per_entry_lt20": 2, "per_entry_20_80": 1},
+        "risk": {"equity": 6000},
+    }
+
+
+def test_diff_classifies_symbols():
+    old = _cfg()
+    new = copy.deepcopy(old)
+    new["universe"] = ["SOXL", "SPXL"]
+    assert diff_configs(old, new).added == ["SPXL"]
+    assert diff_configs(old, new).removed == ["TQQQ"]
+    assert not diff_configs(old, new).changed
+
+    new = copy.deepcopy(old)
+    new["symbols"] = {"SOXL": {"strategy": {"oversold": 25}}}
+    d = diff_configs(old, new)
+    assert d.changed == {"SOXL": False} and not d.added and not d.removed
+
+    new["strategy"]["k_period"] = 5
+    new["shards"] = {"workers": 2}
+    d = diff_configs(old, new)
+    assert d.changed == {"TQQQ": True, "SOXL": True}
+    assert d.restart == ["shards"]
+    assert not diff_configs(old, copy.deepcopy(old))
+
+
+def test_retune_keeps_state_and_rebuilds_only_on_period_change():
+    cfg = _cfg()
+    stoch, book, trader = build_symbol("TQQQ", symbol_config(copy.deepcopy(cfg), "TQQQ"))
+    trader.position_qty, trader.avg_px, book.slices_in_use = 10, 99.0, 4
+    for i in range(40):
+        stoch.update(100.0 + i % 7)
+
+    cfg["strategy"]["oversold"] = 30
+    cfg["slices"]["total"] = 40
+    assert retune_symbol(stoch, trader, symbol_config(copy.deepcopy(cfg), "TQQQ")) is stoch
+    assert trader.cfg["strategy"]["oversold"] == 30 and book.slices_total == 40
+    assert (trader.position_qty, trader.avg_px, book.slices_in_use) == (10, 99.0, 4)
+
+    cfg["strategy"]["rsi_period"] = 7
+    fresh = retune_symbol(stoch, trader, symbol_config(cfg, "TQQQ"))
+    assert fresh is not stoch and fresh.rsi.period == 7 and fresh.update(100.0) == (None, None)
+    assert trader.prev_k is None and trader.position_qty == 10
+
+
+def test_retuned_symbol_matches_a_fresh_run_on_the_new_params():
+    old, new = _cfg(), _cfg()
+    new["strategy"]["rsi_buy_multiplier"] = 1.05
+    prices = [100.0 + 5.0 * ((i * 37) % 11 - 5) / 5 for i in range(400)]
+
+    def run(cfg_before, cfg_after, switch):
+        stoch, _, trader = build_symbol("TQQQ", symbol_config(cfg_before, "TQQQ"))
+        orders = []
+        for i, px in enumerate(prices):
+            if i == switch:
+                stoch = retune_symbol(stoch, trader, symbol_config(cfg_after, "TQQQ"))
+            process_tick(stoch, trader, px, float(i), lambda sy, si, q, t, px=None: orders.append((i, si, q, t, px)))
+        return orders
+
+    assert run(old, new, 0) == run(new, new, None)
+    before, switched = run(old, old, None), run(old, new, 50)
+    assert [o for o in switched if o[0] < 50] == [o for o in before if o[0] < 50]
+    assert switched != before
+
+
+def test_watcher_applies_valid_changes_and_skips_invalid_files(tmp_path):
+    path = tmp_path / "config.yaml"
+    cfg = _cfg()
+    path.write_text(yaml.safe_dump(cfg))
+    seen = []
+    w = ConfigWatcher(str(path), cfg, lambda new, d: seen.append(d))
+    assert w.check() is None
+
+    def rewrite(text):
+        path.write_text(text)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    rewrite("universe: [unterminated\n")
+    assert w.check() is None and not seen and w.cfg is cfg
+    rewrite(yaml.safe_dump({**cfg, "universe": "TQQQ"}))  # fails AppConfig validation
+    assert w.check() is None and not seen
+
+    cfg2 = copy.deepcopy(cfg)
+    cfg2["universe"].append("SPXL")
+    rewrite(yaml.safe_dump(cfg2))
+    d = w.check()
+    assert seen == [d] and d.added == ["SPXL"] and w.reloads == 1
+    assert w.cfg["universe"] == ["TQQQ", "SOXL", "SPXL"]
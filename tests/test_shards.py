@@ -0,0 +1,133 @@
+from __future__ import annotations
+import asyncio
+import math
+
+import pytest
+
+from kisbot.infra.metrics import Metrics
+from kisbot.services.shards import ShardedEngine, run_sharded, shard_of
+from kisbot.services.trader import build_symbol, process_tick, retune_symbol, symbol_config
+
+
+def _cfg(symbols):
+    return {
+        "mode": "paper",
+        "universe": symbols,
+        "strategy": {
+            "rsi_period": 14,
+            "stoch_period": 14,
+            "k_period": 3,
+            "d_period": 3,
+            "overbought": 80,
+            "oversold": 20,
+            "rsi_buy_threshold": 50,
+            "rsi_buy_multiplier": 1.1,
+        },
+        "slices": {"total": 60, "per_entry_lt20": 4, "per_entry_20_80": 1},
+        "risk": {"equity": 6000},
+    }
+
+
+def _ticks(symbols, n):
+    for i in range(n):
+        for j, s in enumerate(symbols):
+            yield s, 100.0 + 5.0 * math.sin(i / (3.0 + j)), float(i)
+
+
+def test_shard_of_is_stable_and_minimal_on_growth():
+    syms = [f"S{i}" for i in range(200)]
+    four = {s: shard_of(s, 4) for s in syms}
+    assert four == {s: shard_of(s, 4) for s in syms}
+    assert set(four.values()) == {0, 1, 2, 3}
+    # Growing 4 -> 5 shards only moves symbols onto the new shard.
+    moved = [s for s in syms if shard_of(s, 5) != four[s]]
+    assert all(shard_of(s, 5) == 4 for s in moved)
+
+
+@pytest.mark.parametrize("transport", ["queue", "ring"])
+def test_sharded_engine_matches_single_process(transport):
+    syms = ["TQQQ", "SOXL", "SPXL", "TECL"]
+    cfg = _cfg(syms)
+
+    expected = []
+    state = {s: build_symbol(s, symbol_config(cfg, s)) for s in syms}
+    place = lambda sy, si, q, t, px=None: expected.append((sy, si, q, t, px))
+    for sym, px, now in _ticks(syms, 300):
+        stoch, _, trader = state[sym]
+        process_tick(stoch, trader, px, now, place)
+
+    reg = Metrics()
+    eng = ShardedEngine(cfg, workers=2, batch_size=64, transport=transport, registry=reg)
+    eng.start()
+    try:
+        for sym, px, now in _ticks(syms, 300):
+            eng.submit(sym, px, now)
+        orders, signals = eng.drain()
+    finally:
+        eng.stop()
+
+    assert expected
+    for s in syms:
+        assert [o for o in orders if o[0] == s] == [o for o in expected if o[0] == s]
+    assert signals
+    # Worker stage latencies and counters reach the coordinator's registry by drain().
+    for stage in ("ingest", "indicator_update", "signal_decision"):
+        assert reg.histogram(stage).total == 300 * len(syms)
+    assert all(reg.counter("ticks", symbol=s).value == 300 for s in syms)
+    assert sum(reg.counter("signals", symbol=s).value for s in syms) == len(signals)
+
+
+@pytest.mark.parametrize("transport", ["queue", "ring"])
+def test_add_symbol_goes_to_owning_shard(transport):
+    cfg = _cfg(["TQQQ"])
+    eng = ShardedEngine(cfg, workers=3, transport=transport)
+    eng.start()
+    try:
+        assert eng.add_symbol("SOXL") == shard_of("SOXL", 3)
+        for sym, px, now in _ticks(["SOXL"], 120):
+            eng.submit(sym, px, now)
+        _, signals = eng.drain()
+    finally:
+        eng.stop()
+    assert {s for s, _, _ in signals} == {"SOXL"}
+
+
+@pytest.mark.parametrize("transport", ["queue", "ring"])
+def test_update_symbol_applies_between_the_same_ticks(transport):
+    syms = ["TQQQ", "SOXL"]
+    cfg = _cfg(syms)
+    new = _cfg(syms)
+    new["strategy"]["rsi_buy_multiplier"] = 1.05
+    new["strategy"]["k_period"] = 5
+    ticks = list(_ticks(syms, 300))
+    switch = 41  # mid-batch, while SOXL is still buying
+
+    expected = []
+    state = {s: list(build_symbol(s, symbol_config(cfg, s))) for s in syms}
+    place = lambda sy, si, q, t, px=None: expected.append((sy, si, q, t, px))
+    for i, (sym, px, now) in enumerate(ticks):
+        if i == switch:
+            state["SOXL"][0] = retune_symbol(state["SOXL"][0], state["SOXL"][2], symbol_config(new, "SOXL"))
+        process_tick(state[sym][0], state[sym][2], px, now, place)
+
+    eng = ShardedEngine(cfg, workers=2, batch_size=64, transport=transport)
+    eng.start()
+    try:
+        for i, (sym, px, now) in enumerate(ticks):
+            if i == switch:
+                eng.update_symbol("SOXL", symbol_config(new, "SOXL"))
+            eng.submit(sym, px, now)
+        orders, _ = eng.drain()
+    finally:
+        eng.stop()
+
+    for s in syms:
+        assert [o for o in orders if o[0] == s] == [o for o in expected if o[0] == s]
+
+
+@pytest.mark.parametrize("section", [{"journal": {"dir": "state/journal"}}, {"pnl": {"flush_sec": 5}},
+                                     {"orders": {"flush_sec": 1}}])
+def test_run_sharded_rejects_inline_only_sections(section):
+    cfg = {**_cfg(["TQQQ"]), **section}
+    with pytest.raises(ValueError, match=next(iter(section))):
+        asyncio.run(run_sharded(cfg, None, workers=2))
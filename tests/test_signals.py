@@ -141,3 +141,37 @@ def test_rsi_batch_stops_when_slices_exhausted():
     trader.on_rsi(rsi=30.0, last_px=98.0, now=3.0, place_order=place)
     assert len(placed) == prior_orders
     assert trader.batch_active is False
+
+
+def test_trend_and_cooldown_gate_buys():
+    cfg = _cfg()
+    cfg["strategy"].update(trend_sma_period=3, add_cooldown_sec=60)
+    book = SliceBook(cfg["risk"]["equity"], cfg["slices"]["total"])
+    trader = KDTrader("TQQQ", book, cfg)
+    placed = []
+
+    def place(*args):
+        placed.append(args)
+
+    def tick(px, now):
+        trader.on_price(px)
+        trader.on_kd(k=10.0, d=15.0, last_px=px, now=now, place_order=place)
+
+    tick(100.0, 0.0)  # SMA not ready yet
+    tick(100.0, 1.0)
+    tick(100.0, 2.0)  # not above its SMA
+    assert placed == []
+    tick(103.0, 10.0)  # SMA 101
+    assert len(placed) == 1
+    tick(104.0, 30.0)  # cooling down
+    assert len(placed) == 1
+    tick(106.0, 70.0)
+    assert len(placed) == 2
+
+    # A new cooldown applies at once; the trend SMA keeps its window unless the period changes.
+    trader.apply_config({**cfg, "strategy": {**cfg["strategy"], "add_cooldown_sec": 0}})
+    assert trader.trend_sma is not None
+    tick(108.0, 70.0)
+    assert len(placed) == 3
+    trader.apply_config({**cfg, "strategy": {**cfg["strategy"], "trend_sma_period": 5}})
+    assert trader.trend_sma is None and trader.trend.period == 5
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from kisbot.core.slices import SliceBook
+from kisbot.core.slices import SharedSliceBook, SliceBook
 
 
 def test_slicebook_basic_flow():
@@ -20,3 +20,22 @@ def test_slicebook_basic_flow():
     book.free_all()
     assert book.slices_in_use == 0
 
+
+
+def test_shared_book_views_share_capital():
+    shared = SharedSliceBook(equity=6000, slices_total=10)
+    a, b = shared.view("A"), shared.view("B")
+    assert a.reserve(6) == 3600
+    assert b.can_add(6) is False
+    assert b.reserve(6) == 0.0
+    assert b.reserve(4) == 2400
+    assert shared.slices_in_use == 10
+
+    # Direct adjustments (as KDTrader does on a rejected order) keep totals in sync
+    b.slices_in_use -= 4
+    assert shared.slices_in_use == 6 and b.slices_in_use == 0
+
+    # free_all releases only the caller's slices
+    b.reserve(2)
+    a.free_all()
+    assert a.slices_in_use == 0 and b.slices_in_use == 2 and shared.slices_in_use == 2
@@ -0,0 +1,99 @@
+from __future__ import annotations
+import asyncio
+import copy
+import itertools
+import random
+from pathlib import Path
+
+import pytest
+
+from kisbot.infra.backtest import backtest
+from kisbot.infra.sweep import equivalence_keys, sweep
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+def _base(data_dir=DATA):
+    return {
+        "bars": {"type": "csv", "data_dir": str(data_dir), "column": "close"},
+        "strategy": {"rsi_period": 14, "stoch_period": 14, "k_period": 3, "d_period": 3,
+                     "overbought": 80, "oversold": 20, "rsi_buy_threshold": 50, "rsi_buy_multiplier": 1.1},
+        "slices": {"total": 60, "per_entry_lt20": 2, "per_entry_20_80": 2},
+        "risk": {"equity": 80000},
+    }
+
+
+def _with(cfg, **updates):
+    out = copy.deepcopy(cfg)
+    for key, v in updates.items():
+        section, name = key.split("__")
+        out[section][name] = v
+    return out
+
+
+def _backtest(cfg, sym, from_date="2024-01-01", to_date="2025-12-31"):
+    return asyncio.run(backtest(cfg, from_date, to_date, [sym], quiet=True))["metrics"][0]
+
+
+@pytest.mark.parametrize("sym", ["TQQQ", "SOXL"])
+def test_strategy_grid_matches_backtest(sym):
+    base = _base()
+    cfgs = [
+        _with(base, strategy__take_profit_pct=tp, strategy__stop_loss_pct=sl, strategy__rsi_buy_threshold=thr,
+              strategy__rsi_buy_multiplier=mult, strategy__enable_kd_buys=kd)
+        for tp, sl, thr, mult, kd in itertools.product(
+            [0.05, 0.10, 0.12], [None, 0.10], [45, 55], [1.05, 1.10], [True, False])
+    ]
+    assert sweep(cfgs, sym, "2024-01-01", "2025-12-31") == [_backtest(c, sym) for c in cfgs]
+
+
+
+@pytest.mark.parametrize("sym", ["TQQQ", "SOXL"])
+def test_trend_and_cooldown_grid_dedupes_equivalent_points(sym):
+    base = _base()
+    day = 86400
+    cfgs = [
+        _with(base, strategy__trend_sma_period=period, strategy__add_cooldown_sec=cd,
+              strategy__enable_kd_buys=kd, strategy__oversold=oversold)
+        for period, cd, kd, oversold in itertools.product(
+            [0, 1, 20, 100, 5000], [0, 30, day, 3 * day, 10 ** 9], [True, False], [15, 20])
+    ]
+    stats = {}
+    got = sweep(cfgs, sym, "2024-01-01", "2025-12-31", stats=stats)
+    assert got == [_backtest(c, sym) for c in cfgs]
+    # 3 live trend periods x 4 cooldowns (30 s == 1 day on daily bars) x 3 KD variants
+    # (oversold is moot without KD buys) + one lane for every config that never buys
+    assert stats == {"configs": 100, "simulated": 3 * 4 * 3 + 1}
+    assert len(set(equivalence_keys(cfgs, sym, "2024-01-01", "2025-12-31"))) == 37
+    assert all(m["realized_pnl"] == 0 and m["position_qty_end"] == 0
+               for c, m in zip(cfgs, got) if c["strategy"]["trend_sma_period"] in (1, 5000))
+    assert len({id(m) for m in got}) == len(got)
+
+def test_mixed_periods_slices_and_symbol_overrides(tmp_path):
+    rng = random.Random(11)
+    px, lines = 40.0, ["datetime,close"]
+    for i in range(1200):
+        px *= 1.0 + rng.gauss(0.0, 0.03)
+        lines.append(f"2020-01-01T00:{i // 60:02d}:{i % 60:02d},{px:.2f}")
+    (tmp_path / "RW.csv").write_text("\n".join(lines) + "\n")
+    base = _base(tmp_path)
+    cfgs = [
+        base,
+        _with(base, strategy__rsi_period=7, strategy__stoch_period=10),
+        _with(base, strategy__k_period=2, strategy__d_period=4, strategy__oversold=25, strategy__overbought=85),
+        _with(base, slices__total=8, slices__per_entry_lt20=4, slices__per_entry_20_80=1),
+        _with(base, slices__per_entry_20_80=0, risk__equity=5000),
+        _with(base, risk__equity=30),  # slice_value == 0
+        # A per-symbol override wins over the swept top-level value, as in backtest().
+        {**_with(base, strategy__take_profit_pct=0.2), "symbols": {"RW": {"strategy": {"take_profit_pct": 0.04}}}},
+        _with(base, strategy__trend_sma_period=50, strategy__add_cooldown_sec=7),
+        _with(base, strategy__add_cooldown_sec=0.5),  # same bar only on 1 s bars
+    ]
+    got = sweep(cfgs, "RW", "2020-01-01", "2020-01-02")
+    assert got == [_backtest(c, "RW", "2020-01-01", "2020-01-02") for c in cfgs]
+    assert got[-3] == _backtest(_with(base, strategy__take_profit_pct=0.04), "RW", "2020-01-01", "2020-01-02")
+
+
+def test_empty_range():
+    cfgs = [_base(), _with(_base(), strategy__take_profit_pct=0.2)]
+    assert sweep(cfgs, "TQQQ", "1990-01-01", "1990-02-01") == [_backtest(c, "TQQQ", "1990-01-01", "1990-02-01") for c in cfgs]
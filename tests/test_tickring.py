@@ -0,0 +1,109 @@
+from __future__ import annotations
+import multiprocessing as mp
+
+import numpy as np
+
+from kisbot.infra.tickring import TickRing
+
+
+def _reader(name, slot, n, out):
+    ring = TickRing.attach(name)
+    cons = ring.consumer(slot)
+    total, checksum = 0, 0.0
+    while total < n:
+        batch = cons.poll(1000)
+        total += len(batch)
+        checksum += float(batch["price"].sum())
+    out.put((total, checksum, cons.gaps, ring.symbols()))
+    del batch
+    ring.close()
+
+
+def test_publish_and_poll_in_order():
+    ring = TickRing.create(8, max_consumers=2, symbols=["TQQQ"])
+    try:
+        a, b = ring.consumer(0), ring.consumer(1)
+        for i in range(6):
+            ring.publish("SOXL" if i % 2 else "TQQQ", 100.0 + i, float(i))
+        batch = a.poll(4)
+        assert batch["seq"].tolist() == [0, 1, 2, 3]
+        assert [ring.symbols()[s] for s in batch["sym"]] == ["TQQQ", "SOXL", "TQQQ", "SOXL"]
+        assert a.poll()["price"].tolist() == [104.0, 105.0]
+        assert len(a.poll()) == 0 and a.lag == 0
+        assert ring.lag(1) == 6 and len(b.poll()) == 6
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+def test_batches_stop_at_the_wrap_and_overrun_counts_gaps():
+    ring = TickRing.create(8, max_consumers=1)
+    try:
+        cons = ring.consumer(0)
+        ids = np.zeros(20, dtype=np.int32)
+        ring.publish_many(ids[:6], np.arange(6.0), np.arange(6.0))
+        assert len(cons.poll()) == 6
+        ring.publish_many(ids, np.arange(6.0, 26.0), np.arange(20.0))  # laps the 8-slot ring
+        first = cons.poll()
+        assert cons.gaps == 12 and first["seq"][0] == 18
+        assert first["seq"].tolist() + cons.poll()["seq"].tolist() == list(range(18, 26))
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+def test_consumers_in_other_processes():
+    n = 50_000
+    ring = TickRing.create(1 << 16, max_consumers=2, symbols=["A", "B"])
+    ctx = mp.get_context()
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_reader, args=(ring.name, i, n, out)) for i in range(2)]
+    for p in procs:
+        p.start()
+    try:
+        prices = np.arange(n, dtype=np.float64)
+        for i in range(0, n, 1000):
+            ring.publish_many(np.full(1000, i % 2, dtype=np.int32), prices[i:i + 1000], prices[i:i + 1000])
+        results = [out.get(timeout=30) for _ in procs]
+    finally:
+        for p in procs:
+            p.join(timeout=10)
+        ring.close()
+        ring.unlink()
+    assert all(r == (n, float(prices.sum()), 0, ["A", "B"]) for r in results)
+
+
+def _table_reader(name, stop, out):
+    ring = TickRing.attach(name)
+    loads = errors = 0
+    bad = []
+    while not stop.is_set():
+        try:
+            names = ring.load_symbols()
+        except ValueError:  # json.JSONDecodeError
+            errors += 1
+            continue
+        loads += 1
+        if names != [f"S{i}" for i in range(len(names))]:
+            bad.append(len(names))
+    out.put((loads, errors, bad, len(ring.load_symbols())))
+    ring.close()
+
+
+def test_symbol_table_reads_while_the_producer_grows_it():
+    ring = TickRing.create(1 << 10, max_consumers=1)
+    ctx = mp.get_context()
+    out, stop = ctx.Queue(), ctx.Event()
+    p = ctx.Process(target=_table_reader, args=(ring.name, stop, out))
+    p.start()
+    try:
+        for i in range(2500):
+            ring.symbol_id(f"S{i}")
+        stop.set()
+        loads, errors, bad, final = out.get(timeout=30)
+    finally:
+        p.join(timeout=10)
+        ring.close()
+        ring.unlink()
+    assert loads > 0 and errors == 0 and bad == []
+    assert final == 2500